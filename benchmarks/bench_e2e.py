@@ -0,0 +1,226 @@
+### End-to-end throughput of sequential, threaded and async scraping against the local stand-in server
+# every mode scrapes the same races with its own fresh page cache, so each page is requested once in every mode
+# and the speedups are down to concurrency alone; 'crawler' (season scope) runs pcs.scrape_season, which also
+# requests the calendar and groups the urls, and is reported as its own mode
+# run from the repository root:
+#     python -m benchmarks.bench_e2e --scope race --latency 0.05 --jitter 0.02
+#     python -m benchmarks.bench_e2e --scope season --races 5 --workers 16 --error-rate 0.01 --modes sequential,threaded,async,crawler
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pcs_scraper as pcs
+from pcs_scraper.utility import request_management as rqm
+from benchmarks import fixtures as fx
+from benchmarks.server import start_server
+
+def race_sequential(name: str, year: int):
+    """
+    Scrapes a full race one request at a time
+
+    Returns:
+        int: the number of steps that failed
+    """
+
+    failed = 0
+    try:
+        race = pcs.Race(name, year)
+        race.get_results()
+        race.get_startlist()
+        stages = race.get_stages()
+    except Exception:
+        return 1
+
+    for stage in stages.loc[:, 'stage_pcs_name']:
+        for method in [race.get_stage_result, race.get_stage_info]:
+            try:
+                method(stage)
+            except Exception:
+                failed = failed + 1
+
+    return failed
+
+def race_threaded(name: str, year: int, pool: ThreadPoolExecutor):
+    """
+    Scrapes a full race with the race pages and then all the stage pages requested on a thread pool
+
+    Returns:
+        int: the number of steps that failed
+    """
+
+    def attempt(func, *args):
+        try:
+            func(*args)
+            return 0
+        except Exception:
+            return 1
+
+    try:
+        race = pcs.Race(name, year)
+    except Exception:
+        return 1
+
+    # the race level pages at the same time
+    futures = [pool.submit(attempt, race.get_results), pool.submit(attempt, race.get_startlist)]
+    try:
+        stages = race.get_stages()
+    except Exception:
+        return 1 + sum(f.result() for f in futures)
+
+    # then every stage page at the same time
+    for stage in stages.loc[:, 'stage_pcs_name']:
+        futures = futures + [pool.submit(attempt, race.get_stage_result, stage),
+                             pool.submit(attempt, race.get_stage_info, stage)]
+
+    return sum(f.result() for f in futures)
+
+async def race_async(name: str, year: int, limit: asyncio.Semaphore):
+    """
+    Scrapes a full race as coroutines, the blocking scraper calls run in threads with at most `limit` at once
+
+    Returns:
+        int: the number of steps that failed
+    """
+
+    async def attempt(func, *args):
+        async with limit:
+            try:
+                return await asyncio.to_thread(func, *args)
+            except Exception:
+                return None
+
+    race = await attempt(pcs.Race, name, year)
+    if race is None:
+        return 1
+
+    out = await asyncio.gather(attempt(race.get_results), attempt(race.get_startlist), attempt(race.get_stages))
+    failed = sum(x is None for x in out)
+    stages = out[2]
+    if stages is None:
+        return failed
+
+    steps = []
+    for stage in stages.loc[:, 'stage_pcs_name']:
+        steps = steps + [attempt(race.get_stage_result, stage), attempt(race.get_stage_info, stage)]
+    out = await asyncio.gather(*steps)
+
+    return failed + sum(x is None for x in out)
+
+def run_mode(mode: str, scope: str, races: list, workers: int):
+    """
+    Runs one scraping mode over the workload
+
+    Args:
+        mode (str): one of 'sequential', 'threaded', 'async', 'crawler' (season scope only)
+        scope (str): 'race' or 'season'
+        races (list): (pcs name, year) of the races to scrape
+        workers (int): the most requests at the same time for threaded/async
+
+    Returns:
+        int: the number of steps that failed
+    """
+
+    if mode == 'sequential':
+        return sum(race_sequential(name, year) for name, year in races)
+
+    elif mode == 'threaded':
+        with ThreadPoolExecutor(max_workers = workers) as pool:
+            return sum(race_threaded(name, year, pool) for name, year in races)
+
+    elif mode == 'async':
+        async def run_all():
+            limit = asyncio.Semaphore(workers)
+            return sum(await asyncio.gather(*[race_async(name, year, limit) for name, year in races]))
+        return asyncio.run(run_all())
+
+    elif mode == 'crawler':
+        # the package's own season crawler (page cache & url grouping included)
+        if scope != 'season':
+            raise ValueError("the crawler mode needs scope = 'season'")
+        season = pcs.scrape_season(fx.RACE_YEAR, max_workers = workers)
+        return len(season['errors'])
+
+    raise ValueError('unknown mode: ' + repr(mode))
+
+def run(scope = 'race', **kwargs):
+    """
+    Benchmarks every scraping mode against a stand-in server
+
+    Args:
+        scope (str, optional): 'race' for a single race, 'season' for a calendar of races. Defaults to 'race'.
+
+    Kwargs:
+        races (int): the number of races in a season. Defaults to 5.
+        workers (int): the most requests at the same time. Defaults to 8.
+        modes (list): the modes to run. Defaults to ['sequential', 'threaded', 'async'].
+            - every mode starts with a fresh, empty page cache
+        latency, jitter, error_rate, seed: see benchmarks.server.StandInServer
+
+    Returns:
+        pd.DataFrame: columns = ['mode', 'seconds', 'requests', 'requests_per_sec', 'server_errors', 'failed_steps']
+    """
+
+    num_races = kwargs.pop('races', 5)
+    workers = kwargs.pop('workers', 8)
+    modes = kwargs.pop('modes', ['sequential', 'threaded', 'async'])
+
+    # a season has a small calendar so the run doesn't take forever
+    pages = fx.load_pages()
+    if scope == 'season':
+        pages['calendar'] = fx.calendar(num_races)
+        races = [('race-' + str(i), fx.RACE_YEAR) for i in range(num_races)]
+    else:
+        races = [(fx.RACE_NAME, fx.RACE_YEAR)]
+
+    # preset empty list
+    out = []
+
+    for mode in modes:
+        server = start_server(pages, **dict(kwargs))
+        previous_url = rqm.set_base_url(server.base_url)
+        # the same fetches for every mode: each page once
+        previous_cache = rqm.set_page_cache(rqm.PageCache())
+        try:
+            start = time.perf_counter()
+            failed = run_mode(mode, scope, races, workers)
+            seconds = time.perf_counter() - start
+        finally:
+            rqm.set_base_url(previous_url)
+            rqm.set_page_cache(previous_cache)
+            server.shutdown()
+            server.server_close()
+
+        requests = sum(server.requests.values())
+        out = out + [[mode, seconds, requests, requests / seconds, server.errors, failed]]
+
+    frame = pd.DataFrame(data = out,
+                         columns = ['mode', 'seconds', 'requests', 'requests_per_sec', 'server_errors', 'failed_steps'])
+
+    return frame
+
+def main():
+    parser = argparse.ArgumentParser(description = 'End-to-end scraping benchmark against a local PCS stand-in')
+    parser.add_argument('--scope', choices = ['race', 'season'], default = 'race')
+    parser.add_argument('--races', type = int, default = 5, help = 'races in the season scope')
+    parser.add_argument('--workers', type = int, default = 8)
+    parser.add_argument('--modes', default = 'sequential,threaded,async')
+    parser.add_argument('--latency', type = float, default = 0.05)
+    parser.add_argument('--jitter', type = float, default = 0.02)
+    parser.add_argument('--error-rate', type = float, default = 0)
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--csv', default = None, help = 'write the results to this csv')
+    args = parser.parse_args()
+
+    frame = run(args.scope, races = args.races, workers = args.workers, modes = args.modes.split(','),
+                latency = args.latency, jitter = args.jitter, error_rate = args.error_rate, seed = args.seed)
+
+    with pd.option_context('display.width', 200, 'display.float_format', '{:.2f}'.format):
+        print(frame.to_string(index = False))
+
+    if args.csv is not None:
+        frame.to_csv(args.csv, index = False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+### Benchmark of every extraction path against fixture pages, no network needed
+# run from the repository root:
+#     python -m benchmarks.bench_parsing --repeat 20
+#     python -m benchmarks.bench_parsing --pages path/to/captured/pages --csv baseline.csv
+
+import argparse
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+import pandas as pd
+import pcs_scraper as pcs
+from pcs_scraper.utility import request_management as rqm
+from pcs_scraper.utility import table_manipulation as tbl
+from benchmarks import fixtures as fx
+
+def bench_cases(pages: dict):
+    """
+    The extraction paths to benchmark
+
+    Args:
+        pages (dict): page type -> page content, see fixtures.load_pages()
+
+    Returns:
+        list: (page type, path name, callable returning the number of rows extracted)
+    """
+
+    # objects are created once, only the extraction is timed
+    race = pcs.Race(fx.RACE_NAME, fx.RACE_YEAR)
+    rider = pcs.Rider(fx.RIDER_NAME)
+    team = pcs.Team(fx.TEAM_NAME, fx.RACE_YEAR)
+    startlist = race.get_startlist()
+
+    def complementary(point_type):
+        soup = BeautifulSoup(pages['complementary'], "html.parser")
+        return len(tbl.complementary_points(soup, startlist, ['Rnk', 'Rider', 'Team', 'Points'], point_type))
+
+    cases = [('race_results', 'Race.get_results', lambda: len(race.get_results())),
+             ('stage_result', 'Race.get_stage_result', lambda: len(race.get_stage_result('stage-1'))),
+             ('stage_result_ttt', 'Race.get_stage_result (ttt)', lambda: len(race.get_stage_result('stage-3-ttt'))),
+             ('startlist', 'Race.get_startlist', lambda: len(race.get_startlist())),
+             ('stages', 'Race.get_stages', lambda: len(race.get_stages())),
+             ('stage_info', 'Race.get_stage_info', lambda: len(race.get_stage_info('stage-1'))),
+             ('complementary', 'complementary_points (Sprint)', lambda: complementary('Sprint')),
+             ('complementary', 'complementary_points (KOM)', lambda: complementary('KOM')),
+             ('rider_history', 'Rider.get_race_history', lambda: len(rider.get_race_history(season = fx.RACE_YEAR))),
+             ('team', 'Team.get_riders', lambda: len(team.get_riders())),
+             ('teams_by_year', 'teams_by_year', lambda: len(pcs.teams_by_year(fx.RACE_YEAR, 'M')))]
+
+    return cases
+
+def run(pages: dict, repeat = 20):
+    """
+    Times each extraction path and measures its peak memory
+
+    Args:
+        pages (dict): page type -> page content, see fixtures.load_pages()
+        repeat (int, optional): the number of times each path is run. Defaults to 20.
+
+    Returns:
+        pd.DataFrame: columns = ['page_type', 'path', 'page_kib', 'rows', 'ms_per_page', 'rows_per_sec', 'peak_kib']
+    """
+
+    # serve the fixtures instead of the website
+    previous_cache = rqm.set_page_cache(fx.FixturePageCache(pages))
+
+    # preset empty list
+    out = []
+
+    try:
+        for kind, path, func in bench_cases(pages):
+            # warm up
+            rows = func()
+
+            # time without memory tracing (tracing slows everything down)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            seconds = (time.perf_counter() - start) / repeat
+
+            # one more run for the peak memory
+            tracemalloc.start()
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            out = out + [[kind, path, len(pages[kind]) / 1024, rows,
+                          seconds * 1000, rows / seconds, peak / 1024]]
+    finally:
+        rqm.set_page_cache(previous_cache)
+
+    frame = pd.DataFrame(data = out,
+                         columns = ['page_type', 'path', 'page_kib', 'rows', 'ms_per_page', 'rows_per_sec', 'peak_kib'])
+
+    return frame
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark the pcs_scraper parsers against fixture pages')
+    parser.add_argument('--repeat', type = int, default = 20, help = 'runs of each path')
+    parser.add_argument('--pages', default = None, help = "directory of captured pages named '<page type>.html'")
+    parser.add_argument('--csv', default = None, help = 'write the results to this csv')
+    args = parser.parse_args()
+
+    frame = run(fx.load_pages(args.pages), args.repeat)
+
+    with pd.option_context('display.width', 200, 'display.max_columns', 20, 'display.float_format', '{:.2f}'.format):
+        print(frame.to_string(index = False))
+
+    if args.csv is not None:
+        frame.to_csv(args.csv, index = False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+### Synthetic PCS pages for benchmarking without the network
+# Pages are built to match the markup the parsers in pcs_scraper look for, at the size of a real page
+# (ie. a 176 rider grand tour startlist). Captured pages can be used instead, see load_pages()
+
+import os
+from pcs_scraper.utility import url_management as mgt
+
+# the identities every fixture page belongs to
+RACE_NAME = 'bench-race'
+RACE_YEAR = 2021
+RIDER_NAME = 'bench-rider'
+TEAM_NAME = 'bench-team'
+
+# the size of the synthetic pages
+NUM_TEAMS = 22
+RIDERS_PER_TEAM = 8
+NUM_STAGES = 21
+NUM_SEASONS = 10
+RACES_PER_SEASON = 80
+
+# all the page types that can be served
+PAGE_TYPES = ['race_overview', 'race_results', 'stage_result', 'stage_result_ttt', 'startlist', 'stages',
+              'stage_info', 'complementary', 'rider', 'rider_history', 'rider_points',
+              'team', 'team_race_history', 'teams_by_year', 'calendar']
+
+def page_type(url: str):
+    """
+    The fixture page type of a PCS url (url_management.page_type(), with ttt stages told apart by name)
+
+    Args:
+        url (str): the url (with or without 'https://www.procyclingstats.com/')
+
+    Returns:
+        str: one of PAGE_TYPES (None if the url isn't recognised)
+    """
+
+    kind = mgt.page_type(url)
+
+    # fixture stages with 'ttt' in the name are team time trials
+    if kind == 'stage':
+        stage = url.split('?')[0].rstrip('/').split('/')[-1]
+        kind = 'stage_result_ttt' if 'ttt' in stage else 'stage_result'
+
+    return kind
+
+def team_names():
+    return ['Team ' + chr(65 + i) + ' Cycling' for i in range(NUM_TEAMS)]
+
+def team_href(i: int, year = RACE_YEAR):
+    return 'team/team-' + chr(97 + i) + '-cycling-' + str(year)
+
+def rider_names():
+    # (printed name as LAST First, href)
+    riders = []
+    for i in range(NUM_TEAMS * RIDERS_PER_TEAM):
+        riders = riders + [('RIDERLAST' + str(i) + ' Rider' + str(i), 'rider/rider' + str(i) + '-riderlast' + str(i))]
+    return riders
+
+def wrap(body: str):
+    """
+    Puts page content in the boilerplate every PCS page has (head, navigation, footer)
+    """
+
+    nav = ''.join(['<li><a href="/link-' + str(i) + '">Link ' + str(i) + '</a></li>' for i in range(60)])
+    head = ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>ProCyclingStats</title>' +
+            ''.join(['<link rel="stylesheet" href="/css/' + str(i) + '.css">' for i in range(10)]) +
+            '</head><body><div class="header"><ul class="menu">' + nav + '</ul></div>')
+    foot = '<div class="footer"><ul>' + nav + '</ul></div></body></html>'
+
+    return (head + body + foot).encode('utf-8')
+
+def result_rows(num_riders: int, points_column = False):
+    """
+    Rows of a results table with columns: Rnk, GC, BIB, Rider, Age, Team, UCI, Pnt, Time
+    """
+
+    riders = rider_names()
+    names = team_names()
+    rows = ''
+    for i in range(num_riders):
+        printed, href = riders[i % len(riders)]
+        team = (i // RIDERS_PER_TEAM) % NUM_TEAMS
+        # winner has the full time, the rest a gap, the last few didn't finish
+        if i == 0:
+            time = '<td class="time">4:34:20</td>'
+            rank = '1'
+        elif i >= num_riders - 3:
+            time = '<td class="time"></td>'
+            rank = 'DNF'
+        else:
+            gap = str(i // 10) + ':' + str(i % 60).zfill(2)
+            time = '<td class="time"><span class="timeff">+' + gap + '</span><div class="hide">' + gap + '</div></td>'
+            rank = str(i + 1)
+        rows = rows + ('<tr><td>' + rank + '</td><td>' + str(i + 1) + '</td><td>' + str(i + 1) + '</td>' +
+                       '<td class="ridername"><span class="flag"></span><a href="' + href + '">' + printed + '</a></td>' +
+                       '<td>' + str(20 + i % 15) + '</td>' +
+                       '<td class="cu600"><a href="' + team_href(team) + '">' + names[team] + '</a></td>' +
+                       '<td>' + str(max(0, 100 - i)) + '</td><td>' + str(max(0, 50 - i)) + '</td>' +
+                       (('<td>' + str(max(0, 30 - i)) + '</td>') if points_column else time) + '</tr>')
+    return rows
+
+def result_table(num_riders: int, points_column = False):
+    last = 'Points' if points_column else 'Time'
+    head = ''.join(['<th>' + x + '</th>' for x in ['Rnk', 'GC', 'BIB', 'Rider', 'Age', 'Team', 'UCI', 'Pnt', last]])
+    return ('<div class="result-cont"><table class="results basic moblist10"><thead><tr>' + head + '</tr></thead>' +
+            '<tbody>' + result_rows(num_riders, points_column) + '</tbody></table></div>')
+
+def ttt_table():
+    names = team_names()
+    riders = rider_names()
+    head = ''.join(['<th>' + x + '</th>' for x in ['Pos.', 'Team', 'Time', 'PCS points', 'UCI points']])
+    rows = ''
+    for t in range(NUM_TEAMS):
+        rows = rows + ('<tr class="team"><td>' + str(t + 1) + '</td><td><a href="' + team_href(t) + '">' + names[t] + '</a></td>' +
+                       '<td>0:' + str(30 + t).zfill(2) + ':' + str(t % 60).zfill(2) + '</td><td></td><td></td></tr>')
+        for r in range(RIDERS_PER_TEAM):
+            printed, href = riders[t * RIDERS_PER_TEAM + r]
+            rows = rows + ('<tr class=""><td></td><td><a href="' + href + '">' + printed + '</a></td>' +
+                           '<td></td><td>' + str(max(0, 20 - t)) + '</td><td>' + str(max(0, 10 - t)) + '</td></tr>')
+    return ('<div class="result-cont"><table class="results-ttt"><thead><tr>' + head + '</tr></thead>' +
+            '<tbody>' + rows + '</tbody></table></div>')
+
+def info_list():
+    values = ['11 July 2021', '12:15 (12:15 CET)', '41.2 km/h', '0 km', '150 km', '',
+              '<span class="icon profile p4"></span>', '120', '2500', 'Sprint of small group', '',
+              'Bench - Mark', '1500']
+    labels = ['Date:', 'Start time:', 'Avg. speed winner:', 'Race category:', 'Distance:', 'Points scale:',
+              'Parcours type:', 'ProfileScore:', 'Vert. meters:', 'Won how:', 'Race ranking:',
+              'Departure/Arrival:', 'Startlist quality score:']
+    items = ''.join(['<li><div class="">' + l + '</div><div>' + v + '</div></li>' for l, v in zip(labels, values)])
+    return '<div class="w30 right mb_w100"><ul class="infolist">' + items + '</ul></div>'
+
+def stage_page(ttt = False):
+    tabs = '<ul class="restabs">' + ''.join(['<li><a>' + x + '</a></li>' for x in ['Stage', 'GC', 'Points', 'KOM']]) + '</ul>'
+    first = ttt_table() if ttt else result_table(NUM_TEAMS * RIDERS_PER_TEAM)
+    tables = (first + result_table(NUM_TEAMS * RIDERS_PER_TEAM) +
+              result_table(NUM_TEAMS * RIDERS_PER_TEAM, points_column = True) +
+              result_table(NUM_TEAMS * RIDERS_PER_TEAM, points_column = True))
+    return wrap('<div class="page-content page-object default">' + tabs +
+                '<div class="w68 left mb_w100"><div class="subheader">Stage details</div>' + tables + '</div>' +
+                info_list() + '</div>')
+
+def race_overview():
+    return wrap('<div class="page-title"><div class="main"><h1>Bench Race</h1><font>108th</font><font>(2.UWT)</font></div></div>' +
+                '<ul class="infolist fs13"><li><div>Startdate:</div><div>2021-06-26</div></li>' +
+                '<li><div>Enddate:</div><div>2021-07-18</div></li></ul>')
+
+def race_results():
+    return wrap('<div class="page-content page-object default">' + info_list() +
+                result_table(NUM_TEAMS * RIDERS_PER_TEAM) + '</div>')
+
+def startlist():
+    names = team_names()
+    riders = rider_names()
+    teams = ''
+    for t in range(NUM_TEAMS):
+        members = ''.join(['<li><span class="bib">' + str(t * 10 + r + 1) + '</span><a href="' + riders[t * RIDERS_PER_TEAM + r][1] + '">' +
+                           riders[t * RIDERS_PER_TEAM + r][0] + '</a></li>' for r in range(RIDERS_PER_TEAM)])
+        teams = teams + '<li class="team"><b><a href="' + team_href(t) + '">' + names[t] + '</a></b><ul>' + members + '</ul></li>'
+    return wrap('<div class="page-content page-object default"><ul class="startlist_v3">' + teams + '</ul></div>')
+
+def stages():
+    rows = ''
+    for s in range(NUM_STAGES):
+        rows = rows + ('<tr><td>' + str(s % 28 + 1).zfill(2) + '/07</td><td>Sat</td>' +
+                       '<td><a href="race/' + RACE_NAME + '/' + str(RACE_YEAR) + '/stage-' + str(s + 1) + '">Stage ' + str(s + 1) +
+                       ' | A - B</a></td><td>150</td></tr>')
+    return wrap('<div class="page-content page-object default"><table class="basic"><thead><tr><th>Date</th><th>Day</th>' +
+                '<th>Stage</th><th>KMs</th></tr></thead><tbody>' + rows + '</tbody></table></div>')
+
+def complementary():
+    names = team_names()
+    riders = rider_names()
+    body = ''
+    titles = (['Sprint | Km ' + str(20 * i) for i in range(1, 4)] + ['Points at finish'] +
+              ['KOM Sprint (' + str(i) + ') Col ' + str(i) for i in range(1, 5)])
+    for title in titles:
+        rows = ''
+        for r in range(15):
+            printed, href = riders[r * 3]
+            first_last = printed.split(' ')[1] + ' ' + printed.split(' ')[0].capitalize()
+            rows = rows + ('<tr><td>' + str(r + 1) + '</td><td><a href="' + href + '">' + first_last + '</a></td>' +
+                           '<td>' + names[(r * 3) // RIDERS_PER_TEAM] + '</td><td>' + str(15 - r) + '</td></tr>')
+        body = body + ('<h3>' + title + '</h3><table class="basic"><thead><tr><th>Rnk</th><th>Rider</th><th>Team</th>' +
+                       '<th>Points</th></tr></thead><tbody>' + rows + '</tbody></table>')
+    return wrap('<div class="page-content page-object default">' + body + '</div>')
+
+def rider():
+    teams = ''.join(['<li class="main"><div class="season">' + str(RACE_YEAR - i) + '</div>' +
+                     '<a href="' + team_href(i % NUM_TEAMS, RACE_YEAR - i) + '">' + team_names()[i % NUM_TEAMS] + '</a></li>'
+                     for i in range(NUM_SEASONS)])
+    return wrap('<div class="page-title"><div class="main"><h1>Bench  Rider</h1><span>Team A Cycling</span></div></div>' +
+                '<div class="rdr-info-cont">Date of birth: 1 May 1998 (23)<b>Nationality:</b><a href="nation/x">Nowhere</a>' +
+                '<b>Weight:</b> 66 kg <b>Height:</b> 1.76 m</div>' +
+                '<ul class="list horizontal sites"><li><a class="" href="https://www.strava.com/athletes/1">strava</a></li></ul>' +
+                '<ul class="list horizontal rdr-rankings"><li><div class="rnk">1</div></li><li><div class="rnk">2</div></li></ul>' +
+                '<ul class="list rdr-teams moblist">' + teams + '</ul>')
+
+def rider_history():
+    seasons = ''.join(['<option value="' + str(RACE_YEAR - i) + '">' + str(RACE_YEAR - i) + '</option>' for i in range(NUM_SEASONS)])
+    rows = ''
+    for i in range(RACES_PER_SEASON):
+        if i % 4 == 0:
+            href = 'race/race-' + str(i) + '/' + str(RACE_YEAR) + '/result'
+            name = 'Race ' + str(i)
+        elif i % 4 == 1:
+            href = 'race/race-' + str(i) + '/' + str(RACE_YEAR) + '/stage-' + str(i % 21 + 1)
+            name = 'Stage ' + str(i % 21 + 1)
+        elif i % 4 == 2:
+            href = 'race/race-' + str(i) + '/' + str(RACE_YEAR) + '/gc'
+            name = 'General classification'
+        else:
+            href = 'race/race-' + str(i) + '/' + str(RACE_YEAR) + '/points'
+            name = 'Points classification'
+        rows = rows + ('<tr><td>' + str(i + 1) + '</td><td>2021-' + str(i % 12 + 1).zfill(2) + '-' + str(i % 28 + 1).zfill(2) + '</td>' +
+                       '<td>' + str(i % 30 + 1) + '</td><td><a href="' + href + '">' + name + '</a></td><td>2.UWT</td>' +
+                       '<td>' + str(150 + i) + '</td><td>' + str(i % 50) + '</td><td>' + ('' if i % 3 else str(i % 20)) + '</td>' +
+                       '<td>' + str(1000 + 10 * i) + '</td></tr>')
+    rows = rows + '<tr class="sum"><td></td><td></td><td></td><td></td><td></td><td>12000</td><td>1500</td><td>400</td><td></td></tr>'
+    return wrap('<form><select name="xseason"><option value="">-</option>' + seasons + '</select></form>' +
+                '<table class="basic"><thead><tr><th>#</th><th>Date</th><th>Result</th><th>Race</th><th>Class</th>' +
+                '<th>KMs</th><th>PCS</th><th>UCI</th><th>Vert. m</th></tr></thead><tbody>' + rows + '</tbody></table>')
+
+def rider_points():
+    rows = ''.join(['<tr><td>' + str(i + 1) + '</td><td>Race ' + str(i) + '</td><td>' + str(10 * i) + '</td></tr>' for i in range(30)])
+    return wrap('<table class="basic"><tbody>' + rows + '<tr class="sum"><td></td><td></td><td>4350</td></tr></tbody></table>')
+
+def team():
+    riders = rider_names()
+    roster = ''.join(['<li><span class="flag"></span><a href="' + href + '">' + printed + '</a></li>' for printed, href in riders[:30]])
+    options = ''.join(['<option value="' + team_href(0, RACE_YEAR - i) + '/overview">' + str(RACE_YEAR - i) + ' | ' +
+                       team_names()[0] + '</option>' for i in range(NUM_SEASONS)])
+    return wrap('<div class="pageSelectNav"><select>' + options + '</select></div>' +
+                '<div class="ttabs tabb"><ul class="list pad2">' + roster + '</ul></div>')
+
+def team_race_history():
+    rows = ''.join(['<tr><td>' + str(i + 1) + '</td><td>' + str(i % 28 + 1).zfill(2) + '.' + str(i % 12 + 1).zfill(2) + '</td><td>1</td><td></td>' +
+                    '<td><a href="race/race-' + str(i) + '/' + str(RACE_YEAR) + '/gc">Race ' + str(i) + '</a></td></tr>'
+                    for i in range(120)])
+    return wrap('<table class="basic"><tbody>' + rows + '</tbody></table>')
+
+def teams_by_year():
+    names = team_names()
+    world = ''.join(['<li><a href="' + team_href(i) + '">' + names[i] + '</a></li>' for i in range(18)])
+    pro = ''.join(['<li><a href="' + team_href(i % NUM_TEAMS) + '">' + names[i % NUM_TEAMS] + ' Pro</a></li>' for i in range(19)])
+    return wrap('<div class="page-content page-object default"><div class="mt20"><ul>' + world + '</ul></div>' +
+                '<div class="mt20"><ul></ul></div><div class="mt20"><ul>' + pro + '</ul></div></div>')
+
+def calendar(num_races = 60):
+    rows = ''
+    for i in range(num_races):
+        kind = 'gc' if i % 2 else 'result'
+        classification = '2.UWT' if i % 2 else '1.UWT'
+        rows = rows + ('<tr><td>' + str(i % 28 + 1).zfill(2) + '.' + str(i % 12 + 1).zfill(2) + '</td><td></td>' +
+                       '<td><a href="race/race-' + str(i) + '/' + str(RACE_YEAR) + '/' + kind + '">Race ' + str(i) + '</a></td>' +
+                       '<td></td><td>' + classification + '</td></tr>')
+    return wrap('<table class="basic"><thead><tr><th>Date</th><th>Date</th><th>Race</th><th>Winner</th><th>Class</th></tr></thead>' +
+                '<tbody>' + rows + '</tbody></table>')
+
+def build_pages():
+    """
+    Builds a synthetic page for each page type
+
+    Returns:
+        dict: page type -> page content (bytes)
+    """
+
+    pages = {'race_overview':race_overview(),
+             'race_results':race_results(),
+             'stage_result':stage_page(),
+             'stage_result_ttt':stage_page(ttt = True),
+             'startlist':startlist(),
+             'stages':stages(),
+             'stage_info':stage_page(),
+             'complementary':complementary(),
+             'rider':rider(),
+             'rider_history':rider_history(),
+             'rider_points':rider_points(),
+             'team':team(),
+             'team_race_history':team_race_history(),
+             'teams_by_year':teams_by_year(),
+             'calendar':calendar()}
+
+    return pages
+
+def load_pages(directory = None):
+    """
+    The pages to benchmark against: synthetic pages, replaced by captured pages where there are any
+
+    Args:
+        directory (str, optional): a directory of captured pages named '<page type>.html' (see PAGE_TYPES)
+
+    Returns:
+        dict: page type -> page content (bytes)
+    """
+
+    pages = build_pages()
+
+    if directory is not None:
+        for name in os.listdir(directory):
+            kind = name.rsplit('.', 1)[0]
+            if kind in PAGE_TYPES:
+                with open(os.path.join(directory, name), 'rb') as page:
+                    pages[kind] = page.read()
+
+    return pages
+
+class FixturePageCache:
+    def __init__(self, pages: dict):
+        """
+        Page cache (see request_management.set_page_cache()) that answers every url with the fixture of its page type
+        so the scrapers run without the network
+
+        Args:
+            pages (dict): page type -> page content, see load_pages()
+        """
+
+        self.pages = pages
+
+    def get(self, url: str):
+        kind = page_type(url)
+        if kind not in self.pages:
+            raise KeyError('No fixture page for ' + url)
+        return self.pages[kind]
+
+    def set(self, url: str, content: bytes):
+        pass
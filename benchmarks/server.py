@@ -0,0 +1,138 @@
+### Local stand-in for procyclingstats.com serving the fixture pages
+# every url shape the scrapers request (race/rider/team pages and the rider.php/team.php/races.php queries)
+# is answered with the fixture of its page type, after a configurable latency/jitter and error rate
+# run standalone from the repository root:
+#     python -m benchmarks.server --port 8000 --latency 0.05 --jitter 0.02 --error-rate 0.01
+
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks import fixtures as fx
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, pages: dict, **kwargs):
+        """
+        Http server answering PCS urls with fixture pages
+
+        Args:
+            pages (dict): page type -> page content, see fixtures.load_pages()
+
+        Kwargs:
+            host (str): the host to bind to. Defaults to '127.0.0.1'.
+            port (int): the port to bind to (0 picks a free port). Defaults to 0.
+            latency (float): seconds added before every response. Defaults to 0.
+            jitter (float): standard deviation in seconds of random latency on top. Defaults to 0.
+            error_rate (float): share of requests answered with a 503. Defaults to 0.
+            seed (int): seed for the jitter and errors, for repeatable runs. Defaults to None.
+        """
+
+        host = kwargs.pop('host', '127.0.0.1')
+        port = kwargs.pop('port', 0)
+        self.pages = pages
+        self.latency = kwargs.pop('latency', 0)
+        self.jitter = kwargs.pop('jitter', 0)
+        self.error_rate = kwargs.pop('error_rate', 0)
+        self.random = random.Random(kwargs.pop('seed', None))
+        self._lock = threading.Lock()
+        # count of requests by page type, and the errors served
+        self.requests = {}
+        self.errors = 0
+
+        super().__init__((host, port), StandInHandler)
+
+    @property
+    def base_url(self):
+        return 'http://' + self.server_address[0] + ':' + str(self.server_address[1]) + '/'
+
+    def draw(self):
+        # the delay and whether to fail a request (random.Random isn't thread safe)
+        with self._lock:
+            delay = max(0, self.latency + self.random.gauss(0, self.jitter)) if self.jitter > 0 else self.latency
+            fail = self.random.random() < self.error_rate
+        return delay, fail
+
+    def count(self, kind: str, fail: bool):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            if fail:
+                self.errors = self.errors + 1
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        kind = fx.page_type(self.path)
+        delay, fail = server.draw()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        server.count(kind, fail)
+
+        # unknown url, or a random failure
+        if kind is None or kind not in server.pages:
+            status, content = 404, b'<html><body>Page not found</body></html>'
+        elif fail:
+            status, content = 503, b'<html><body>Service unavailable</body></html>'
+        else:
+            status, content = 200, server.pages[kind]
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        # keep benchmark output clean
+        pass
+
+def start_server(pages = None, **kwargs):
+    """
+    Starts the stand-in server on a background thread
+
+    Args:
+        pages (dict, optional): page type -> page content. Defaults to fixtures.load_pages().
+
+    Kwargs:
+        see StandInServer
+
+    Returns:
+        StandInServer: the running server, stop it with server.shutdown()
+    """
+
+    if pages is None:
+        pages = fx.load_pages()
+
+    server = StandInServer(pages, **kwargs)
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Serve fixture pages at PCS url shapes')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8000)
+    parser.add_argument('--latency', type = float, default = 0, help = 'seconds added to every response')
+    parser.add_argument('--jitter', type = float, default = 0, help = 'standard deviation of extra latency in seconds')
+    parser.add_argument('--error-rate', type = float, default = 0, help = 'share of requests answered with a 503')
+    parser.add_argument('--pages', default = None, help = "directory of captured pages named '<page type>.html'")
+    args = parser.parse_args()
+
+    server = StandInServer(fx.load_pages(args.pages), host = args.host, port = args.port,
+                           latency = args.latency, jitter = args.jitter, error_rate = args.error_rate)
+    print('Serving PCS stand-in at ' + server.base_url)
+    print('Point pcs_scraper at it with: request_management.set_base_url(' + repr(server.base_url) + ')')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
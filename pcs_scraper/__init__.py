@@ -1,9 +1,60 @@
-from . import race
-from .race import Race
-from . import rider
-from .rider import Rider
-from . import team
-from .team import Team
-
-from . import utility
-from .utility.input_options import *
\ No newline at end of file
+import importlib
+
+### Submodules & classes are loaded on first use (PEP 562) so `import pcs_scraper` doesn't pull in pandas/bs4/requests
+
+# attribute -> (submodule, name in the submodule or None for the submodule itself)
+_lazy_attributes = {'race':('.race', None),
+                    'Race':('.race', 'Race'),
+                    'rider':('.rider', None),
+                    'Rider':('.rider', 'Rider'),
+                    'team':('.team', None),
+                    'Team':('.team', 'Team'),
+                    'jobs':('.jobs', None),
+                    'CrawlJob':('.jobs', 'CrawlJob'),
+                    'season':('.season', None),
+                    'scrape_season':('.season', 'scrape_season'),
+                    'crawler':('.crawler', None),
+                    'crawl_entities':('.crawler', 'crawl_entities'),
+                    'stage_matrix':('.stage_matrix', None),
+                    'StageMatrix':('.stage_matrix', 'StageMatrix'),
+                    'head_to_head':('.head_to_head', None),
+                    'race_index':('.race_index', None),
+                    'RaceIndex':('.race_index', 'RaceIndex'),
+                    'names':('.names', None),
+                    'NameIndex':('.names', 'NameIndex'),
+                    'utility':('.utility', None),
+                    'PageNotFoundError':('.utility.request_management', 'PageNotFoundError'),
+                    # useful input options
+                    'selectable_race_circuits':('.utility.input_options', 'selectable_race_circuits'),
+                    'selectable_race_classifications':('.utility.input_options', 'selectable_race_classifications'),
+                    'race_options_by_year':('.utility.input_options', 'race_options_by_year'),
+                    'race_options_by_years':('.utility.input_options', 'race_options_by_years'),
+                    'teams_by_year':('.utility.input_options', 'teams_by_year')}
+
+__all__ = list(_lazy_attributes)
+
+def __getattr__(name: str):
+    """
+    Imports the submodule holding `name` the first time it's accessed
+
+    Args:
+        name (str): the attribute requested
+
+    Returns:
+        the submodule, class or function
+    """
+
+    if name not in _lazy_attributes:
+        raise AttributeError("module 'pcs_scraper' has no attribute " + repr(name))
+
+    module_name, attribute = _lazy_attributes[name]
+    module = importlib.import_module(module_name, __name__)
+    value = module if attribute is None else getattr(module, attribute)
+
+    # cache on the package so __getattr__ is only hit once per name
+    globals()[name] = value
+
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,206 @@
+# general imports
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+# pcs-py specific imports
+from .race import Race
+from .rider import Rider
+from .team import Team
+
+def crawl_entities(seeds: list, **kwargs):
+    """
+    Breadth-first crawl of the rider/team graph starting from races, riders or teams
+    Links followed:
+        - race -> riders and teams on the startlist (Race.get_startlist())
+        - rider -> teams of each season (Rider.get_team_history())
+        - team -> riders on the roster (Team.get_riders())
+        - team -> the same team in other years (Team.get_name_history())
+    Every page is visited once, keyed on the href the parsers extract
+
+    Args:
+        seeds (list): hrefs to start from, in the format the parsers return them
+            - ie. 'race/tour-de-france/2021', 'rider/tadej-pogacar', 'team/ineos-grenadiers-2021'
+
+    Kwargs:
+        depth (int): how many links away from the seeds to go. Defaults to 2.
+        entities (list): the kinds of entity to follow, any of ['rider', 'team']. Defaults to both.
+        years (list): only follow teams from these years (ie. [2021] for a single season). Defaults to all years.
+        name_history (bool): follow the team -> team in other years links. Defaults to True.
+        node_filter (callable): called as node_filter(kind, href), return False to not follow an entity
+        max_workers (int): the most pages to request at the same time. Defaults to 8.
+
+    Returns:
+        dict: the graph as dataframes
+            - keys = {'nodes', 'edges', 'errors'}
+                - nodes columns = ['href', 'kind', 'pcs_name', 'pcs_year', 'depth']
+                - edges columns = ['source', 'target', 'relation']
+                - errors columns = ['href', 'kind', 'error']
+    """
+
+    # set the kwargs
+    depth = kwargs.pop('depth', 2)
+    entities = kwargs.pop('entities', ['rider', 'team'])
+    years = kwargs.pop('years', None)
+    name_history = kwargs.pop('name_history', True)
+    node_filter = kwargs.pop('node_filter', None)
+    max_workers = kwargs.pop('max_workers', 8)
+
+    if years is not None:
+        years = [str(year) for year in years]
+
+    def follow(href):
+        # whether a linked entity gets added to the frontier
+        kind = href_kind(href)
+        if kind not in entities:
+            return False
+        if kind == 'team' and years is not None and href[-4:] not in years:
+            return False
+        if node_filter is not None and node_filter(kind, href) == False:
+            return False
+        return True
+
+    # the seeds are the first frontier
+    frontier = [normalize_href(href) for href in seeds]
+    visited = set(frontier)
+
+    # preset empty lists
+    nodes = []
+    edges = []
+    errors = []
+
+    # expand one level of the graph at a time
+    with ThreadPoolExecutor(max_workers = max_workers) as pool:
+        for level in range(depth + 1):
+            # record the nodes at this level
+            for href in frontier:
+                kind = href_kind(href)
+                nodes = nodes + [[href, kind] + href_pcs_name_year(href) + [level]]
+
+            # the last level is only recorded, not expanded
+            if level == depth or len(frontier) == 0:
+                break
+
+            # request every page of the frontier at the same time
+            next_frontier = []
+            for href, links, error in pool.map(lambda x: expand(x, name_history), frontier):
+                if error is not None:
+                    errors = errors + [[href, href_kind(href), repr(error)]]
+                    continue
+                for target, relation in links:
+                    if not follow(target):
+                        continue
+                    edges = edges + [[href, target, relation]]
+                    # only visit each page once
+                    if target not in visited:
+                        visited.add(target)
+                        next_frontier = next_frontier + [target]
+
+            frontier = next_frontier
+
+    # convert to dataframes
+    graph = {'nodes':pd.DataFrame(data = nodes,
+                                  columns = ['href', 'kind', 'pcs_name', 'pcs_year', 'depth']),
+             'edges':pd.DataFrame(data = edges,
+                                  columns = ['source', 'target', 'relation']).drop_duplicates().reset_index(drop = True),
+             'errors':pd.DataFrame(data = errors,
+                                   columns = ['href', 'kind', 'error'])}
+
+    return graph
+
+def expand(href: str, name_history = True):
+    """
+    Requests the page(s) of an entity and returns the hrefs it links to
+
+    Args:
+        href (str): the href of the entity
+        name_history (bool, optional): include a team's name history. Defaults to True.
+
+    Returns:
+        tuple: (href, list of (linked href, relation), exception or None)
+    """
+
+    kind = href_kind(href)
+    pcs_name, pcs_year = href_pcs_name_year(href)
+
+    # preset empty list
+    links = []
+
+    try:
+        if kind == 'race':
+            startlist = Race(pcs_name, pcs_year).get_startlist()
+            links = links + [(x, 'startlist_rider') for x in startlist.loc[:, 'rider_href']]
+            links = links + [(x, 'startlist_team') for x in startlist.loc[:, 'team_href'].unique()]
+        elif kind == 'rider':
+            teams = Rider(pcs_name).get_team_history()
+            links = links + [(x, 'team_history') for x in teams.loc[:, 'team_href']]
+        elif kind == 'team':
+            team = Team(pcs_name, pcs_year)
+            links = links + [(x, 'roster') for x in team.get_riders().loc[:, 'rider_href']]
+            if name_history == True:
+                links = links + [(x, 'name_history') for x in team.get_name_history().loc[:, 'team_href'] if x != href]
+    except Exception as err:
+        return href, [], err
+
+    # small races/nat champs have no team link
+    links = [(target, relation) for target, relation in links if target != 'N/A']
+
+    return href, links, None
+
+def normalize_href(href: str):
+    """
+    Cuts an href down to the part that identifies the entity
+    - ie. 'race/tour-de-france/2021/gc' -> 'race/tour-de-france/2021'
+
+    Args:
+        href (str): the href
+
+    Returns:
+        str: the entity href
+    """
+
+    href = href.strip('/')
+    # the pcs website url can be included
+    if href.startswith('https://www.procyclingstats.com/'):
+        href = href[len('https://www.procyclingstats.com/'):]
+
+    if href_kind(href) == 'race':
+        href = '/'.join(href.split('/')[:3])
+    else:
+        href = '/'.join(href.split('/')[:2])
+
+    return href
+
+def href_kind(href: str):
+    """
+    The kind of entity an href links to
+
+    Args:
+        href (str): the href
+
+    Returns:
+        str: one of 'race', 'rider', 'team'
+    """
+
+    return href.split('/')[0]
+
+def href_pcs_name_year(href: str):
+    """
+    Splits an href into the pcs name and year of the entity
+
+    Args:
+        href (str): the href
+
+    Returns:
+        list: [pcs_name, pcs_year] (pcs_year is '' for riders)
+    """
+
+    kind = href_kind(href)
+
+    if kind == 'race':
+        parts = href.split('/')
+        out = [parts[1], parts[2]]
+    elif kind == 'team':
+        out = [href[5:-5], href[-4:]]
+    else:
+        out = [href[6:], '']
+
+    return out
@@ -0,0 +1,106 @@
+# general imports
+import numpy as np
+import pandas as pd
+
+### Pairwise head to head records of riders from their race histories
+# results are aligned on race_href into a riders x results rank matrix, so every pair of riders
+# is compared in one vectorized step per rider instead of looping over pairs and races
+
+def rank_matrix(histories: dict):
+    """
+    Aligns the riders' race histories into a riders x results matrix of finishing positions
+
+    Args:
+        histories (dict): rider pcs_name -> pd.DataFrame from Rider.get_race_history()
+
+    Returns:
+        tuple: (riders, results, ranks)
+            - riders (list): the pcs_name of each row
+            - results (list): the race_href of each column (only results at least 2 of the riders have a placing in)
+            - ranks (np.ndarray): float64 riders x results, the position of the rider (nan if not placed/not in it)
+    """
+
+    riders = list(histories)
+
+    # preset empty lists of every placing
+    rows = []
+    hrefs = []
+    places = []
+
+    for i, rider in enumerate(riders):
+        history = histories[rider]
+        # 'DNF', 'DNS', '-' etc. aren't placings
+        place = pd.to_numeric(history.loc[:, 'result'], errors = 'coerce').to_numpy(dtype = np.float64)
+        placed = ~np.isnan(place)
+        rows = rows + [np.full(placed.sum(), i)]
+        hrefs = hrefs + [history.loc[:, 'race_href'].to_numpy(dtype = object)[placed]]
+        places = places + [place[placed]]
+
+    if len(riders) == 0:
+        return riders, [], np.zeros((0, 0))
+
+    rows = np.concatenate(rows)
+    places = np.concatenate(places)
+    columns, results = pd.factorize(np.concatenate(hrefs))
+
+    # only results shared by at least 2 riders can be part of a head to head
+    # (a rider can have the same race_href twice, ie. a stage that's also the last stage)
+    rider_results = np.unique(rows * len(results) + columns)
+    shared = np.bincount(rider_results % max(len(results), 1), minlength = len(results)) >= 2
+    keep = shared[columns]
+    new_column = np.cumsum(shared) - 1
+
+    ranks = np.full((len(riders), int(shared.sum())), np.nan)
+    ranks[rows[keep], new_column[columns[keep]]] = places[keep]
+
+    return riders, list(results[shared]), ranks
+
+def head_to_head(histories: dict, min_shared = 1):
+    """
+    Head to head record of every pair of riders over the results they both have a placing in
+
+    Args:
+        histories (dict): rider pcs_name -> pd.DataFrame from Rider.get_race_history() (filter them first to compare ie. only some seasons)
+        min_shared (int, optional): leave out pairs with fewer results in common. Defaults to 1.
+
+    Returns:
+        pd.DataFrame: one row per pair of riders, most shared results first
+            - columns = ['rider_a', 'rider_b', 'shared', 'a_ahead', 'b_ahead', 'median_place_gap']
+            - median_place_gap is the median of rider_a's position - rider_b's position, in places not time (negative when rider_a is usually ahead)
+    """
+
+    riders, results, ranks = rank_matrix(histories)
+    placed = ~np.isnan(ranks)
+
+    # results in common for every pair in one matrix product
+    shared = placed.astype(np.float64) @ placed.T.astype(np.float64)
+
+    # preset the pair matrices
+    ahead = np.zeros((len(riders), len(riders)))
+    median_place_gap = np.full((len(riders), len(riders)), np.nan)
+
+    # each rider against every other rider at once (nan comparisons are False)
+    for i in range(len(riders)):
+        ahead[i, :] = (ranks[i, :] < ranks).sum(axis = 1)
+        # only riders that shared a result with rider i need a median
+        others = np.flatnonzero(shared[i, :] > 0)
+        if len(others) > 0:
+            columns = np.flatnonzero(placed[i, :])
+            gaps = ranks[i, columns] - ranks[np.ix_(others, columns)]
+            median_place_gap[i, others] = np.nanmedian(gaps, axis = 1)
+
+    # every pair once
+    a, b = np.triu_indices(len(riders), k = 1)
+    keep = shared[a, b] >= max(min_shared, 1)
+    a, b = a[keep], b[keep]
+
+    pairs = pd.DataFrame({'rider_a':np.array(riders, dtype = object)[a],
+                          'rider_b':np.array(riders, dtype = object)[b],
+                          'shared':shared[a, b].astype(int),
+                          'a_ahead':ahead[a, b].astype(int),
+                          'b_ahead':ahead[b, a].astype(int),
+                          'median_place_gap':median_place_gap[a, b]})
+
+    pairs = pairs.sort_values(by = 'shared', ascending = False, kind = 'stable').reset_index(drop = True)
+
+    return pairs
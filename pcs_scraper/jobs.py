@@ -0,0 +1,300 @@
+# general imports
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+# pcs-py specific imports
+from .race import Race
+from .rider import Rider
+from .team import Team
+from .utility import url_management as mgt
+from .utility import request_management as rqm
+
+# the statuses a unit of work can be journaled with
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+QUARANTINED = 'quarantined'
+
+class CrawlJob:
+    def __init__(self, units: list, journal_path: str, output_dir: str, **kwargs):
+        """
+        Initiates a resumable bulk crawl over a list of work units
+        Every change of a unit's status is appended to a journal on disk, so re-creating the job
+        with the same journal after a crash/interrupt only runs the units that haven't finished
+
+        Args:
+            units (list): the work list, each item a dict describing one unit of work
+                - race units: {'race': 'tour-de-france', 'year': 2021}
+                    - optional 'stage': 'stage-1' (the pcs_stage_name, see Race.get_stages())
+                - rider units: {'rider': 'tadej-pogacar'}
+                - team units: {'team': 'ineos-grenadiers', 'year': 2021}
+                - optional 'method' key to choose which method of the class is called
+                    - defaults: Race.get_results(), Race.get_stage_result(stage),
+                                Rider.get_race_history(), Team.get_riders()
+                - optional 'kwargs' key passed through to the method (ie. {'season': 2021})
+            journal_path (str): path to the journal file (created if it doesn't exist)
+            output_dir (str): directory the output of each unit is written to as csv
+
+        Kwargs:
+            max_workers (int): the number of units run at the same time. Defaults to 4.
+            max_attempts (int): attempts before a unit is quarantined. Defaults to 3.
+                - a unit whose page doesn't exist (rqm.PageNotFoundError) is quarantined straight away
+            backoff (float): seconds to wait before the first retry, doubled each retry. Defaults to 1.
+        """
+
+        # set the kwargs
+        self.max_workers = kwargs.pop('max_workers', 4)
+        self.max_attempts = kwargs.pop('max_attempts', 3)
+        self.backoff = kwargs.pop('backoff', 1)
+
+        # the units keyed by their journal key (also removes duplicate units)
+        self.units = {unit_key(unit):unit for unit in units}
+        self.journal_path = journal_path
+        self.output_dir = output_dir
+        # make sure the output directory exists
+        os.makedirs(self.output_dir, exist_ok = True)
+        # lock so multiple workers don't write over each other in the journal
+        self._lock = threading.Lock()
+        # replay the journal to find where the job stopped
+        self.state = read_journal(self.journal_path)
+
+    def run(self, retry_quarantined = False):
+        """
+        Runs every unit that isn't done (or quarantined) on the worker pool
+
+        Args:
+            retry_quarantined (bool, optional): give quarantined units a fresh set of attempts. Defaults to False.
+
+        Returns:
+            pd.DataFrame: the status of each unit after the run, see status()
+        """
+
+        # preset empty list of units to run
+        to_run = []
+
+        # loop through the units, skipping what has already been handled
+        for key in self.units:
+            status = self.state.get(key, {}).get('status', PENDING)
+            if status == DONE:
+                continue
+            elif status == QUARANTINED:
+                if retry_quarantined == False:
+                    continue
+                # reset the attempts so the unit can be tried again
+                self.state[key]['attempts'] = 0
+            to_run = to_run + [key]
+
+        # run the units on the worker pool
+        with ThreadPoolExecutor(max_workers = self.max_workers) as pool:
+            list(pool.map(self._run_unit, to_run))
+
+        return self.status()
+
+    def status(self):
+        """
+        Returns the status of every unit in the job
+
+        Returns:
+            pd.DataFrame: columns = ['unit', 'status', 'attempts', 'output', 'error']
+        """
+
+        # preset empty list
+        rows = []
+
+        # loop through the units in order they were given
+        for key in self.units:
+            entry = self.state.get(key, {})
+            rows = rows + [[key,
+                            entry.get('status', PENDING), entry.get('attempts', 0),
+                            entry.get('output', ''), entry.get('error', '')]]
+
+        # convert to dataframe
+        status_frame = pd.DataFrame(data = rows,
+                                    columns = ['unit', 'status', 'attempts', 'output', 'error'])
+
+        return status_frame
+
+    def _run_unit(self, key: str):
+        """
+        Runs a single unit, retrying with exponential backoff until it succeeds or is quarantined
+
+        Args:
+            key (str): the journal key of the unit
+        """
+
+        unit = self.units[key]
+        attempts = self.state.get(key, {}).get('attempts', 0)
+
+        # the job died during the last attempt, there are none left to retry with
+        if attempts >= self.max_attempts:
+            error = self.state.get(key, {}).get('error', '') or 'interrupted during the last attempt'
+            self._journal(key, status = QUARANTINED, attempts = attempts, error = error)
+            return
+
+        # keep trying until the unit runs out of attempts
+        while attempts < self.max_attempts:
+            attempts = attempts + 1
+            self._journal(key, status = RUNNING, attempts = attempts)
+            try:
+                frame = run_unit(unit)
+                # write the output before marking as done, so a done unit always has its file
+                output = os.path.join(self.output_dir, key.replace('/', '__') + '.csv')
+                temp = output + '.tmp'
+                frame.to_csv(temp, index = False)
+                os.replace(temp, output)
+                self._journal(key, status = DONE, attempts = attempts, output = output)
+                return
+            except Exception as err:
+                error = type(err).__name__ + ': ' + str(err)
+                # out of attempts (or retrying won't help), quarantine the unit
+                if attempts >= self.max_attempts or isinstance(err, rqm.PageNotFoundError):
+                    self._journal(key, status = QUARANTINED, attempts = attempts, error = error)
+                    return
+                self._journal(key, status = FAILED, attempts = attempts, error = error)
+                # wait longer after every failure
+                time.sleep(self.backoff * 2 ** (attempts - 1))
+
+    def _journal(self, key: str, **entry):
+        """
+        Appends the new state of a unit to the journal and syncs it to disk
+
+        Args:
+            key (str): the journal key of the unit
+        """
+
+        entry['unit'] = key
+        entry['time'] = time.time()
+
+        with self._lock:
+            self.state[key] = entry
+            with open(self.journal_path, 'a') as journal:
+                journal.write(json.dumps(entry) + '\n')
+                journal.flush()
+                os.fsync(journal.fileno())
+
+def unit_key(unit: dict):
+    """
+    Creates the key a unit of work is journaled under
+
+    Args:
+        unit (dict): the unit of work, see CrawlJob
+
+    Returns:
+        str: ie. 'race/tour-de-france/2021/stage-1/get_stage_result' or 'rider/tadej-pogacar/get_race_history'
+    """
+
+    # the parts of the key depend on the type of unit
+    if 'race' in unit:
+        parts = ['race', mgt.test_pcs_name(unit['race']), str(unit['year'])]
+        if 'stage' in unit:
+            parts = parts + [unit['stage']]
+    elif 'rider' in unit:
+        parts = ['rider', mgt.test_pcs_name(unit['rider'])]
+    elif 'team' in unit:
+        parts = ['team', mgt.test_pcs_name(unit['team']), str(unit['year'])]
+    else:
+        raise ValueError('Unit needs one of race, rider or team: ' + str(unit))
+
+    # method and its kwargs make the unit unique as well
+    parts = parts + [unit_method(unit)]
+    kwargs = unit.get('kwargs', {})
+    if len(kwargs) > 0:
+        parts = parts + [k + '=' + str(kwargs[k]) for k in sorted(kwargs)]
+
+    return '/'.join(parts)
+
+def unit_method(unit: dict):
+    """
+    The name of the method called for the unit
+
+    Args:
+        unit (dict): the unit of work, see CrawlJob
+
+    Returns:
+        str: the method name
+    """
+
+    if 'method' in unit:
+        method = unit['method']
+    elif 'race' in unit and 'stage' in unit:
+        method = 'get_stage_result'
+    elif 'race' in unit:
+        method = 'get_results'
+    elif 'rider' in unit:
+        method = 'get_race_history'
+    else:
+        method = 'get_riders'
+
+    return method
+
+def run_unit(unit: dict):
+    """
+    Executes a unit of work against the public api
+
+    Args:
+        unit (dict): the unit of work, see CrawlJob
+
+    Returns:
+        pd.DataFrame: the output of the unit
+    """
+
+    kwargs = unit.get('kwargs', {})
+
+    # construct the object of interest
+    if 'race' in unit:
+        obj = Race(unit['race'], unit['year'])
+    elif 'rider' in unit:
+        obj = Rider(unit['rider'])
+    else:
+        obj = Team(unit['team'], unit['year'])
+
+    # call the method, stage methods take the stage as first argument
+    method = getattr(obj, unit_method(unit))
+    if 'stage' in unit:
+        out = method(unit['stage'], **kwargs)
+    else:
+        out = method(**kwargs)
+
+    # some methods return dicts (ie. get_stage_info), store them as a single row
+    if isinstance(out, dict):
+        out = pd.DataFrame(data = [out])
+
+    return out
+
+def read_journal(journal_path: str):
+    """
+    Replays a journal to get the latest state of each unit
+
+    Args:
+        journal_path (str): path to the journal file
+
+    Returns:
+        dict: the latest journal entry of each unit, keyed by unit key
+    """
+
+    # preset empty dict
+    state = {}
+
+    # no journal yet means nothing has run
+    if not os.path.exists(journal_path):
+        return state
+
+    with open(journal_path) as journal:
+        for line in journal:
+            # a crash mid-write can leave a partial last line, ignore it
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            state[entry['unit']] = entry
+
+    # a unit that was running when the job died needs to be run again
+    for entry in state.values():
+        if entry['status'] == RUNNING:
+            entry['status'] = FAILED
+
+    return state
@@ -0,0 +1,392 @@
+# general imports
+import bisect
+import difflib
+import unicodedata
+import pandas as pd
+# pcs-py specific imports
+from .race import startlist_from_soup
+from .team import Team
+from .utility import input_options as opt
+from .utility import url_management as mgt
+from .utility import request_management as rqm
+
+### Offline index resolving free text names of riders, teams and races to their pcs_name
+# every name is stored under a normalised key in a sorted array, so exact lookups are a dict hit,
+# prefix lookups are a binary search and fuzzy lookups only compare against the keys
+
+# the kinds of entities in the index
+KINDS = ['rider', 'team', 'race']
+
+class NameIndex:
+    def __init__(self):
+        """
+        Initiates an empty name index, fill it with build(), add_frame() or add()
+        """
+
+        # (kind, pcs_name) -> {'name': printed name, 'aliases': other printed names, 'years': set of years seen}
+        self.entries = {}
+        # normalised key -> set of (kind, pcs_name)
+        self.keys = {}
+        # the keys in sorted order for prefix search (rebuilt after adding)
+        self._sorted_keys = None
+
+    @classmethod
+    def build(cls, years: list, **kwargs):
+        """
+        Builds an index from the race calendars and team lists of the given years
+
+        Args:
+            years (list): the years to include
+
+        Kwargs:
+            gender (str): the gender of the teams, see teams_by_year(). Defaults to 'M'.
+            startlists (bool): also add the riders/teams of every race's startlist (1 request per race). Defaults to False.
+            rosters (bool): also add the riders of every team (1 request per team). Defaults to False.
+            max_workers (int): the most pages to request at the same time. Defaults to 8.
+
+        Returns:
+            NameIndex: the index
+        """
+
+        # set the kwargs
+        gender = kwargs.pop('gender', 'M')
+        startlists = kwargs.pop('startlists', False)
+        rosters = kwargs.pop('rosters', False)
+        max_workers = kwargs.pop('max_workers', 8)
+
+        index = cls()
+
+        # the calendars & team lists of every year
+        calendars = rqm.call_many(opt.race_options_by_year, [(year,) for year in years], max_workers)
+        team_lists = rqm.call_many(opt.teams_by_year, [(year, gender) for year in years], max_workers)
+
+        # preset empty lists of the pages to request next
+        races = []
+        teams = []
+
+        for year, calendar, team_list in zip(years, calendars, team_lists):
+            if isinstance(calendar, pd.DataFrame):
+                index.add_frame(calendar, 'race')
+                races = races + [(pcs_name, year) for pcs_name in calendar.loc[:, 'race_pcs_name']]
+            if isinstance(team_list, pd.DataFrame):
+                index.add_frame(team_list, 'team')
+                teams = teams + [(pcs_name, year) for pcs_name in team_list.loc[:, 'team_pcs_name']]
+
+        if startlists:
+            # straight to the startlist page, Race() would request the race's overview page first
+            for out in rqm.call_many(lambda name, year: startlist_from_soup(rqm.get_soup(mgt.race_url(name, year, suffix = 'startlist'))),
+                                     races, max_workers):
+                if isinstance(out, pd.DataFrame):
+                    index.add_frame(out, 'rider')
+                    index.add_frame(out, 'team')
+
+        if rosters:
+            for out in rqm.call_many(lambda name, year: Team(name, year).get_riders(), teams, max_workers):
+                if isinstance(out, pd.DataFrame):
+                    index.add_frame(out, 'rider')
+
+        return index
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Loads an index saved with save()
+
+        Args:
+            path (str): the csv file
+
+        Returns:
+            NameIndex: the index
+        """
+
+        index = cls()
+        frame = pd.read_csv(path, dtype = str, keep_default_na = False)
+
+        for kind, pcs_name, name, aliases, years in frame.itertuples(index = False):
+            index.add(kind, pcs_name, name)
+            for alias in aliases.split(';'):
+                if alias != '':
+                    index.add(kind, pcs_name, alias)
+            for year in years.split(';'):
+                if year != '':
+                    index.add(kind, pcs_name, name, year)
+
+        return index
+
+    def save(self, path: str):
+        """
+        Saves the index as csv
+
+        Args:
+            path (str): the csv file to write
+        """
+
+        self.to_frame().to_csv(path, index = False)
+
+    def to_frame(self):
+        """
+        Returns every entity in the index
+
+        Returns:
+            pd.DataFrame: columns = ['kind', 'pcs_name', 'name', 'aliases', 'years']
+                - aliases are the other names the entity was printed as, joined by ';'
+                - years is the years the entity was seen in, joined by ';'
+        """
+
+        rows = [[kind, pcs_name, entry['name'],
+                 ';'.join(sorted(entry['aliases'])), ';'.join(str(x) for x in sorted(entry['years']))]
+                for (kind, pcs_name), entry in self.entries.items()]
+
+        frame = pd.DataFrame(data = rows,
+                             columns = ['kind', 'pcs_name', 'name', 'aliases', 'years'])
+
+        return frame
+
+    def add(self, kind: str, pcs_name: str, name: str, year = None):
+        """
+        Adds one entity to the index
+
+        Args:
+            kind (str): one of 'rider', 'team', 'race'
+            pcs_name (str): the name of the entity in its PCS url (ie. 'benjamin-thomas-2')
+            name (str): the printed name (ie. 'Benjamin Thomas')
+            year (int, optional): a year the entity was seen in. Defaults to None.
+        """
+
+        if kind not in KINDS:
+            raise ValueError('kind must be one of ' + str(KINDS) + ', not ' + repr(kind))
+
+        entry = self.entries.get((kind, pcs_name))
+        if entry is None:
+            entry = {'name':name, 'aliases':set(), 'years':set()}
+            self.entries[(kind, pcs_name)] = entry
+        elif name != entry['name']:
+            entry['aliases'].add(name)
+        if year is not None:
+            entry['years'].add(int(year))
+
+        # the entity can be found by its pcs_name and its printed name in any word order
+        for key in [name_key(pcs_name)] + name_variants(name):
+            if key == '':
+                continue
+            if key not in self.keys:
+                self.keys[key] = set()
+                self._sorted_keys = None
+            self.keys[key].add((kind, pcs_name))
+
+    def add_frame(self, frame: pd.DataFrame, kind: str):
+        """
+        Adds the entities of a frame returned by the package (ie. get_startlist(), teams_by_year())
+
+        Args:
+            frame (pd.DataFrame): must have the '<kind>_name' column and either '<kind>_pcs_name' or 'pcs_name'
+                - '<kind>_pcs_year' is used for the year if it's there
+            kind (str): one of 'rider', 'team', 'race'
+        """
+
+        name_column = kind + '_name'
+        pcs_column = kind + '_pcs_name' if kind + '_pcs_name' in frame.columns else 'pcs_name'
+        year_column = kind + '_pcs_year'
+
+        names = frame.loc[:, name_column]
+        pcs_names = frame.loc[:, pcs_column]
+        years = frame.loc[:, year_column] if year_column in frame.columns else [None] * len(frame)
+
+        for name, pcs_name, year in zip(names, pcs_names, years):
+            # teams missing from smaller races are 'N/A'
+            if pcs_name in ['', 'N/A'] or pd.isna(pcs_name):
+                continue
+            if year in ['', 'N/A'] or (year is not None and pd.isna(year)):
+                year = None
+            self.add(kind, pcs_name, name, year)
+
+    def lookup(self, text: str, kind = None):
+        """
+        Returns the entities whose pcs_name or name exactly matches the text (ignoring case, accents & word order)
+
+        Args:
+            text (str): the name to find
+            kind (str, optional): only return this kind of entity. Defaults to None (any kind).
+
+        Returns:
+            pd.DataFrame: columns = ['kind', 'pcs_name', 'name', 'years', 'score']
+                - an entity whose pcs_name is exactly the text comes first (see pcs_name_matches())
+        """
+
+        exact = self.pcs_name_matches(text, kind)
+        matches = exact + [x for x in sorted(self.keys.get(name_key(text), set())) if x not in exact]
+
+        return self._frame([(x, 1.0) for x in matches], kind)
+
+    def pcs_name_matches(self, text: str, kind = None):
+        """
+        Returns the entities whose pcs_name is exactly the text
+        - a printed name can normalise to another rider's pcs_name (ie. 'Benjamin Thomas' of 'benjamin-thomas-2'
+          is also the key of 'benjamin-thomas'), these are only matched by the name itself
+
+        Args:
+            text (str): the pcs_name
+            kind (str, optional): only return this kind of entity. Defaults to None (any kind).
+
+        Returns:
+            list: the (kind, pcs_name) of each match
+        """
+
+        return [(x, text.strip()) for x in KINDS
+                if (x, text.strip()) in self.entries and (kind is None or x == kind)]
+
+    def prefix(self, text: str, kind = None, limit = 10):
+        """
+        Returns the entities with a pcs_name or name starting with the text (ie. 'pogac')
+
+        Args:
+            text (str): the start of the name
+            kind (str, optional): only return this kind of entity. Defaults to None (any kind).
+            limit (int, optional): the most entities to return. Defaults to 10.
+
+        Returns:
+            pd.DataFrame: columns = ['kind', 'pcs_name', 'name', 'years', 'score'], in order of the matching key
+        """
+
+        key = name_key(text)
+        sorted_keys = self.sorted_keys()
+
+        # preset empty list
+        matches = []
+
+        # binary search to the first key with the prefix, then walk forward while they share it
+        i = bisect.bisect_left(sorted_keys, key)
+        while i < len(sorted_keys) and sorted_keys[i].startswith(key) and len(matches) < limit:
+            for match in sorted(self.keys[sorted_keys[i]]):
+                if match not in [x for x, _ in matches] and (kind is None or match[0] == kind):
+                    matches = matches + [(match, 1.0)]
+            i = i + 1
+
+        return self._frame(matches[:limit], kind)
+
+    def fuzzy(self, text: str, kind = None, limit = 10, cutoff = 0.75):
+        """
+        Returns the entities with a pcs_name or name close to the text (ie. misspelled or missing accents)
+
+        Args:
+            text (str): the name to find
+            kind (str, optional): only return this kind of entity. Defaults to None (any kind).
+            limit (int, optional): the most entities to return. Defaults to 10.
+            cutoff (float, optional): the lowest similarity (0-1) to return. Defaults to 0.75.
+
+        Returns:
+            pd.DataFrame: columns = ['kind', 'pcs_name', 'name', 'years', 'score'], most similar first
+        """
+
+        key = name_key(text)
+
+        # preset empty list
+        matches = []
+
+        # more keys than limit as several keys point at the same entity
+        for close in difflib.get_close_matches(key, self.sorted_keys(), n = limit * 4, cutoff = cutoff):
+            score = difflib.SequenceMatcher(None, key, close).ratio()
+            for match in sorted(self.keys[close]):
+                if match not in [x for x, _ in matches] and (kind is None or match[0] == kind):
+                    matches = matches + [(match, score)]
+
+        return self._frame(matches[:limit], kind)
+
+    def resolve(self, text: str, kind = None):
+        """
+        Resolves free text to a single pcs_name, trying an exact pcs_name, then an exact match, then a unique prefix match,
+        then the closest fuzzy match
+
+        Args:
+            text (str): the name to resolve
+            kind (str, optional): the kind of entity. Defaults to None (any kind).
+
+        Returns:
+            str: the pcs_name
+
+        Raises:
+            KeyError: nothing in the index matches
+            ValueError: several entities match (ie. 'Benjamin Thomas'), the error lists them
+        """
+
+        # an exact pcs_name wins over printed names that normalise to the same key
+        exact = self.pcs_name_matches(text, kind)
+        if len(exact) == 1:
+            return exact[0][1]
+
+        # several entities share the name (or the start of it)
+        for matches in [self.lookup(text, kind), self.prefix(text, kind, limit = 10)]:
+            if len(matches) == 1:
+                return matches.loc[0, 'pcs_name']
+            elif len(matches) > 1:
+                raise ValueError(text + ' is ambiguous: ' + ', '.join(matches.loc[:, 'pcs_name']))
+
+        matches = self.fuzzy(text, kind, limit = 1)
+        if len(matches) == 1:
+            return matches.loc[0, 'pcs_name']
+
+        raise KeyError(text)
+
+    def sorted_keys(self):
+        """
+        Returns every key in the index in sorted order
+
+        Returns:
+            list: the sorted keys
+        """
+
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self.keys)
+
+        return self._sorted_keys
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, text):
+        return name_key(text) in self.keys
+
+    def _frame(self, matches: list, kind):
+        # frame of ((kind, pcs_name), score) matches
+        rows = [[match_kind, pcs_name, self.entries[(match_kind, pcs_name)]['name'],
+                 ';'.join(str(x) for x in sorted(self.entries[(match_kind, pcs_name)]['years'])), score]
+                for (match_kind, pcs_name), score in matches if kind is None or match_kind == kind]
+
+        frame = pd.DataFrame(data = rows,
+                             columns = ['kind', 'pcs_name', 'name', 'years', 'score'])
+
+        return frame
+
+def name_key(text: str):
+    """
+    Normalises a name for the index: no accents, lowercase, words joined by '-' (ie. 'POGAČAR Tadej' -> 'pogacar-tadej')
+
+    Args:
+        text (str): the name
+
+    Returns:
+        str: the key
+    """
+
+    # split accented letters into letter + accent and drop the accents
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(x for x in text if not unicodedata.combining(x)).lower()
+    # anything that isn't a letter or number separates words
+    words = ''.join(x if x.isalnum() else ' ' for x in text).split()
+
+    return '-'.join(words)
+
+def name_variants(name: str):
+    """
+    The keys of a printed name in every word order, so 'Wout van Aert' is found as 'van aert wout' or 'aert wout van'
+
+    Args:
+        name (str): the printed name
+
+    Returns:
+        list: the keys
+    """
+
+    words = name_key(name).split('-')
+
+    return ['-'.join(words[i:] + words[:i]) for i in range(len(words))]
@@ -1,14 +1,23 @@
 # general imports
-import requests as req
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
+import numpy as np
 import pandas as pd
 # pcs-py specific imports
 from .utility import url_management as mgt
+from .utility import request_management as rqm
+from .utility import instrumentation as ins
 from .utility import table_manipulation as tbl
 from .utility import convert_data as cvt
+from .utility import standings as std
+from .stage_matrix import StageMatrix
+from .rider import race_histories
+from . import head_to_head as h2h
 
 # define general race class and it's methods
 class Race:
+    @ins.instrumented
     def __init__(self, name: str, year: int):
         """
         Initiates the Race class and gets html page(s) relevant to race requested
@@ -29,7 +38,7 @@ class Race:
         # returns the url to request
         self.url = mgt.race_url(name, year, suffix = 'overview')
         # get the response from url
-        self.response = req.get(self.url)
+        self.response = rqm.get_page(self.url)
         # create the soup
         self.soup = BeautifulSoup(self.response.content, "html.parser")
         # get the pcs name out of the url
@@ -37,6 +46,31 @@ class Race:
         # set the year as a string
         self.year = str(year)
     
+    @classmethod
+    def many(cls, names: list, years, max_workers = 8):
+        """
+        Creates a Race for each name and year concurrently, sharing one pooled connection to PCS
+
+        Args:
+            names (list): the race names, in any format accepted by Race()
+            years (int/list): the year of every race, or a list with the year of each race
+            max_workers (int, optional): the most races to request at the same time. Defaults to 8.
+
+        Returns:
+            OrderedDict: (name, year) -> Race, in the order of names
+                - if a race couldn't be created the value is the exception that was raised
+        """
+
+        # same year for every race
+        if isinstance(years, int) or isinstance(years, str):
+            years = [years] * len(names)
+
+        keys = list(zip(names, years))
+        races = rqm.call_many(cls, keys, max_workers)
+
+        return OrderedDict(zip(keys, races))
+
+    @ins.instrumented
     def get_general_info(self):
         """
         Return general information about the race 
@@ -70,6 +104,7 @@ class Race:
         
         return general_info
     
+    @ins.instrumented
     def get_printed_name(self):
         """
         Gets the printed name of the race from preview page
@@ -87,6 +122,7 @@ class Race:
         
         return printed_name
     
+    @ins.instrumented
     def get_edition(self):
         """
         Gets the edition of the race according to PCS
@@ -104,6 +140,7 @@ class Race:
         
         return edition
     
+    @ins.instrumented
     def get_race_classification(self):
         """
         Gets the race classification from the title of the race
@@ -124,6 +161,7 @@ class Race:
         
         return classification
     
+    @ins.instrumented
     def get_start_date(self):
         """
         Gets the first day of the race 
@@ -141,6 +179,7 @@ class Race:
         
         return start_date
     
+    @ins.instrumented
     def get_end_date(self):
         """
         Gets the last day of the race
@@ -158,6 +197,7 @@ class Race:
 
         return end_date
     
+    @ins.instrumented
     def get_num_stages(self):
         """
         Gets the number of stages
@@ -186,6 +226,7 @@ class Race:
         
         return num_stages
      
+    @ins.instrumented
     def get_startlist(self):
         """
         Returns the startlist of a race as a dataframe
@@ -199,47 +240,13 @@ class Race:
         
         # get the soup for startlist page
         url = mgt.race_url(self.pcs_name, self.year, suffix = 'startlist')
-        response = req.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
+        soup = rqm.get_soup(url)
         
-        # the table of teams
-        table = soup.find("ul", class_ = "startlist_v3").find_all("li", class_ = "team")
-        
-        # preset empty list
-        startlist = []
-        
-        # loop through each team
-        for team in table:
-            
-            # find basic team info
-            team_name = team.find("b").find("a").text
-            team_href = team.find("b").find("a", href = True).get('href')
-            team_pcs_name = team_href[5:-5]
-            team_pcs_year = team_href[-4:]
-            
-            # find all riders in team
-            riders = team.find("ul").find_all("li")
-            
-            # loop through each rider
-            for rider in riders:
-                # extract text name and convert to First Last
-                rider_name = rider.find("a").text
-                new_rider_name = cvt.printed_rider_to_first_last(rider_name)
-                
-                # get rider href & pcs name
-                rider_href = rider.find("a", href = True).get('href')
-                rider_pcs_name = rider_href[6:]
-                
-                startlist = startlist + [[team_name, team_href, team_pcs_name, team_pcs_year,
-                                          new_rider_name, rider_href, rider_pcs_name]]
-                
-        # export as dataframe
-        startlist_frame = pd.DataFrame(data = startlist,
-                                       columns = ['team_name', 'team_href', 'team_pcs_name', 'team_pcs_year',
-                                                  'rider_name', 'rider_href', 'rider_pcs_name'])
+        startlist_frame = startlist_from_soup(soup)
         
         return startlist_frame
         
+    @ins.instrumented
     def get_results(self):
         """
         Returns a dataframe of the general race results. 
@@ -261,8 +268,7 @@ class Race:
         
         # get the soup for results page
         url = mgt.race_url(self.pcs_name, self.year)
-        response = req.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
+        soup = rqm.get_soup(url)
         
         # the header of results - all the headers will be the same
         possible_headers = soup.find("div", class_ = "page-content page-object default").find_all("div", class_ = "result-cont")
@@ -313,6 +319,7 @@ class Race:
                 
         return results_frame
     
+    @ins.instrumented
     def get_stages(self):
         """
         Returns a dataframe of the stages in this race and their PCS reference names.
@@ -328,8 +335,7 @@ class Race:
         
         # get the soup for results page
         url = mgt.race_url(self.pcs_name, self.year, suffix = 'stages')
-        response = req.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
+        soup = rqm.get_soup(url)
         
         # the data table
         table = soup.find('div', class_ = "page-content page-object default").find('tbody').find_all('tr')
@@ -377,6 +383,7 @@ class Race:
                                         
         return stages_frame
     
+    @ins.instrumented
     def get_stage_info(self, pcs_stage: str):
         """
         Gets defining details about the stage as a dictionary
@@ -386,71 +393,65 @@ class Race:
 
         Returns:
             dict: a dict with general info about the stage
-                    - keys: ['date', 'start_time', 'distance', 
+                    - keys: ['date', 'start_time_local', 'distance_km', 
                              'parcours_type', 'finish_type', 
                              'profile_score', 'vertical_meters',
                              'startlist_score']
+                    - a key is missing if the page doesn't print it
         """
         
         if pcs_stage == 'one-day-race':
             # get the soup for results page
             url = mgt.race_url(self.pcs_name, self.year)
-            response = req.get(url)
-            soup = BeautifulSoup(response.content, "html.parser")
+            soup = rqm.get_soup(url)
         else:
             # get the soup for results page
             url = mgt.race_url(self.pcs_name, self.year, suffix = pcs_stage)
-            response = req.get(url)
-            soup = BeautifulSoup(response.content, "html.parser")
+            soup = rqm.get_soup(url)
         
-        # the data table
-        table = soup.find('div', class_ = 'w30 right mb_w100').find('ul', class_ = 'infolist').find_all('li')
-        # preset empty dict
-        info = {}
-        
-        # loop through the table rows
-        for i, row in enumerate(table):
-            # if first, it's the date
-            if i == 0:
-                # extract the date and convert to correct format
-                printed_date = row.find_all('div')[1].text
-                info['date'] = cvt.printed_date_to_standard(printed_date)
-            # if second, its the start time
-            elif i == 1:
-                info['start_time_local'] = row.find_all('div')[1].text.split(' ')[0]
-            # fifth = the course distance
-            elif i == 4:
-                info['distance_km'] = row.find_all('div')[1].text.split(' ')[0]
-            # seventh, the parcours and finish
-            elif i == 6:
-                parcours_type = row.find_all('div')[1].find('span').get('class')[-1]
-                if parcours_type == 'p1':
-                    info['parcours_type'] = 'flat'
-                    info['finish_type'] = 'flat'
-                elif parcours_type == 'p2':
-                    info['parcours'] = 'hilly'
-                    info['finish_type'] = 'flat'
-                elif parcours_type == 'p3':
-                    info['parcours_type'] = 'hilly'
-                    info['finish_type'] = 'uphill'
-                elif parcours_type == 'p4':
-                    info['parcours_type'] = 'mountain'
-                    info['finish_type'] = 'flat'
-                elif parcours_type == 'p5':
-                    info['parcours_type'] = 'mountain'
-                    info['finish_type'] = 'uphill'
-            # eighth, profile score
-            elif i == 7:
-                info['profile_score'] = row.find_all('div')[1].text
-            # ninth, vertical meters
-            elif i == 8:
-                info['vertical_meters'] = row.find_all('div')[1].text
-                # thirteenth, how was the race won
-            elif i == 12:
-                info['startlist_score'] = row.find_all('div')[1].text
-
-        return info
+        return stage_info_from_soup(soup)
+    
+    @ins.instrumented
+    def get_all_stage_info(self, max_workers = 4):
+        """
+        Returns the info of every stage in the race (see get_stages()) as one dataframe with typed columns
+        Stages are requested concurrently. The stage pages are the same as get_stage_result()'s, call both inside
+        utility.request_management.shared_pages() (or with a page cache set) so each page is only requested once:
+            with request_management.shared_pages():
+                matrix = race.get_stage_matrix()
+                stage_info = race.get_all_stage_info()
+
+        Args:
+            max_workers (int, optional): the most stages to request at the same time. Defaults to 4.
+
+        Returns:
+            pd.DataFrame: one row per stage in stage order
+                            - columns = ['stage_pcs_name', 'date', 'start_time_local', 'distance_km',
+                                         'parcours_type', 'finish_type',
+                                         'profile_score', 'vertical_meters', 'startlist_score']
+                            - date is a datetime, distance_km/profile_score/vertical_meters/startlist_score are floats (nan if not printed)
+        """
+
+        # share the pages with any other step run in the same shared_pages() block
+        with rqm.shared_pages():
+            # all the stages of the race
+            stages = list(self.get_stages().loc[:, 'stage_pcs_name'])
+
+            # request the stages at the same time
+            with ThreadPoolExecutor(max_workers = max_workers) as pool:
+                infos = list(pool.map(ins.in_context(self.get_stage_info), stages))
+
+        info_frame = pd.DataFrame(data = infos, columns = stage_info_columns)
+        info_frame.insert(0, 'stage_pcs_name', stages)
+
+        # type the columns
+        info_frame = info_frame.assign(date = pd.to_datetime(info_frame.loc[:, 'date'], errors = 'coerce'),
+                                       **{x:pd.to_numeric(info_frame.loc[:, x], errors = 'coerce').astype(np.float64)
+                                          for x in ['distance_km', 'profile_score', 'vertical_meters', 'startlist_score']})
+
+        return info_frame
     
+    @ins.instrumented
     def get_stage_result(self, pcs_stage: str):
         """
         Returns a dataframe of the time-based results from the requested stage
@@ -473,8 +474,7 @@ class Race:
         
         # get the soup for results page
         url = mgt.race_url(self.pcs_name, self.year, suffix = pcs_stage)
-        response = req.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
+        soup = rqm.get_soup(url)
         
         
         if any([x in soup.find("div", class_ = "w68 left mb_w100").find("div").text for x in ["cancelled", "Cancelled",
@@ -523,6 +523,32 @@ class Race:
         
         return stage_result
     
+    @ins.instrumented
+    def iter_stage_results(self, max_workers = 4):
+        """
+        Yields the result of every stage in the race (see get_stages()) as each stage is requested
+        Stages are requested concurrently but yielded in stage order
+
+        Args:
+            max_workers (int, optional): the most stages to request at the same time. Defaults to 4.
+
+        Yields:
+            pd.DataFrame: the stage result, same as get_stage_result() with a leading 'stage_pcs_name' column
+        """
+        
+        # all the stages of the race
+        stages = self.get_stages()
+        
+        # request the stages at the same time
+        with ThreadPoolExecutor(max_workers = max_workers) as pool:
+            for stage_pcs_name, stage_result in zip(stages.loc[:, 'stage_pcs_name'],
+                                                    pool.map(ins.in_context(self.get_stage_result), stages.loc[:, 'stage_pcs_name'])):
+                # tag the rows with the stage they came from
+                stage_result.insert(0, 'stage_pcs_name', stage_pcs_name)
+                
+                yield stage_result
+    
+    @ins.instrumented
     def get_running_gc_time(self, pcs_stage: str):
         """
         Returns a dataframe of the total sum of time accumulated for each rider by the end of the given stage
@@ -545,8 +571,7 @@ class Race:
         
         # get the soup for results page
         url = mgt.race_url(self.pcs_name, self.year, suffix = pcs_stage)
-        response = req.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
+        soup = rqm.get_soup(url)
         
         # get the tabs and find the correct tab index
         restabs = soup.find("div", class_ = "page-content page-object default").find("ul", class_ = "restabs").find_all("li")
@@ -573,6 +598,99 @@ class Race:
         
         return stage_gc
     
+    @ins.instrumented
+    def get_reconstructed_gc(self, pcs_stage = None, **kwargs):
+        """
+        Returns the gc after every stage rebuilt from the stage results (see utility.standings.running_gc())
+        - one vectorized pass over all the stages instead of parsing the gc tab of each stage
+        - stage results don't have time bonuses, pass them as adjustments to match the official gc
+        - same columns & dtypes as get_running_gc_time() (rank is the printed string), but uci_points is always nan:
+          the uci points of the gc are only printed on the gc tab
+
+        Args:
+            pcs_stage (str, optional): only return the gc after this stage, in the format of get_running_gc_time(). Defaults to None (every stage).
+
+        Kwargs:
+            adjustments (pd.DataFrame): seconds to add to a rider's time in a stage, columns = ['stage_pcs_name', 'rider_pcs_name', 'seconds']
+            max_workers (int): the most stages to request at the same time. Defaults to 4.
+
+        Returns:
+            pd.DataFrame: the gc after each stage
+                            - columns: ['stage_pcs_name', 'rank',
+                                        'rider_name', 'rider_href', 'rider_pcs_name',
+                                        'team_name', 'team_href', 'team_pcs_name', 'team_pcs_year',
+                                        'uci_points',
+                                        'time', 'time_gap']
+                            - without 'stage_pcs_name' if pcs_stage is given
+        """
+
+        # set the kwargs
+        adjustments = kwargs.pop('adjustments', None)
+        max_workers = kwargs.pop('max_workers', 4)
+
+        # the results of every stage in one frame (cancelled stages have no rows)
+        stage_results = pd.concat(list(self.iter_stage_results(max_workers)), ignore_index = True)
+
+        gc = std.running_gc(stage_results, adjustments)
+
+        # printed like the gc tab (see get_running_gc_time())
+        gc = gc.assign(rank = gc.loc[:, 'rank'].astype(str))
+        gc.insert(gc.columns.get_loc('time'), 'uci_points', np.nan)
+
+        # just the one stage
+        if pcs_stage is not None:
+            gc = gc.loc[gc.loc[:, 'stage_pcs_name'] == pcs_stage, :].drop(columns = 'stage_pcs_name').reset_index(drop = True)
+
+        return gc
+    
+    def get_stage_matrix(self, max_workers = 4):
+        """
+        Returns every stage result of the race as riders x stages arrays (see stage_matrix.StageMatrix)
+        The stage pages are kept for get_all_stage_info() if both are called inside utility.request_management.shared_pages()
+
+        Args:
+            max_workers (int, optional): the most stages to request at the same time. Defaults to 4.
+
+        Returns:
+            StageMatrix: time, gap, rank & points of every rider in every stage
+        """
+
+        # share the pages with any other step run in the same shared_pages() block
+        with rqm.shared_pages():
+            matrix = StageMatrix.from_race(self, max_workers)
+
+        return matrix
+    
+    @ins.instrumented
+    def get_head_to_head(self, **kwargs):
+        """
+        Returns the head to head record of every pair of riders on the startlist over the results they both placed in
+        - the riders' race histories are requested concurrently and compared with head_to_head.head_to_head()
+
+        Kwargs:
+            seasons (list): the seasons of the riders' histories to compare. Defaults to None (whole careers).
+            min_shared (int): leave out pairs with fewer results in common. Defaults to 1.
+            max_workers (int): the most riders to request at the same time. Defaults to 8.
+
+        Returns:
+            pd.DataFrame: one row per pair of riders, most shared results first
+                            - columns = ['rider_a', 'rider_b', 'shared', 'a_ahead', 'b_ahead', 'median_place_gap']
+                            - median_place_gap is the median of rider_a's position - rider_b's position, in places not time
+                            - riders whose history couldn't be requested are left out
+        """
+
+        # set the kwargs
+        seasons = kwargs.pop('seasons', None)
+        min_shared = kwargs.pop('min_shared', 1)
+        max_workers = kwargs.pop('max_workers', 8)
+
+        riders = list(self.get_startlist().loc[:, 'rider_pcs_name'])
+
+        histories = race_histories(riders, seasons, max_workers)
+
+        return h2h.head_to_head(histories, min_shared)
+    
+    @ins.instrumented
     def get_stage_sprint_points(self, pcs_stage: str):
         """
         Returns a dataframe of each Sprint in a stage and the points awarded 
@@ -597,8 +715,7 @@ class Race:
         # have to add extra details for this method
         url = url + "/live/complementary-results"
         # request and soup
-        response = req.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
+        soup = rqm.get_soup(url)
         
         # find the points per sprint from complementary page
         sprint_points = tbl.complementary_points(soup, startlist, columns_to_keep, point_type)
@@ -612,6 +729,7 @@ class Race:
                         
         return sprint_frame
     
+    @ins.instrumented
     def get_running_sprint_points(self, pcs_stage: str):
         """
         Returns a dataframe of the total sum of Sprint points accumulated by the end of the given stage
@@ -633,8 +751,7 @@ class Race:
 
         # get the soup for results page
         url = mgt.race_url(self.pcs_name, self.year, suffix = pcs_stage)
-        response = req.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
+        soup = rqm.get_soup(url)
         
         # get the tabs and find the correct tab index
         restabs = soup.find("div", class_ = "page-content page-object default").find("ul", class_ = "restabs").find_all("li")
@@ -660,6 +777,7 @@ class Race:
         
         return running_sprint
     
+    @ins.instrumented
     def get_stage_kom_points(self, pcs_stage: str):
         """
         Returns a dataframe of each KOM sprint in a stage and the points awarded 
@@ -684,8 +802,7 @@ class Race:
         # have to add extra details for this method
         url = url + "/live/complementary-results"
         # request and soup
-        response = req.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
+        soup = rqm.get_soup(url)
 
         # find the points per sprint from complementary page
         kom_points = tbl.complementary_points(soup, startlist, columns_to_keep, point_type)
@@ -698,6 +815,7 @@ class Race:
         
         return kom_frame
     
+    @ins.instrumented
     def get_running_kom_points(self, pcs_stage: str):
         """
         Returns a dataframe of the total sum of KOM points accumulated by the end of the given stage
@@ -719,8 +837,7 @@ class Race:
 
         # get the soup for results page
         url = mgt.race_url(self.pcs_name, self.year, suffix = pcs_stage)
-        response = req.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
+        soup = rqm.get_soup(url)
         
         # all the possible result tabs
         restabs = soup.find("div", class_ = "page-content page-object default").find("ul", class_ = "restabs").find_all("li")
@@ -747,3 +864,121 @@ class Race:
                                               'kom_points'])
         
         return running_kom
+
+# the keys of Race.get_stage_info() in the order of the page
+stage_info_columns = ['date', 'start_time_local', 'distance_km',
+                      'parcours_type', 'finish_type',
+                      'profile_score', 'vertical_meters', 'startlist_score']
+
+# the parcours & finish of each profile icon class
+parcours_types = {'p1':('flat', 'flat'),
+                  'p2':('hilly', 'flat'),
+                  'p3':('hilly', 'uphill'),
+                  'p4':('mountain', 'flat'),
+                  'p5':('mountain', 'uphill')}
+
+def stage_info_label(label: str):
+    """
+    Normalises an infolist label so small changes in spelling still match (ie. 'ProfileScore:' & 'Profile score' -> 'profilescore')
+
+    Args:
+        label (str): the text of the label
+
+    Returns:
+        str: lowercase letters & numbers only
+    """
+
+    return ''.join(x for x in label.lower() if x.isalnum())
+
+def stage_info_from_soup(soup):
+    """
+    Extracts the info of a stage/one day race from the infolist of its page, finding each field by its label
+
+    Args:
+        soup (BeautifulSoup): the soup of the stage or one day race page
+
+    Returns:
+        dict: keys = see stage_info_columns (a key is missing if the page doesn't print it)
+    """
+
+    # the data table
+    table = soup.find('div', class_ = 'w30 right mb_w100').find('ul', class_ = 'infolist').find_all('li')
+    # preset empty dict
+    info = {}
+
+    # one pass over the rows, each is a label & a value
+    for row in table:
+        divs = row.find_all('div')
+        if len(divs) < 2:
+            continue
+        label = stage_info_label(divs[0].text)
+        value = divs[1]
+
+        if label == 'date':
+            info['date'] = cvt.printed_date_to_standard(value.text)
+        elif label == 'starttime':
+            info['start_time_local'] = value.text.split(' ')[0]
+        elif label == 'distance':
+            info['distance_km'] = value.text.split(' ')[0]
+        elif label == 'parcourstype':
+            icon = value.find('span')
+            if icon is not None and icon.get('class')[-1] in parcours_types:
+                info['parcours_type'], info['finish_type'] = parcours_types[icon.get('class')[-1]]
+        elif label == 'profilescore':
+            info['profile_score'] = value.text
+        elif label == 'vertmeters':
+            info['vertical_meters'] = value.text
+        elif label == 'startlistqualityscore':
+            info['startlist_score'] = value.text
+
+    return info
+
+def startlist_from_soup(soup):
+    """
+    Extracts the startlist from the soup of a race's startlist page (see Race.get_startlist())
+
+    Args:
+        soup (BeautifulSoup): the soup of the startlist page
+
+    Returns:
+        pd.DataFrame: columns = ['team_name', 'team_href', 'team_pcs_name', 'team_pcs_year',
+                                 'rider_name', 'rider_href', 'rider_pcs_name']
+    """
+    
+    # the table of teams
+    table = soup.find("ul", class_ = "startlist_v3").find_all("li", class_ = "team")
+    
+    # preset empty list
+    startlist = []
+    
+    # loop through each team
+    for team in table:
+        
+        # find basic team info
+        team_name = team.find("b").find("a").text
+        team_href = team.find("b").find("a", href = True).get('href')
+        team_pcs_name = team_href[5:-5]
+        team_pcs_year = team_href[-4:]
+        
+        # find all riders in team
+        riders = team.find("ul").find_all("li")
+        
+        # loop through each rider
+        for rider in riders:
+            # extract text name and convert to First Last
+            rider_name = rider.find("a").text
+            new_rider_name = cvt.printed_rider_to_first_last(rider_name)
+            
+            # get rider href & pcs name
+            rider_href = rider.find("a", href = True).get('href')
+            rider_pcs_name = rider_href[6:]
+            
+            startlist = startlist + [[team_name, team_href, team_pcs_name, team_pcs_year,
+                                      new_rider_name, rider_href, rider_pcs_name]]
+            
+    # export as dataframe
+    startlist_frame = pd.DataFrame(data = startlist,
+                                   columns = ['team_name', 'team_href', 'team_pcs_name', 'team_pcs_year',
+                                              'rider_name', 'rider_href', 'rider_pcs_name'])
+    
+    return startlist_frame
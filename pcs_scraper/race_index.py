@@ -0,0 +1,201 @@
+# general imports
+import numpy as np
+import pandas as pd
+# pcs-py specific imports
+from .rider import race_history_columns, race_histories
+
+### Inverted index from races to the riders who took part, built from riders' race histories
+# every row of every history is integer coded (rider, race, year, race_href) and sorted by race, year,
+# race_href then position, so the riders of a race or of one result are a contiguous slice found with a dict hit
+
+class RaceIndex:
+    def __init__(self, histories: dict):
+        """
+        Builds the index from riders' race histories
+
+        Args:
+            histories (dict): rider pcs_name -> pd.DataFrame from Rider.get_race_history()
+
+        Attributes:
+            rider_names (np.ndarray): the pcs_name of each rider code
+            race_names (np.ndarray): the race_pcs_name of each race code
+            hrefs (np.ndarray): the race_href of each href code
+            rider, race, href (np.ndarray): int32 codes of every row
+            year (np.ndarray): int32 year of every row
+            place (np.ndarray): float64 position of every row (nan if not placed, ie. 'DNF')
+            details (pd.DataFrame): the history columns of every row (row i of the arrays is row i of details)
+        """
+
+        # one frame of every history with the rider it came from
+        frames = [history.loc[:, race_history_columns].assign(rider_pcs_name = name)
+                  for name, history in histories.items() if len(history) > 0]
+        if len(frames) > 0:
+            rows = pd.concat(frames, ignore_index = True)
+        else:
+            rows = pd.DataFrame(columns = race_history_columns + ['rider_pcs_name'])
+
+        # integer code every row
+        rider, rider_names = pd.factorize(rows.loc[:, 'rider_pcs_name'])
+        race, race_names = pd.factorize(rows.loc[:, 'race_pcs_name'])
+        href, hrefs = pd.factorize(rows.loc[:, 'race_href'])
+        year = pd.to_numeric(rows.loc[:, 'race_pcs_year'], errors = 'coerce').fillna(0).to_numpy(dtype = np.int32)
+        place = pd.to_numeric(rows.loc[:, 'result'], errors = 'coerce').to_numpy(dtype = np.float64)
+
+        # sorted by race, year, race_href then position (unplaced last)
+        order = np.lexsort((rider, np.where(np.isnan(place), np.inf, place), href, year, race))
+
+        self.rider_names = np.asarray(rider_names, dtype = object)
+        self.race_names = np.asarray(race_names, dtype = object)
+        self.hrefs = np.asarray(hrefs, dtype = object)
+        self.rider = rider[order].astype(np.int32)
+        self.race = race[order].astype(np.int32)
+        self.href = href[order].astype(np.int32)
+        self.year = year[order]
+        self.place = place[order]
+        self.details = rows.iloc[order, :].reset_index(drop = True)
+
+        # (race_pcs_name, year) -> (first row, last row + 1) and race_href -> (first row, last row + 1)
+        self._race_rows = self._slices(self.race, self.year,
+                                       lambda i: (self.race_names[self.race[i]], int(self.year[i])))
+        self._href_rows = self._slices(self.href, self.href,
+                                       lambda i: self.hrefs[self.href[i]])
+
+    @classmethod
+    def from_riders(cls, names: list, seasons = None, max_workers = 8):
+        """
+        Requests the race histories of riders concurrently and builds the index
+        - riders whose history couldn't be requested are left out
+
+        Args:
+            names (list): the riders' pcs names
+            seasons (list, optional): the seasons to request. Defaults to None (whole careers).
+            max_workers (int, optional): the most riders to request at the same time. Defaults to 8.
+
+        Returns:
+            RaceIndex: the index
+        """
+
+        histories = race_histories(names, seasons, max_workers)
+
+        return cls(histories)
+
+    def __len__(self):
+        return len(self.details)
+
+    def __contains__(self, race):
+        # a (race_pcs_name, year) tuple or a race_href
+        if isinstance(race, tuple):
+            return (race[0], int(race[1])) in self._race_rows
+        return race in self._href_rows
+
+    def races(self):
+        """
+        Returns every race in the index
+
+        Returns:
+            pd.DataFrame: columns = ['race_pcs_name', 'race_pcs_year', 'riders', 'results']
+                - riders is the number of riders who took part, results the number of race_hrefs (ie. stages & classifications)
+        """
+
+        rows = [[race_pcs_name, year,
+                 len(np.unique(self.rider[start:stop])), len(np.unique(self.href[start:stop]))]
+                for (race_pcs_name, year), (start, stop) in self._race_rows.items()]
+
+        races_frame = pd.DataFrame(data = rows,
+                                   columns = ['race_pcs_name', 'race_pcs_year', 'riders', 'results'])
+
+        return races_frame
+
+    def riders(self, race_pcs_name: str, year):
+        """
+        Returns the riders who took part in a race
+
+        Args:
+            race_pcs_name (str): the race's pcs name (ie. 'tour-de-france')
+            year (str/int): the year
+
+        Returns:
+            list: the riders' pcs names in the order of the index (empty if the race isn't in the index)
+        """
+
+        start, stop = self._race_rows.get((race_pcs_name, int(year)), (0, 0))
+
+        return list(self.rider_names[np.unique(self.rider[start:stop])])
+
+    def race_results(self, race_pcs_name: str, year):
+        """
+        Returns every result of every rider in a race
+
+        Args:
+            race_pcs_name (str): the race's pcs name (ie. 'tour-de-france')
+            year (str/int): the year
+
+        Returns:
+            pd.DataFrame: ordered by race_href then position
+                - columns = ['rider_pcs_name', 'date', 'result',
+                             'race_name', 'race_href', 'race_pcs_name', 'race_pcs_year',
+                             'classification', 'distance',
+                             'pcs_points', 'uci_points', 'vert_mtr']
+        """
+
+        start, stop = self._race_rows.get((race_pcs_name, int(year)), (0, 0))
+
+        return self._rows(start, stop)
+
+    def result(self, race_href: str):
+        """
+        Returns how every rider placed in one result (ie. a stage, the gc or a one day race)
+
+        Args:
+            race_href (str): the result's href (ie. 'race/tour-de-france/2021/stage-9')
+
+        Returns:
+            pd.DataFrame: ordered by position (unplaced last), columns = see race_results()
+        """
+
+        start, stop = self._href_rows.get(race_href, (0, 0))
+
+        return self._rows(start, stop)
+
+    def compare(self, results: pd.DataFrame, race_href: str):
+        """
+        Cross-checks a result page (ie. Race.get_results()) against the positions in the riders' histories
+
+        Args:
+            results (pd.DataFrame): needs 'rider_pcs_name' and 'rank'
+            race_href (str): the href of the same result in the histories
+
+        Returns:
+            pd.DataFrame: one row per rider in either source
+                - columns = ['rider_pcs_name', 'rank', 'result', 'match']
+                - rank/result is nan when the rider is missing from that source
+                - match is False when the positions differ or the rider is missing from one source
+        """
+
+        history = self.result(race_href).loc[:, ['rider_pcs_name', 'result']]
+        official = results.loc[:, ['rider_pcs_name', 'rank']]
+
+        compared = official.merge(history, on = 'rider_pcs_name', how = 'outer', sort = False)
+        # positions compare as numbers, 'DNF' etc. as text
+        rank = pd.to_numeric(compared.loc[:, 'rank'], errors = 'coerce')
+        result = pd.to_numeric(compared.loc[:, 'result'], errors = 'coerce')
+        same_text = compared.loc[:, 'rank'].astype(str) == compared.loc[:, 'result'].astype(str)
+        both = compared.loc[:, 'rank'].notna() & compared.loc[:, 'result'].notna()
+        compared = compared.assign(match = both & ((rank == result) | (rank.isna() & result.isna() & same_text)))
+
+        return compared
+
+    def _rows(self, start: int, stop: int):
+        # the details of rows start:stop with the rider first
+        rows = self.details.iloc[start:stop, :]
+        rows = rows.loc[:, ['rider_pcs_name'] + race_history_columns].reset_index(drop = True)
+        return rows
+
+    def _slices(self, first: np.ndarray, second: np.ndarray, key):
+        # key(row) -> (start, stop) of each run of equal (first, second) in the sorted rows
+        if len(first) == 0:
+            return {}
+        change = np.flatnonzero((first[1:] != first[:-1]) | (second[1:] != second[:-1])) + 1
+        starts = np.concatenate([[0], change])
+        stops = np.concatenate([change, [len(first)]])
+        return {key(start):(int(start), int(stop)) for start, stop in zip(starts, stops)}
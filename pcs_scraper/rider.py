@@ -1,14 +1,19 @@
 # general imports
 import re
-import requests as req
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
+import numpy as np
 import pandas as pd
 # pcs-py specific imports
 from .utility import url_management as mgt
+from .utility import request_management as rqm
+from .utility import instrumentation as ins
 
 # defining the rider class and it's methods
 class Rider:
 
+    @ins.instrumented
     def __init__(self, name: str):
         """
         Initiates the rider class to get html page relavent to athlete requested
@@ -26,10 +31,29 @@ class Rider:
         # returns the url to request
         self.url = mgt.rider_url(name)
         # the response from the get request
-        self.response = req.get(self.url)
+        self.response = rqm.get_page(self.url)
         # the beautiful soup object
         self.soup = BeautifulSoup(self.response.content, "html.parser")
 
+    @classmethod
+    def many(cls, names: list, max_workers = 8):
+        """
+        Creates a Rider for each name concurrently, sharing one pooled connection to PCS
+
+        Args:
+            names (list): the rider names, in any format accepted by Rider()
+            max_workers (int, optional): the most riders to request at the same time. Defaults to 8.
+
+        Returns:
+            OrderedDict: name -> Rider, in the order of names
+                - if a rider couldn't be created the value is the exception that was raised
+        """
+
+        riders = rqm.call_many(cls, [(name,) for name in names], max_workers)
+
+        return OrderedDict(zip(names, riders))
+
+    @ins.instrumented
     def general_info(self):
         """
         Returns dictionary of useful general purpose information about rider from scraping their PCS homepage
@@ -63,13 +87,15 @@ class Rider:
 
         return out
     
+    @ins.instrumented
     def get_team_history(self):
         """
         Function that returns a riders complete season-by-season team history.
         Also returns teams in future if they are already signed for those seasons
 
         Returns:
-            pd.DataFrame: columns = ['season', 'team_name', 'team_href', 'team_pcs_name', 'team_pcs_year']
+            pd.DataFrame: columns = ['season', 'team_name', 'team_href', 'team_pcs_name', 'team_pcs_year', 'since', 'until']
+                            - since/until are the 'YYYY-MM-DD' dates of a mid-season transfer ('' for a whole season)
         """
         
         # isolate the soup
@@ -94,22 +120,29 @@ class Rider:
             team_pcs_name = '-'.join(team_href.split('/')[1].split('-')[:-1])
             # the pcs year
             team_pcs_year = team_href.split('/')[1].split('-')[-1]
+            # the dates of a mid-season transfer, if printed
+            since, until = transfer_dates(team.get_text(' '), season)
             
             # create nested list
-            data = data + [[season, team_name, team_href, team_pcs_name, team_pcs_year]]
+            data = data + [[season, team_name, team_href, team_pcs_name, team_pcs_year, since, until]]
             
         # turn nested list into dataframe 
         team_frame = pd.DataFrame(data = data,
                                   columns = ['season', 
-                                             'team_name', 'team_href', 'team_pcs_name', 'team_pcs_year'])
+                                             'team_name', 'team_href', 'team_pcs_name', 'team_pcs_year',
+                                             'since', 'until'])
         
         return team_frame
 
+    @ins.instrumented
     def get_race_history(self, **kwargs):
         """
         Returns the rider's complete race history as known by PCS.
         Includes one day races, stages, GC and other minor classification results 
 
+        Kwargs:
+            see iter_race_history()
+
         Returns:
             pd.DataFrame: columns = ['date', 'result', 
                                      'race_name', 'race_href', 'race_pcs_name', 'race_pcs_year',
@@ -117,6 +150,34 @@ class Rider:
                                      'pcs_points', 'uci_points', 'vert_mtr']
         """
         
+        # collect the batch of rows from each page
+        frames = list(self.iter_race_history(**kwargs))
+        
+        # turn the batches into one dataframe
+        if len(frames) > 0:
+            results_frame = pd.concat(frames, ignore_index = True)
+        else:
+            results_frame = pd.DataFrame(columns = race_history_columns)
+
+        return results_frame
+    
+    @ins.instrumented
+    def iter_race_history(self, **kwargs):
+        """
+        Yields the rider's race history one page (season) at a time as each page is requested
+        Pages are requested concurrently but yielded in season order, so rows can be written out 
+        before the whole history has been requested
+
+        Kwargs:
+            season (str/int): only return this season. Defaults to all seasons.
+            exclude_ttt (bool): exclude team time trials. Defaults to False.
+            race_type (str): one of ['stage', 'prologue', 'tt', 'gc', 'sprint', 'youth', 'kom', 'one-day']
+            max_workers (int): the most seasons to request at the same time. Defaults to 4.
+
+        Yields:
+            pd.DataFrame: the races of one season, same columns as get_race_history()
+        """
+        
         # set the kwargs
         # the season
         season = kwargs.pop('season', '')
@@ -147,6 +208,8 @@ class Rider:
             race_type = "7"
         elif race_type == 'one-day':
             race_type = "8"
+        # the number of pages requested at once
+        max_workers = kwargs.pop('max_workers', 4)
 
         # get rider name in pcs format back from the url
         rider_id = self.url.split('/')[-1]
@@ -165,57 +228,19 @@ class Rider:
             "id=" + rider_id + 
             "&p=results"
             )
-        # request the page
-        results_page = req.get(results_url)
-        # turn into soup
-        results_soup = BeautifulSoup(results_page.content, "html.parser")
-        # preset list
-        data_out = []
+        # request the page and turn into soup
+        results_soup = rqm.get_soup(results_url)
+        
         # if a season was requested, only need to load that season
         if season != '':
-            
-            # find all the rows contained within the table body
-            table_rows = results_soup.find("tbody").find_all('tr')
-            
-            # loop through each row
-            for i, row in enumerate(table_rows):
-                # if last row, skip
-                if i == len(table_rows) - 1:
-                    pass
-                # otherwise
-                else:
-                    # find all the columns in given row
-                    items = row.find_all('td')
-                    # preset empty list
-                    race_list = []
-                    
-                    # loop through the columns
-                    for j, val in enumerate(items):
-                        # don't need the row number
-                        if j == 0:
-                            pass
-                        # if it's the race column, get the text, the href and the pcs race name
-                        elif j == 3:
-                            race_name = val.find('a').text
-                            race_href = val.find('a', href = True).get('href')
-                            race_pcs_name = race_href.split('/')[1]
-                            race_pcs_year = race_href.split('/')[-2]
-                            race_list = race_list + [race_name, race_href, race_pcs_name, race_pcs_year]
-                            
-                        # otherwise, just extract the text
-                        else:
-                            text = val.text
-                            if text == '':
-                                text = '-'
-                            race_list = race_list + [text]
-                            
-                    # concat the list as nested list
-                    data_out = data_out + [race_list]
+            yield race_history_frame(results_soup)
         
         # if a season wasn't requested, need to loop through all possible years
         else: 
             # the years as identified by selector
             years = results_soup.find("select", {'name':'xseason'}).find_all('option')[1:]
+            # preset empty list
+            urls = []
             # loop through
             for year in years:
                 # value of the year
@@ -234,59 +259,14 @@ class Rider:
                     "id=" + rider_id + 
                     "&p=results"
                     )
-                
-                # request the page
-                results_page = req.get(results_url)
-                # turn into soup
-                results_soup = BeautifulSoup(results_page.content, "html.parser")
-                # find all the rows contained within the table body
-                table_rows = results_soup.find("tbody").find_all('tr')
-                
-                # loop through each row
-                for i, row in enumerate(table_rows):
-                    # if last row, skip
-                    if i == len(table_rows) - 1:
-                        pass
-                    # otherwise
-                    else:
-                        # find all the columns in given row
-                        items = row.find_all('td')
-                        # preset empty list
-                        race_list = []
-                        
-                        # loop through the columns
-                        for j, val in enumerate(items):
-                            # don't need the row number
-                            if j == 0:
-                                pass
-                            # if it's the race column, get the text, the href and the pcs race name
-                            elif j == 3:
-                                race_name = val.find('a').text
-                                race_href = val.find('a', href = True).get('href')
-                                race_pcs_name = race_href.split('/')[1]
-                                race_pcs_year = race_href.split('/')[-2]
-                                race_list = race_list + [race_name, race_href, race_pcs_name, race_pcs_year]
-                                
-                            # otherwise, just extract the text
-                            else:
-                                text = val.text
-                                if text == '':
-                                    text = '-'
-                                race_list = race_list + [text]
-                                
-                        # concat the list as nested list
-                        data_out = data_out + [race_list]
-                    
-        # turn nested list of each row into dataframe
-        results_frame = pd.DataFrame(data = data_out,
-                                     columns = ['date', 'result', 
-                                                'race_name', 'race_href', 'race_pcs_name', 'race_pcs_year',
-                                                'classification', 'distance', 
-                                                'pcs_points', 'uci_points', 'vert_mtr'])
-
-
-        return results_frame
+                urls = urls + [results_url]
+            
+            # request the seasons at the same time, yielding each as soon as it (and the ones before it) are done
+            with ThreadPoolExecutor(max_workers = max_workers) as pool:
+                for results_soup in pool.map(ins.in_context(rqm.get_soup), urls):
+                    yield race_history_frame(results_soup)
     
+    @ins.instrumented
     def get_palmares(self, top = 5):
         """
         Return the top n results for a rider's career in 5 categories
@@ -311,25 +291,84 @@ class Rider:
         
         # get the rider's whole race history
         total_race_hx = self.get_race_history()
-        total_race_hx.pcs_points = total_race_hx.pcs_points.replace('-','0')
-        total_race_hx.pcs_points = total_race_hx.pcs_points.astype('int')
-        
-        # store categories in seperate dataframes
-        one_day_race_hx = total_race_hx[total_race_hx.loc[:,'race_href'].str.contains('result')].sort_values(by = 'pcs_points', ascending = False).reset_index(drop = True).loc[:top-1, :]
-        stage_race_hx = total_race_hx[(total_race_hx.loc[:,'race_name'].str.contains('Stage')) | (total_race_hx.loc[:,'race_name'].str.contains('Prologue'))].sort_values(by = 'pcs_points', ascending = False).reset_index(drop = True).loc[:top-1, :]
-        gc_race_hx = total_race_hx[total_race_hx.loc[:,'race_href'].str.contains('gc')].sort_values(by = 'pcs_points', ascending = False).reset_index(drop = True).loc[:top-1, :]
-        kom_race_hx = total_race_hx[total_race_hx.loc[:,'race_href'].str.contains('kom')].sort_values(by = 'pcs_points', ascending = False).reset_index(drop = True).loc[:top-1, :]
-        points_race_hx = total_race_hx[total_race_hx.loc[:,'race_href'].str.contains('points')].sort_values(by = 'pcs_points', ascending = False).reset_index(drop = True).loc[:top-1, :]
-        
-        # for exporting
-        palmares = {'one_day':one_day_race_hx,
-                    'stages':stage_race_hx,
-                    'gc':gc_race_hx,
-                    'kom':kom_race_hx,
-                    'points':points_race_hx}
+        
+        palmares = palmares_from_history(total_race_hx, top)
         
         return palmares
 
+    @classmethod
+    def get_palmares_many(cls, names: list, top = 5, max_workers = 8):
+        """
+        Returns the palmares of many riders (see get_palmares()), requesting all their race histories on one pool
+
+        Args:
+            names (list): the rider names, in any format accepted by Rider()
+            top (int, optional): the top results to return in each category. Defaults to 5.
+            max_workers (int, optional): the most riders to request at the same time. Defaults to 8.
+
+        Returns:
+            OrderedDict: name -> palmares dict, in the order of names
+                - if a rider's palmares couldn't be created the value is the exception that was raised
+        """
+
+        def rider_palmares(name):
+            # the seasons of each rider are requested one after the other, the riders at the same time
+            race_history = cls(name).get_race_history(max_workers = 1)
+            return palmares_from_history(race_history, top)
+
+        palmares = rqm.call_many(rider_palmares, [(name,) for name in names], max_workers)
+
+        return OrderedDict(zip(names, palmares))
+
+    @ins.instrumented
+    def get_career_timeline(self, **kwargs):
+        """
+        Returns the rider's race history with the team they rode for on the date of each result
+        (see career_timeline(), mid-season transfers are placed by their dates)
+
+        Kwargs:
+            see iter_race_history()
+
+        Returns:
+            pd.DataFrame: the columns of get_race_history() + ['team_name', 'team_href', 'team_pcs_name', 'team_pcs_year']
+        """
+
+        race_history = self.get_race_history(**kwargs)
+        team_history = self.get_team_history()
+
+        timeline = career_timeline({'':race_history}, {'':team_history}).drop(columns = 'rider_pcs_name')
+
+        return timeline
+
+    @classmethod
+    def get_career_timeline_many(cls, names: list, seasons = None, max_workers = 8):
+        """
+        Returns the career timelines of many riders in one frame (see get_career_timeline()),
+        requesting them on one pool and joining every result to its team in one pass
+
+        Args:
+            names (list): the riders' pcs names
+            seasons (list, optional): the seasons of the race histories. Defaults to None (whole careers).
+            max_workers (int, optional): the most riders to request at the same time. Defaults to 8.
+
+        Returns:
+            pd.DataFrame: columns = ['rider_pcs_name'] + the columns of get_career_timeline()
+                - riders that couldn't be requested are left out
+        """
+
+        def rider_histories(name):
+            rider = cls(name)
+            return seasons_race_history(rider, seasons), rider.get_team_history()
+
+        histories = rqm.call_many(rider_histories, [(name,) for name in names], max_workers)
+        histories = [(name, x) for name, x in zip(names, histories) if isinstance(x, tuple)]
+
+        timeline = career_timeline(OrderedDict((name, x[0]) for name, x in histories),
+                                   OrderedDict((name, x[1]) for name, x in histories))
+
+        return timeline
+
+    @ins.instrumented
     def get_name(self):
         """
         Gets the rider name from rider HTML
@@ -348,6 +387,7 @@ class Rider:
 
         return printed_name
     
+    @ins.instrumented
     def get_nationality(self):
         
         # isolate soup
@@ -357,6 +397,7 @@ class Rider:
         
         return nationality
 
+    @ins.instrumented
     def get_current_team(self):
         """
         Gets the rider's current team from rider HTML
@@ -373,6 +414,7 @@ class Rider:
 
         return current_team
 
+    @ins.instrumented
     def get_age(self):
         """
         Gets the rider's current age from rider HTML
@@ -393,6 +435,7 @@ class Rider:
 
         return reported_age
 
+    @ins.instrumented
     def get_height(self):
         """
         Gets the rider's height from rider HTML (if it exists)
@@ -417,6 +460,7 @@ class Rider:
 
         return reported_height
 
+    @ins.instrumented
     def get_weight(self):
         """
         Gets the weight of a rider from the html (if it exists)
@@ -441,6 +485,7 @@ class Rider:
 
         return reported_weight
     
+    @ins.instrumented
     def get_strava(self):
         """
         Get details about the rider's strava page
@@ -474,6 +519,7 @@ class Rider:
 
         return out
 
+    @ins.instrumented
     def get_ranks(self):
         """
         Returns the PCS and UCI ranking for the rider at the time of the request
@@ -504,6 +550,7 @@ class Rider:
 
         return out
     
+    @ins.instrumented
     def get_uci_points_season(self, season):
         """
         Returns the summation UCI points for the season requested
@@ -516,34 +563,16 @@ class Rider:
             int: number of points accumulated in season
         """        
         
-        # the season
-        season = str(season)
-
         # get rider name in pcs format back from the url
         rider_id = self.url.split('/')[-1]
         
-        results_url = (
-            "https://www.procyclingstats.com/rider.php?" + 
-            "date=" + season + "-12-31" +
-            "&filter=Filter&" + 
-            "id=" + rider_id + 
-            "&p=results&s=uci-world-ranking"
-            )
-        
-        # request the page
-        results_page = req.get(results_url)
-        # turn into soup
-        results_soup = BeautifulSoup(results_page.content, "html.parser")
-        try:
-            # the row with the sum
-            points_sum_row = results_soup.find('tr', class_ = "sum").find_all('td')
-            # the column with the sum
-            uci_points = int(points_sum_row[-1].text)
-        except:
-            uci_points = int(0)
+        # request the page and turn into soup
+        results_soup = rqm.get_soup(season_points_url(rider_id, season, 'uci'))
+        uci_points = season_points(results_soup)
         
         return uci_points
 
+    @ins.instrumented
     def get_pcs_points_season(self, season):
         """
         Returns the summation PCS points for the season requested
@@ -555,35 +584,416 @@ class Rider:
             int: number of points accumulated in season
         """        
         
-        # the season
-        season = str(season)
-
         # get rider name in pcs format back from the url
         rider_id = self.url.split('/')[-1]
         
-        results_url = (
-            "https://www.procyclingstats.com/rider.php?" + 
-            "date=" + season + "-12-31" +
-            "&filter=Filter&" + 
-            "id=" + rider_id + 
-            "&p=results&s=pcs-season-ranking"
-            )
-        
-        # request the page
-        results_page = req.get(results_url)
-        # turn into soup
-        results_soup = BeautifulSoup(results_page.content, "html.parser")
-        try:
-            # the row with the sum
-            points_sum_row = results_soup.find('tr', class_ = "sum").find_all('td')
-            # the column with the sum
-            pcs_points = int(points_sum_row[-1].text)
-        except:
-            pcs_points = int(0)
+        # request the page and turn into soup
+        results_soup = rqm.get_soup(season_points_url(rider_id, season, 'pcs'))
+        pcs_points = season_points(results_soup)
             
         return pcs_points
+
+    @ins.instrumented
+    def get_points_by_season(self, seasons: list, kind = 'both', max_workers = 8):
+        """
+        Returns the UCI and/or PCS points of many seasons, requesting every season & ranking at the same time
         
+        Args:
+            seasons (list): the seasons as years
+            kind (str, optional): one of 'uci', 'pcs' or 'both'. Defaults to 'both'.
+            max_workers (int, optional): the most pages to request at the same time. Defaults to 8.
 
-             
-    
+        Returns:
+            pd.DataFrame: one row per season, in the order of seasons
+                - columns = ['season', 'uci_points', 'pcs_points'] (only the requested kind of points)
+        """
+        
+        if kind == 'both':
+            kinds = ['uci', 'pcs']
+        elif kind in ['uci', 'pcs']:
+            kinds = [kind]
+        else:
+            raise ValueError("kind must be one of 'uci', 'pcs' or 'both', not " + repr(kind))
+        
+        # get rider name in pcs format back from the url
+        rider_id = self.url.split('/')[-1]
+        
+        # every ranking page of every season
+        urls = [season_points_url(rider_id, season, x) for season in seasons for x in kinds]
+        
+        # request the pages at the same time
+        with ThreadPoolExecutor(max_workers = max_workers) as pool:
+            points = list(pool.map(ins.in_context(lambda url: season_points(rqm.get_soup(url))), urls))
         
+        # one row per season, the kinds side by side
+        rows = [[int(season)] + points[i * len(kinds):(i + 1) * len(kinds)] for i, season in enumerate(seasons)]
+        
+        points_frame = pd.DataFrame(data = rows,
+                                    columns = ['season'] + [x + '_points' for x in kinds])
+        
+        return points_frame
+
+def seasons_race_history(rider, seasons = None):
+    """
+    A rider's race history over some seasons, the seasons requested one after the other
+    (for when many riders are requested at the same time, see race_histories())
+
+    Args:
+        rider (Rider): the rider
+        seasons (list, optional): the seasons to request. Defaults to None (whole career).
+
+    Returns:
+        pd.DataFrame: same columns as Rider.get_race_history()
+    """
+
+    if seasons is None:
+        return rider.get_race_history(max_workers = 1)
+
+    frames = [rider.get_race_history(season = season) for season in seasons]
+    if len(frames) == 0:
+        return pd.DataFrame(columns = race_history_columns)
+
+    return pd.concat(frames, ignore_index = True)
+
+def race_histories(names: list, seasons = None, max_workers = 8):
+    """
+    The race histories of many riders, requested concurrently on one pool
+
+    Args:
+        names (list): the riders' pcs names
+        seasons (list, optional): the seasons to request. Defaults to None (whole careers).
+        max_workers (int, optional): the most riders to request at the same time. Defaults to 8.
+
+    Returns:
+        OrderedDict: name -> pd.DataFrame from Rider.get_race_history(), in the order of names
+            - riders whose history couldn't be requested are left out
+    """
+
+    histories = rqm.call_many(lambda name: seasons_race_history(Rider(name), seasons),
+                              [(name,) for name in names], max_workers)
+
+    return OrderedDict((name, history) for name, history in zip(names, histories)
+                       if isinstance(history, pd.DataFrame))
+
+# the columns of Rider.get_race_history()
+race_history_columns = ['date', 'result', 
+                        'race_name', 'race_href', 'race_pcs_name', 'race_pcs_year',
+                        'classification', 'distance', 
+                        'pcs_points', 'uci_points', 'vert_mtr']
+
+def race_history_frame(results_soup):
+    """
+    Extracts the table of races from a page of a rider's results
+
+    Args:
+        results_soup (BeautifulSoup): the soup of a rider.php results page
+
+    Returns:
+        pd.DataFrame: columns = see race_history_columns
+    """
+    
+    # preset list
+    data_out = []
+    
+    # find all the rows contained within the table body
+    table_rows = results_soup.find("tbody").find_all('tr')
+    
+    # loop through each row
+    for i, row in enumerate(table_rows):
+        # if last row, skip
+        if i == len(table_rows) - 1:
+            pass
+        # otherwise
+        else:
+            # find all the columns in given row
+            items = row.find_all('td')
+            # preset empty list
+            race_list = []
+            
+            # loop through the columns
+            for j, val in enumerate(items):
+                # don't need the row number
+                if j == 0:
+                    pass
+                # if it's the race column, get the text, the href and the pcs race name
+                elif j == 3:
+                    race_name = val.find('a').text
+                    race_href = val.find('a', href = True).get('href')
+                    race_pcs_name = race_href.split('/')[1]
+                    race_pcs_year = race_href.split('/')[-2]
+                    race_list = race_list + [race_name, race_href, race_pcs_name, race_pcs_year]
+                    
+                # otherwise, just extract the text
+                else:
+                    text = val.text
+                    if text == '':
+                        text = '-'
+                    race_list = race_list + [text]
+                    
+            # concat the list as nested list
+            data_out = data_out + [race_list]
+    
+    # turn nested list of each row into dataframe
+    results_frame = pd.DataFrame(data = data_out,
+                                 columns = race_history_columns)
+    
+    return results_frame
+
+# the palmares categories, see palmares_category()
+palmares_categories = ['one_day', 'stages', 'gc', 'kom', 'points']
+
+def palmares_category(race_name: str, race_href: str):
+    """
+    The palmares category of a result in a rider's race history
+
+    Args:
+        race_name (str): the race_name of the result (stages & prologues are found by name)
+        race_href (str): the race_href of the result (ie. race/tour-de-france/2021/gc)
+
+    Returns:
+        str: one of palmares_categories ('' if it's in none)
+    """
+
+    if 'result' in race_href:
+        return 'one_day'
+    elif 'Stage' in race_name or 'Prologue' in race_name:
+        return 'stages'
+    elif 'gc' in race_href:
+        return 'gc'
+    elif 'kom' in race_href:
+        return 'kom'
+    elif 'points' in race_href:
+        return 'points'
+
+    return ''
+
+def palmares_from_history(race_history: pd.DataFrame, top = 5):
+    """
+    Splits a rider's race history into the top results of each palmares category in one pass
+    Each row is categorised once and sorted once, then the top n of each category are sliced off
+
+    Args:
+        race_history (pd.DataFrame): the output of Rider.get_race_history()
+        top (int, optional): the top results to return in each category. Defaults to 5.
+
+    Returns:
+        dict: category -> pd.DataFrame, see Rider.get_palmares()
+    """
+
+    # points are '-' when none were won
+    pcs_points = pd.to_numeric(race_history.loc[:, 'pcs_points'].replace('-', '0'), errors = 'coerce')
+    race_history = race_history.assign(pcs_points = pcs_points.fillna(0).astype('int'))
+    points = race_history.loc[:, 'pcs_points'].to_numpy()
+
+    # the index of each row's category in palmares_categories (one past the end if it's in none)
+    codes = {x:i for i, x in enumerate(palmares_categories + [''])}
+    category = np.array([codes[palmares_category(name, href)] for name, href
+                         in zip(race_history.loc[:, 'race_name'], race_history.loc[:, 'race_href'])], dtype = np.int64)
+
+    # one sort puts the rows in category order, most points first (ties stay in history order)
+    order = np.lexsort((-points, category))
+    starts = np.searchsorted(category[order], np.arange(len(palmares_categories) + 1))
+
+    # preset empty dictionary
+    palmares = {}
+
+    # only the top rows of each category are copied out
+    for i, name in enumerate(palmares_categories):
+        rows = order[starts[i]:min(starts[i] + top, starts[i + 1])]
+        palmares[name] = race_history.iloc[rows, :].reset_index(drop = True)
+
+    return palmares
+
+def season_points_url(rider_id: str, season, kind: str):
+    """
+    The url of a rider's points in a season ranking
+
+    Args:
+        rider_id (str): the rider's pcs name
+        season (str/int): the season as a year
+        kind (str): 'uci' for the UCI world ranking or 'pcs' for the PCS season ranking
+
+    Returns:
+        str: the url to request
+    """
+
+    ranking = {'uci':'uci-world-ranking', 'pcs':'pcs-season-ranking'}[kind]
+
+    results_url = (
+        "https://www.procyclingstats.com/rider.php?" + 
+        "date=" + str(season) + "-12-31" +
+        "&filter=Filter&" + 
+        "id=" + rider_id + 
+        "&p=results&s=" + ranking
+        )
+
+    return results_url
+
+def season_points(results_soup):
+    """
+    Extracts the total points from a rider's season ranking page
+
+    Args:
+        results_soup (BeautifulSoup): the soup of the page, see season_points_url()
+
+    Returns:
+        int: the points accumulated in the season (0 if there are none)
+    """
+
+    try:
+        # the row with the sum
+        points_sum_row = results_soup.find('tr', class_ = "sum").find_all('td')
+        # the column with the sum
+        points = int(points_sum_row[-1].text)
+    except:
+        points = int(0)
+
+    return points
+
+def transfer_dates(text: str, season):
+    """
+    Finds the dates of a mid-season transfer in the text of a team in a rider's team history
+    (ie. '2019 Team A (01.08 > 31.12)' or '2019 Team A until 31.07')
+
+    Args:
+        text (str): the text of the team's row
+        season (str/int): the season of the row
+
+    Returns:
+        tuple: (since, until) as 'YYYY-MM-DD' ('' if not printed)
+    """
+
+    # day.month or day/month
+    dates = [str(season) + '-' + month.zfill(2) + '-' + day.zfill(2)
+             for day, month in re.findall(r'\b(\d{1,2})[./](\d{1,2})\b', text)]
+
+    if len(dates) >= 2:
+        return dates[0], dates[1]
+    elif len(dates) == 1 and 'until' in text.lower():
+        return '', dates[0]
+    elif len(dates) == 1:
+        return dates[0], ''
+
+    return '', ''
+
+def team_intervals(team_history: pd.DataFrame):
+    """
+    The dates each team of a rider's team history covers
+
+    Args:
+        team_history (pd.DataFrame): from Rider.get_team_history()
+            - without 'since'/'until' (or where they're '') a team covers its whole season
+
+    Returns:
+        tuple: (start, end)
+            - start, end (np.ndarray): datetime64[D] first and last day of each row of team_history (NaT if the season isn't readable)
+    """
+
+    season = team_history.loc[:, 'season'].astype(str).str.strip().str[:4]
+    start = pd.to_datetime(season + '-01-01', format = '%Y-%m-%d', errors = 'coerce')
+    end = pd.to_datetime(season + '-12-31', format = '%Y-%m-%d', errors = 'coerce')
+
+    # transfers start/end mid-season
+    if 'since' in team_history.columns:
+        start = pd.to_datetime(team_history.loc[:, 'since'], errors = 'coerce').fillna(start)
+    if 'until' in team_history.columns:
+        end = pd.to_datetime(team_history.loc[:, 'until'], errors = 'coerce').fillna(end)
+
+    return start.to_numpy(dtype = 'datetime64[D]'), end.to_numpy(dtype = 'datetime64[D]')
+
+def career_timeline(race_histories: dict, team_histories: dict):
+    """
+    Joins each result of many riders' race histories to the team they rode for on its date
+    - one interval join over every rider: the teams are sorted by (rider, first day) and each result
+      is found with a binary search instead of a lookup per row
+    - when teams overlap (ie. a transfer without printed dates) the one starting latest wins,
+      then the one listed first (PCS lists the latest team first)
+    - after a team nested in another ends (ie. a loan or stagiaire stint) results go back to the enclosing team
+    - results without a readable date are placed on the 1st of January of race_pcs_year (no team without either)
+    - teams without a readable season are left out
+
+    Args:
+        race_histories (dict): rider pcs_name -> pd.DataFrame from Rider.get_race_history()
+        team_histories (dict): rider pcs_name -> pd.DataFrame from Rider.get_team_history()
+
+    Returns:
+        pd.DataFrame: columns = ['rider_pcs_name'] + race_history_columns +
+                                ['team_name', 'team_href', 'team_pcs_name', 'team_pcs_year']
+            - the team columns are nan when no team covers the date
+    """
+
+    team_columns = ['team_name', 'team_href', 'team_pcs_name', 'team_pcs_year']
+
+    # every result and every team of every rider in one frame each
+    results = [history.loc[:, race_history_columns].assign(rider_pcs_name = name)
+               for name, history in race_histories.items()]
+    teams = [history.assign(rider_pcs_name = name, listed = np.arange(len(history)))
+             for name, history in team_histories.items()]
+    results = pd.concat(results, ignore_index = True) if len(results) > 0 else pd.DataFrame(columns = race_history_columns + ['rider_pcs_name'])
+    teams = pd.concat(teams, ignore_index = True) if len(teams) > 0 else pd.DataFrame(columns = ['season'] + team_columns + ['rider_pcs_name', 'listed'])
+
+    # teams without a readable season can't cover any day
+    start, end = team_intervals(teams)
+    readable = ~(np.isnat(start) | np.isnat(end))
+    teams = teams.loc[readable, :].reset_index(drop = True)
+    start, end = start[readable].astype(np.int64), end[readable].astype(np.int64)
+
+    # riders coded the same way in both
+    riders = pd.Index(pd.unique(pd.concat([results.loc[:, 'rider_pcs_name'], teams.loc[:, 'rider_pcs_name']])))
+    result_rider = riders.get_indexer(results.loc[:, 'rider_pcs_name']).astype(np.int64)
+    team_rider = riders.get_indexer(teams.loc[:, 'rider_pcs_name']).astype(np.int64)
+
+    # days since 1970
+    fallback = pd.to_datetime(results.loc[:, 'race_pcs_year'].astype(str) + '-01-01', errors = 'coerce')
+    result_day = pd.to_datetime(results.loc[:, 'date'], format = '%Y-%m-%d', errors = 'coerce').fillna(fallback)
+    result_day = result_day.to_numpy(dtype = 'datetime64[D]')
+    # results without a date or a year don't get a team
+    dated = ~np.isnat(result_day)
+    result_day = np.where(dated, result_day.astype(np.int64), 0)
+
+    # (rider, day) as one sortable number
+    span = np.int64(1) << 32
+    team_key = team_rider * span + start
+    result_key = result_rider * span + result_day
+
+    # sorted by rider, first day, then listed last -> first so the last of equal keys is the first listed
+    order = np.lexsort((-teams.loc[:, 'listed'].to_numpy(dtype = np.int64), team_key))
+    sorted_keys = team_key[order]
+
+    sorted_rider = team_rider[order]
+    sorted_end = end[order]
+
+    # the team enclosing each team (ie. the contract around a loan/stagiaire stint):
+    # the nearest earlier team of the same rider that ends later
+    enclosing = np.full(len(order), -1, dtype = np.int64)
+    stack = []
+    for k in range(len(order)):
+        while len(stack) > 0 and (sorted_rider[stack[-1]] != sorted_rider[k] or sorted_end[stack[-1]] <= sorted_end[k]):
+            stack.pop()
+        if len(stack) > 0:
+            enclosing[k] = stack[-1]
+        stack.append(k)
+
+    # the latest team of the same rider starting on or before each result
+    position = np.searchsorted(sorted_keys, result_key, side = 'right') - 1
+    if len(order) > 0:
+        position[(position >= 0) & (sorted_rider[np.maximum(position, 0)] != result_rider)] = -1
+    position[~dated] = -1
+
+    # if it ended before the result, fall back to the teams enclosing it until one hasn't ended yet
+    ended = (position >= 0) & (sorted_end[np.maximum(position, 0)] < result_day) if len(order) > 0 else position >= 0
+    while ended.any():
+        position[ended] = enclosing[position[ended]]
+        ended = (position >= 0) & (sorted_end[np.maximum(position, 0)] < result_day)
+
+    found = position >= 0
+    team_row = order[np.maximum(position, 0)] if len(order) > 0 else np.zeros(len(results), dtype = np.int64)
+
+    # the team columns of every result (nan where no team covers it)
+    team_values = pd.DataFrame({x:teams.loc[:, x].to_numpy(dtype = object)[team_row] if len(order) > 0 else np.full(len(results), np.nan, dtype = object)
+                                for x in team_columns})
+    team_values = team_values.where(np.repeat(found[:, None], len(team_columns), axis = 1))
+
+    timeline = pd.concat([results.loc[:, ['rider_pcs_name'] + race_history_columns].reset_index(drop = True), team_values], axis = 1)
+
+    return timeline
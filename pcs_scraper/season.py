@@ -0,0 +1,226 @@
+# general imports
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+import pandas as pd
+# pcs-py specific imports
+from .race import Race
+from .utility import url_management as mgt
+from .utility import request_management as rqm
+from .utility.input_options import race_options_by_year
+
+# a single fetch + parse in the crawl
+# - name: the data type the step produces, row: the race from the calendar,
+#   stage: the pcs_stage_name (None for race level steps), race: the Race object, call: what to run
+Step = namedtuple('Step', ['name', 'row', 'stage', 'race', 'call'])
+
+def scrape_season(year: int, **kwargs):
+    """
+    Scrapes every race of a season: results, startlists, stages, stage results and stage info
+    All the requests run through a bounded pool of workers and pages shared between steps are only requested once
+
+    Args:
+        year (int): the calendar year of racing
+
+    Kwargs:
+        circuit (str): the circuit type you're interested in (refer to selectable_race_circuits())
+        classification (str): the classification type you're interested in (refer to selectable_race_classifications())
+        max_workers (int): the most requests to run at the same time. Defaults to 8.
+
+    Returns:
+        dict: one dataframe per data type, each row tagged with 'race_pcs_name' and 'race_pcs_year'
+            - keys = {'races', 'results', 'startlists', 'stages',
+                      'stage_results', 'stage_info', 'errors'}
+    """
+
+    # set the kwargs
+    circuit = kwargs.pop('circuit', '')
+    classification = kwargs.pop('classification', '')
+    max_workers = kwargs.pop('max_workers', 8)
+
+    # expand the calendar into races
+    races = race_options_by_year(year, circuit = circuit, classification = classification)
+    # the same race can be listed more than once on the calendar
+    races = races.drop_duplicates(subset = ['race_pcs_name', 'race_pcs_year']).reset_index(drop = True)
+
+    # share pages between all the steps for the duration of the crawl
+    with rqm.shared_pages():
+        frames = SeasonCrawl(races, max_workers).run()
+
+    frames['races'] = races
+
+    return frames
+
+class SeasonCrawl:
+    def __init__(self, races: pd.DataFrame, max_workers: int):
+        """
+        The graph of fetches for a season: race -> stages -> results/startlists/stage info
+
+        Args:
+            races (pd.DataFrame): output of race_options_by_year()
+            max_workers (int): the most requests to run at the same time
+        """
+
+        self.races = races
+        self.max_workers = max_workers
+        # the collected frames for each data type
+        self.frames = {'results':[], 'startlists':[], 'stages':[],
+                       'stage_results':[], 'stage_info':[]}
+        # the steps that failed
+        self.errors = []
+
+    def run(self):
+        """
+        Runs the crawl until there is nothing left to fetch
+
+        Returns:
+            dict: the concatenated dataframe for each data type
+        """
+
+        # first step is creating each race
+        steps = [Step('race', row, None, None, partial(Race, row.race_pcs_name, int(row.race_pcs_year)))
+                 for row in self.races.itertuples()]
+
+        with ThreadPoolExecutor(max_workers = self.max_workers) as pool:
+            pending = set(pool.submit(run_steps, group) for group in group_by_url(steps))
+
+            # every finished step can lead to the next steps
+            while len(pending) > 0:
+                done, pending = wait(pending, return_when = FIRST_COMPLETED)
+                for future in done:
+                    steps = []
+                    for step, out, error in future.result():
+                        steps = steps + self._collect(step, out, error)
+                    pending = pending | set(pool.submit(run_steps, group) for group in group_by_url(steps))
+
+        # concatenate the collected frames
+        out = {}
+        for data_type, frames in self.frames.items():
+            if len(frames) > 0:
+                out[data_type] = pd.concat(frames, ignore_index = True)
+            else:
+                out[data_type] = pd.DataFrame()
+        out['errors'] = pd.DataFrame(data = self.errors,
+                                     columns = ['race_pcs_name', 'race_pcs_year', 'step', 'stage_pcs_name', 'error'])
+
+        return out
+
+    def _collect(self, step, out, error):
+        """
+        Stores the output of a finished step and returns the steps it leads to
+
+        Args:
+            step (Step): the finished step
+            out: the output of the step
+            error (Exception/None): the exception if the step failed
+
+        Returns:
+            list: the next steps
+        """
+
+        row = step.row
+
+        # record the failure and stop following this branch
+        if error is not None:
+            self.errors = self.errors + [[row.race_pcs_name, row.race_pcs_year, step.name, step.stage, repr(error)]]
+            return []
+
+        # a created race leads to its results, startlist and stages
+        if step.name == 'race':
+            race = out
+            steps = [Step('results', row, None, race, race.get_results),
+                     Step('startlists', row, None, race, race.get_startlist)]
+            # stage races (2.x) have stages, one day races only have the race page
+            if row.classification.startswith('2'):
+                steps = steps + [Step('stages', row, None, race, race.get_stages)]
+            else:
+                steps = steps + [Step('stage_info', row, 'one-day-race', race, partial(race.get_stage_info, 'one-day-race'))]
+            return steps
+
+        # tag the output with the race it came from
+        if step.name == 'stage_info':
+            out = pd.DataFrame(data = [out])
+        out.insert(0, 'race_pcs_name', row.race_pcs_name)
+        out.insert(1, 'race_pcs_year', row.race_pcs_year)
+        if step.stage is not None:
+            out.insert(2, 'stage_pcs_name', step.stage)
+        self.frames[step.name] = self.frames[step.name] + [out]
+
+        # the stages lead to a result and info for each stage
+        if step.name == 'stages':
+            race = step.race
+            steps = []
+            for stage in out.loc[:, 'stage_pcs_name']:
+                steps = steps + [Step('stage_results', row, stage, race, partial(race.get_stage_result, stage)),
+                                 Step('stage_info', row, stage, race, partial(race.get_stage_info, stage))]
+            return steps
+
+        return []
+
+def run_steps(steps: list):
+    """
+    Runs steps one after another, catching the failure of each step
+
+    Args:
+        steps (list): the steps to run
+
+    Returns:
+        list: (step, output, error) for each step
+    """
+
+    # preset empty list
+    out = []
+
+    for step in steps:
+        try:
+            out = out + [(step, step.call(), None)]
+        except Exception as err:
+            out = out + [(step, None, err)]
+
+    return out
+
+def group_by_url(steps: list):
+    """
+    Groups steps by the page they request, so a page shared between steps is only requested once
+    - the first step of a group requests the page, the rest read it from the page cache
+
+    Args:
+        steps (list): the steps to group
+
+    Returns:
+        list: list of lists of steps
+    """
+
+    # preset empty dict of url -> steps
+    groups = {}
+    for step in steps:
+        url = step_url(step)
+        groups[url] = groups.get(url, []) + [step]
+
+    return list(groups.values())
+
+def step_url(step):
+    """
+    The url of the page a step requests
+
+    Args:
+        step (Step): the step
+
+    Returns:
+        str: the url
+    """
+
+    row = step.row
+
+    if step.name == 'race':
+        url = mgt.race_url(row.race_pcs_name, row.race_pcs_year, suffix = 'overview')
+    elif step.name == 'results' or step.stage == 'one-day-race':
+        url = mgt.race_url(row.race_pcs_name, row.race_pcs_year)
+    elif step.name == 'startlists':
+        url = mgt.race_url(row.race_pcs_name, row.race_pcs_year, suffix = 'startlist')
+    elif step.name == 'stages':
+        url = mgt.race_url(row.race_pcs_name, row.race_pcs_year, suffix = 'stages')
+    else:
+        url = mgt.race_url(row.race_pcs_name, row.race_pcs_year, suffix = step.stage)
+
+    return url
@@ -0,0 +1,209 @@
+# general imports
+import numpy as np
+import pandas as pd
+# pcs-py specific imports
+from .utility import standings as std
+
+### Array backed view of every stage result of a stage race
+# rows are riders and columns are stages, so per stage/per rider questions are slices instead of dataframe merges
+
+class StageMatrix:
+    def __init__(self, stage_results: pd.DataFrame, stages = None):
+        """
+        Builds riders x stages arrays from the results of every stage of a race
+
+        Args:
+            stage_results (pd.DataFrame): the results of every stage, ie. pd.concat(race.iter_stage_results())
+            stages (pd.DataFrame, optional): the race's stages from get_stages(), sets the order of the columns
+                                             (stages without results are kept as empty columns). Defaults to None (order stages appear in the results).
+
+        Attributes:
+            riders (pd.DataFrame): the rider/team details of each row
+            stages (pd.DataFrame): the stage details of each column
+            time (np.ndarray): float64 riders x stages, time in the stage in seconds (nan if not finished)
+            gap (np.ndarray): float64 riders x stages, time behind the stage winner in seconds (nan if not finished)
+            rank (np.ndarray): float64 riders x stages, finishing position (nan if not finished)
+            pcs_points, uci_points (np.ndarray): float64 riders x stages, points won in the stage (nan if none)
+            finished (np.ndarray): bool riders x stages, whether the rider finished the stage
+        """
+
+        stage_names = None if stages is None else list(stages.loc[:, 'stage_pcs_name'])
+        riders, stage_names, matrices = std.result_matrices(stage_results,
+                                                            ['rank', 'time', 'time_gap', 'pcs_points', 'uci_points'],
+                                                            stage_names)
+
+        self.riders = riders
+        if stages is None:
+            self.stages = pd.DataFrame({'stage_pcs_name':stage_names})
+        else:
+            self.stages = stages.reset_index(drop = True)
+
+        # a finisher has a position and a time (a ttt gives every rider the team's position & time)
+        self.finished = ~np.isnan(matrices['rank']) & ~np.isnan(matrices['time'])
+        self.rank = np.where(self.finished, matrices['rank'], np.nan)
+        self.time = np.where(self.finished, matrices['time'], np.nan)
+        self.gap = np.where(self.finished, matrices['time_gap'], np.nan)
+        self.pcs_points = matrices['pcs_points']
+        self.uci_points = matrices['uci_points']
+
+        # row/column of each rider/stage
+        self._rider_index = {x:i for i, x in enumerate(self.riders.loc[:, 'rider_pcs_name'])}
+        self._stage_index = {x:j for j, x in enumerate(stage_names)}
+        # filled on first use, see cumulative_time()
+        self._cumulative = None
+
+    @classmethod
+    def from_race(cls, race, max_workers = 4):
+        """
+        Requests every stage of a race and builds the matrix
+
+        Args:
+            race (Race): the race
+            max_workers (int, optional): the most stages to request at the same time. Defaults to 4.
+
+        Returns:
+            StageMatrix: the matrix
+        """
+
+        stages = race.get_stages()
+        stage_results = pd.concat(list(race.iter_stage_results(max_workers)), ignore_index = True)
+
+        return cls(stage_results, stages)
+
+    @property
+    def shape(self):
+        return self.time.shape
+
+    def rider(self, rider_pcs_name: str):
+        """
+        The row of a rider
+
+        Args:
+            rider_pcs_name (str): the rider's pcs name
+
+        Returns:
+            int: the row index
+        """
+
+        return self._rider_index[rider_pcs_name]
+
+    def stage(self, stage):
+        """
+        The column of a stage
+
+        Args:
+            stage (str/int): the stage_pcs_name, or the column index
+
+        Returns:
+            int: the column index
+        """
+
+        if isinstance(stage, (int, np.integer)):
+            return int(stage)
+
+        return self._stage_index[stage]
+
+    def stage_values(self, values: np.ndarray, stage):
+        """
+        One stage's column of an array as a series by rider
+
+        Args:
+            values (np.ndarray): one of the riders x stages arrays (ie. self.gap)
+            stage (str/int): the stage_pcs_name or column index
+
+        Returns:
+            pd.Series: the values indexed by rider_pcs_name
+        """
+
+        return pd.Series(values[:, self.stage(stage)], index = self.riders.loc[:, 'rider_pcs_name'])
+
+    def time_lost(self, stage):
+        """
+        The time each rider lost to the winner of a stage
+
+        Args:
+            stage (str/int): the stage_pcs_name or column index
+
+        Returns:
+            pd.Series: seconds behind the stage winner indexed by rider_pcs_name (nan if not finished)
+        """
+
+        return self.stage_values(self.gap, stage)
+
+    def top(self, n = 10):
+        """
+        The riders finishing in the top n of each stage
+
+        Args:
+            n (int, optional): the number of places. Defaults to 10.
+
+        Returns:
+            pd.DataFrame: one row per stage (indexed by stage_pcs_name) and a column per place with the rider_pcs_name
+                - riders sharing a place (ie. in a ttt) are in the order of the results
+        """
+
+        # the rows sorted by position in each stage, unfinished (nan) last
+        order = np.argsort(np.where(self.finished, self.rank, np.inf), axis = 0, kind = 'stable')[:n, :]
+        placed = np.take_along_axis(self.finished, order, axis = 0)
+        names = self.riders.loc[:, 'rider_pcs_name'].to_numpy(dtype = object)[order]
+        names[~placed] = None
+
+        top_frame = pd.DataFrame(data = names.T,
+                                 index = self.stages.loc[:, 'stage_pcs_name'],
+                                 columns = list(range(1, order.shape[0] + 1)))
+
+        return top_frame
+
+    def cumulative_time(self):
+        """
+        The total time of each rider after every stage (nan once out of the race)
+
+        Returns:
+            np.ndarray: float64 riders x stages
+        """
+
+        if self._cumulative is None:
+            self._cumulative = std.cumulative_times(self.time, self.finished)
+
+        return self._cumulative[0]
+
+    def cumulative_gap(self):
+        """
+        The time behind the leader of the summed stage times after every stage (nan once out of the race)
+        - no time bonuses, see utility.standings.running_gc() to add them
+
+        Returns:
+            np.ndarray: float64 riders x stages
+        """
+
+        total = self.cumulative_time()
+        in_race = self._cumulative[1]
+        # leader of each stage, inf if nobody is left
+        leader = np.min(np.where(in_race, total, np.inf), axis = 0)
+
+        return total - leader
+
+    def to_frame(self, values = 'gap'):
+        """
+        One of the arrays as a labelled dataframe
+
+        Args:
+            values (str, optional): one of 'time', 'gap', 'rank', 'pcs_points', 'uci_points', 'finished',
+                                    'cumulative_time', 'cumulative_gap'. Defaults to 'gap'.
+
+        Returns:
+            pd.DataFrame: indexed by rider_pcs_name with a column per stage_pcs_name
+        """
+
+        if values == 'cumulative_time':
+            data = self.cumulative_time()
+        elif values == 'cumulative_gap':
+            data = self.cumulative_gap()
+        else:
+            data = getattr(self, values)
+
+        frame = pd.DataFrame(data = data,
+                             index = self.riders.loc[:, 'rider_pcs_name'],
+                             columns = self.stages.loc[:, 'stage_pcs_name'])
+
+        return frame
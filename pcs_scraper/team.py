@@ -1,12 +1,18 @@
 # general imports
-import requests as req
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
+import numpy as np
 import pandas as pd
 # pcs-py specific imports
 from .utility import url_management as mgt
+from .utility import request_management as rqm
+from .utility import instrumentation as ins
 from .utility import convert_data as cvt
+from .rider import Rider, palmares_category, race_history_columns
 
 class Team:
+    @ins.instrumented
     def __init__(self, name: str, year: int):
         """
         Initiates the Team class to get html page relavent to team requested
@@ -23,10 +29,35 @@ class Team:
         # returns the url to request
         self.url = mgt.team_url(name, year)
         # get the response from url
-        self.response = req.get(self.url)
+        self.response = rqm.get_page(self.url)
         # create the soup
         self.soup = BeautifulSoup(self.response.content, "html.parser")
         
+    @classmethod
+    def many(cls, names: list, years, max_workers = 8):
+        """
+        Creates a Team for each name and year concurrently, sharing one pooled connection to PCS
+
+        Args:
+            names (list): the team names, in any format accepted by Team()
+            years (int/list): the year of every team, or a list with the year of each team
+            max_workers (int, optional): the most teams to request at the same time. Defaults to 8.
+
+        Returns:
+            OrderedDict: (name, year) -> Team, in the order of names
+                - if a team couldn't be created the value is the exception that was raised
+        """
+
+        # same year for every team
+        if isinstance(years, int) or isinstance(years, str):
+            years = [years] * len(names)
+
+        keys = list(zip(names, years))
+        teams = rqm.call_many(cls, keys, max_workers)
+
+        return OrderedDict(zip(keys, teams))
+
+    @ins.instrumented
     def get_riders(self):
         """
         Returns a dataframe of the riders on the team ordered alphabetically 
@@ -65,6 +96,7 @@ class Team:
         
         return rider_frame
     
+    @ins.instrumented
     def get_race_history(self, national_races = True):
         """
         Returns the races the team participated in.
@@ -78,6 +110,24 @@ class Team:
             pd.DataFrame: columns = ['date', 'race_name', 'race_href', 'race_pcs_name', 'race_pcs_year']
         """
         
+        # collect the batch of rows from each page
+        races_frame = pd.concat(list(self.iter_race_history(national_races)), ignore_index = True)
+        
+        return races_frame
+    
+    @ins.instrumented
+    def iter_race_history(self, national_races = True):
+        """
+        Yields the races the team participated in one page at a time (stage races, then one day races)
+        Both pages are requested at the same time and each is yielded as soon as it's ready
+
+        Args:
+            national_races (bool, optional): Do you want to include national championship races? Defaults to True.
+
+        Yields:
+            pd.DataFrame: columns = ['date', 'race_name', 'race_href', 'race_pcs_name', 'race_pcs_year']
+        """
+        
         # id for searching using php is team name
         id = self.url[37:]
         # since year is used in php as well
@@ -87,7 +137,7 @@ class Team:
         race_types = ['Stage Race', 'One Day']
         
         # preset an empty list
-        races = []
+        urls = []
         
         # loop through the types of races
         for race_type in race_types:
@@ -106,48 +156,139 @@ class Team:
                 "id=" + id +  
                 "&p=results&s=best-result-per-race"
             )
-            
-            # get the request and turn to soup
-            response = req.get(url)
-            soup = BeautifulSoup(response.content, "html.parser")
-            
-            # the table of interest
-            race_table = soup.find("table", class_ = "basic").find("tbody").find_all("tr")
-            
-            # loop through each row
-            for row in race_table:
-                # find each column of the row
-                columns = row.find_all("td")
-                # loop through the columns
-                for i, column in enumerate(columns):
-                    # take the date of the race
-                    if i == 1:
-                        date = column.text
-                    # take the name of the race and the link
-                    elif i == 4:
-                        # text
-                        race_name = column.find('a').text
-                        # href
-                        race_href = column.find('a', href = True).get('href')
-                        # the name of the race in href
-                        race_pcs_name = race_href.split('/')[1]
-                        race_pcs_year = race_href.split('/')[-2]
-                        
+            urls = urls + [url]
+        
+        # request both pages at the same time
+        with ThreadPoolExecutor(max_workers = len(urls)) as pool:
+            for soup in pool.map(ins.in_context(rqm.get_soup), urls):
+                
+                # preset an empty list
+                races = []
+                
+                # the table of interest
+                race_table = soup.find("table", class_ = "basic").find("tbody").find_all("tr")
                 
-                # store as a nested list
-                races = races + [[date, race_name, race_href, race_pcs_name, race_pcs_year]]
+                # loop through each row
+                for row in race_table:
+                    # find each column of the row
+                    columns = row.find_all("td")
+                    # loop through the columns
+                    for i, column in enumerate(columns):
+                        # take the date of the race
+                        if i == 1:
+                            date = column.text
+                        # take the name of the race and the link
+                        elif i == 4:
+                            # text
+                            race_name = column.find('a').text
+                            # href
+                            race_href = column.find('a', href = True).get('href')
+                            # the name of the race in href
+                            race_pcs_name = race_href.split('/')[1]
+                            race_pcs_year = race_href.split('/')[-2]
+                            
+                    
+                    # store as a nested list
+                    races = races + [[date, race_name, race_href, race_pcs_name, race_pcs_year]]
 
-        # turn nested lists into a dataframe
-        races_frame = pd.DataFrame(data = races, 
-                                   columns = ['date', 'race_name', 
-                                              'race_href', 'race_pcs_name', 'race_pcs_year'])
+                # turn nested lists into a dataframe
+                races_frame = pd.DataFrame(data = races, 
+                                           columns = ['date', 'race_name', 
+                                                      'race_href', 'race_pcs_name', 'race_pcs_year'])
+                
+                # remove any national championships
+                if national_races == False:
+                    races_frame = races_frame.loc[(races_frame.loc[:,'race_name'].str.contains("National") == False), :]
+                
+                yield races_frame
+    
+    @ins.instrumented
+    def get_season_summary(self, max_workers = 8):
+        """
+        Rolls up the season of every rider on the team, requesting all the riders' race histories at the same time
+        - race days are stages & one day races (gc, kom and points results aren't counted as days)
+        - the race and team totals only count races in get_race_history() (not ie. world championships for a country)
+
+        Args:
+            max_workers (int, optional): the most riders to request at the same time. Defaults to 8.
+
+        Returns:
+            dict: 
+                - 'riders': pd.DataFrame of each rider's season
+                    - columns = ['rider_name', 'rider_href', 'pcs_name',
+                                 'race_days', 'wins', 'podiums', 'top_10s', 'pcs_points', 'uci_points']
+                - 'races': pd.DataFrame of get_race_history() with the team's riders & results in each race
+                    - columns = ['date', 'race_name', 'race_href', 'race_pcs_name', 'race_pcs_year',
+                                 'riders', 'race_days', 'wins', 'podiums', 'top_10s', 'pcs_points', 'uci_points', 'best_result']
+                - 'team': pd.DataFrame with one row of team totals
+                    - columns = ['riders', 'races', 'race_days', 'wins', 'podiums', 'top_10s', 'pcs_points', 'uci_points']
+                - 'errors': pd.DataFrame of the riders whose history couldn't be requested, columns = ['pcs_name', 'error']
+        """
+        
+        # the season of the team
+        season = self.url[-4:]
+        
+        riders = self.get_riders()
+        
+        # every rider's season at the same time, along with the team's races (requested first, as None)
+        def season_part(pcs_name):
+            if pcs_name is None:
+                return self.get_race_history()
+            return Rider(pcs_name).get_race_history(season = season)
+        
+        outputs = rqm.call_many(ins.in_context(season_part), [(None,)] + [(x,) for x in riders.loc[:, 'pcs_name']], max_workers)
+        team_races, histories = outputs[0], outputs[1:]
+        # the summary can't be built without the team's races
+        if isinstance(team_races, Exception):
+            raise team_races
         
-        # remove any national championships
-        if national_races == False:
-            races_frame = races_frame.loc[(races_frame.loc[:,'Race'].str.contains("National") == False), :]
+        # preset empty lists
+        frames = []
+        errors = []
         
-        return races_frame          
+        for pcs_name, history in zip(riders.loc[:, 'pcs_name'], histories):
+            if isinstance(history, Exception):
+                errors = errors + [[pcs_name, type(history).__name__ + ': ' + str(history)]]
+            else:
+                frames = frames + [history.assign(pcs_name = pcs_name)]
+        
+        # every result of every rider in one frame
+        if len(frames) > 0:
+            results = pd.concat(frames, ignore_index = True)
+        else:
+            results = pd.DataFrame(columns = race_history_columns + ['pcs_name'])
+        results = season_result_counts(results)
+        
+        # per rider
+        counts = ['race_days', 'wins', 'podiums', 'top_10s']
+        stats = counts + ['pcs_points', 'uci_points']
+        rider_totals = results.groupby('pcs_name')[stats].sum()
+        rider_frame = riders.join(rider_totals, on = 'pcs_name')
+        rider_frame = rider_frame.fillna({x:0 for x in stats}).astype({x:int for x in counts})
+        
+        # per race the team rode
+        race_keys = ['race_pcs_name', 'race_pcs_year']
+        race_totals = results.groupby(race_keys).agg(riders = ('pcs_name', 'nunique'),
+                                                     race_days = ('race_days', 'sum'), wins = ('wins', 'sum'),
+                                                     podiums = ('podiums', 'sum'), top_10s = ('top_10s', 'sum'),
+                                                     pcs_points = ('pcs_points', 'sum'), uci_points = ('uci_points', 'sum'),
+                                                     best_result = ('rank', 'min'))
+        race_frame = team_races.join(race_totals, on = race_keys).reset_index(drop = True)
+        race_frame = race_frame.fillna({x:0 for x in ['riders'] + stats}).astype({x:int for x in ['riders'] + counts})
+        
+        # the whole team, over the team's races
+        team_frame = pd.DataFrame(data = [[len(rider_frame), len(race_frame)] + 
+                                          [race_frame.loc[:, x].sum() for x in stats]],
+                                  columns = ['riders', 'races'] + stats)
+        
+        summary = {'riders':rider_frame,
+                   'races':race_frame,
+                   'team':team_frame,
+                   'errors':pd.DataFrame(data = errors, columns = ['pcs_name', 'error'])}
+        
+        return summary
     
+    @ins.instrumented
     def get_name_history(self):
         """
         Gets all the years of a teams history (and future names)
@@ -190,4 +331,32 @@ class Team:
                              columns = ['team_name', 'team_href', 'team_pcs_name', 'team_pcs_year'])
             
         return frame
-        
\ No newline at end of file
+        
+
+def season_result_counts(results: pd.DataFrame):
+    """
+    Adds the numeric columns summed in Team.get_season_summary() to rows of riders' race histories
+
+    Args:
+        results (pd.DataFrame): rows of Rider.get_race_history()
+
+    Returns:
+        pd.DataFrame: results with 'rank' (nan if not a placing), 'race_days', 'wins', 'podiums', 'top_10s'
+                      and pcs/uci points as numbers
+    """
+
+    # stages and one day races are days of racing, classifications aren't
+    race_day = np.array([palmares_category(name, href) in ['one_day', 'stages'] for name, href
+                         in zip(results.loc[:, 'race_name'], results.loc[:, 'race_href'])], dtype = bool)
+    # 'DNF', 'DNS' etc. aren't placings
+    rank = pd.to_numeric(results.loc[:, 'result'], errors = 'coerce').to_numpy(dtype = np.float64)
+
+    results = results.assign(rank = rank,
+                             race_days = race_day.astype(int),
+                             wins = (race_day & (rank == 1)).astype(int),
+                             podiums = (race_day & (rank <= 3)).astype(int),
+                             top_10s = (race_day & (rank <= 10)).astype(int),
+                             pcs_points = pd.to_numeric(results.loc[:, 'pcs_points'], errors = 'coerce').fillna(0),
+                             uci_points = pd.to_numeric(results.loc[:, 'uci_points'], errors = 'coerce').fillna(0))
+
+    return results
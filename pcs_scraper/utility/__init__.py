@@ -1,4 +1,36 @@
-from . import convert_data
-from . import input_options
-from . import table_manipulation
-from . import url_management
\ No newline at end of file
+import importlib
+
+### Utility modules are loaded on first use (PEP 562), see pcs_scraper/__init__.py
+
+_submodules = ['convert_data',
+               'disk_cache',
+               'input_options',
+               'instrumentation',
+               'metrics',
+               'profiling',
+               'request_management',
+               'standings',
+               'table_manipulation',
+               'url_management']
+
+__all__ = list(_submodules)
+
+def __getattr__(name: str):
+    """
+    Imports the utility module `name` the first time it's accessed
+
+    Args:
+        name (str): the module requested
+
+    Returns:
+        module: the utility module
+    """
+
+    if name not in _submodules:
+        raise AttributeError("module 'pcs_scraper.utility' has no attribute " + repr(name))
+
+    # importing a submodule also sets it as an attribute of the package
+    return importlib.import_module('.' + name, __name__)
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,5 +1,7 @@
 import datetime
+from . import profiling as prf
 
+@prf.profiled('convert_data.printed_rider_to_first_last')
 def printed_rider_to_first_last(printed_name: str):
     """
     Changes a name written as "LAST First" on PCS website to "First Last" format
@@ -31,6 +33,7 @@ def printed_rider_to_first_last(printed_name: str):
     
     return new_name
 
+@prf.profiled('convert_data.printed_time_to_seconds')
 def printed_time_to_seconds(printed_time: str):
     """
     Converts the printed str time on pcs to a value of seconds
@@ -0,0 +1,200 @@
+import os
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+
+# the file locking primitive depends on the platform
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+### Page cache kept on disk so several processes on one host share the pages they fetch
+# use it like the in-memory cache:
+#     request_management.set_page_cache(DiskPageCache('/tmp/pcs_pages', max_bytes = 2 * 1024**3))
+
+class DiskPageCache:
+    def __init__(self, directory: str, max_bytes = 1024**3, evict_to = 0.9):
+        """
+        Page cache stored as one file per url, safe to share between threads and processes
+            - pages are written to a temporary file and renamed into place so a reader never sees half a page
+            - writes and evictions hold an exclusive lock on a lock file in the directory
+            - when the pages take more than max_bytes the least recently used are deleted down to evict_to of max_bytes
+              (a page's modified time is bumped every time it's read), along with temporary files left by a crashed writer,
+              so the directory is only scanned once every (1 - evict_to) * max_bytes of new pages
+            - a page is fetched once per host only after its first writer finishes: processes missing the same page
+              at the same time each fetch it (there's no marker of pages being fetched by other processes)
+
+        Args:
+            directory (str): where to keep the pages (created if it doesn't exist)
+            max_bytes (int, optional): the most bytes of pages to keep. Defaults to 1GB.
+            evict_to (float, optional): the share of max_bytes left after an eviction. Defaults to 0.9.
+        """
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evict_to = evict_to
+        self._lock_path = os.path.join(directory, '.lock')
+        self._size_path = os.path.join(directory, '.size')
+
+        os.makedirs(directory, exist_ok = True)
+
+    def path(self, url: str):
+        """
+        The file a page is stored in
+
+        Args:
+            url (str): the url of the page
+
+        Returns:
+            str: the path of the page's file
+        """
+
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.html')
+
+    def get(self, url: str):
+        """
+        Returns the cached content of a page
+
+        Args:
+            url (str): the url of the page
+
+        Returns:
+            bytes/None: the page content (None if the page isn't cached)
+        """
+
+        path = self.path(url)
+        try:
+            with open(path, 'rb') as page:
+                content = page.read()
+        # not cached, or evicted by another process
+        except FileNotFoundError:
+            return None
+
+        # mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return content
+
+    def set(self, url: str, content: bytes):
+        """
+        Stores the content of a page, evicting the least recently used pages if the cache is full
+
+        Args:
+            url (str): the url of the page
+            content (bytes): the page content
+        """
+
+        path = self.path(url)
+        # unique per process & thread so concurrent writers never share a temporary file
+        temp = path + '.' + str(os.getpid()) + '.' + str(threading.get_ident()) + '.tmp'
+
+        with self.locked():
+            size = self._read_size()
+            try:
+                previous = os.path.getsize(path)
+            except OSError:
+                previous = 0
+
+            with open(temp, 'wb') as page:
+                page.write(content)
+            os.replace(temp, path)
+
+            size = size - previous + len(content)
+            if size > self.max_bytes:
+                size = self._evict()
+            self._write_size(size)
+
+    def __contains__(self, url):
+        return os.path.exists(self.path(url))
+
+    def __len__(self):
+        return len(self._pages())
+
+    @property
+    def total_bytes(self):
+        """
+        The bytes of pages currently stored
+        """
+
+        return sum(size for _, _, size in self._pages())
+
+    @contextmanager
+    def locked(self):
+        """
+        Holds the exclusive lock of the cache directory (blocks until it's free)
+        """
+
+        with open(self._lock_path, 'a+b') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            else:
+                lock.seek(0)
+                # LK_LOCK only retries for 10 seconds
+                while True:
+                    try:
+                        msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.05)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock.seek(0)
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _pages(self):
+        # (path, last used, bytes) of every stored page
+        pages = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.html'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                pages.append((entry.path, stat.st_mtime, stat.st_size))
+        return pages
+
+    def _evict(self):
+        # delete the least recently used pages until under evict_to of max_bytes (lock must be held)
+        self._sweep_temp()
+        pages = sorted(self._pages(), key = lambda x: x[1])
+        size = sum(x[2] for x in pages)
+        for path, _, page_size in pages:
+            if size <= self.max_bytes * self.evict_to:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size = size - page_size
+        return size
+
+    def _sweep_temp(self):
+        # temporary files are only written while the lock is held, any left now are from a crashed writer (lock must be held)
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.tmp'):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def _read_size(self):
+        # running total of the bytes stored, recounted if missing/corrupt (lock must be held)
+        try:
+            with open(self._size_path, 'r') as size:
+                return int(size.read())
+        except (OSError, ValueError):
+            return sum(x[2] for x in self._pages())
+
+    def _write_size(self, size: int):
+        with open(self._size_path, 'w') as out:
+            out.write(str(size))
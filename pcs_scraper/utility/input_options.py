@@ -1,7 +1,11 @@
 
-import requests as req
-from bs4 import BeautifulSoup
+import os
+import json
+import datetime
+import warnings
 import pandas as pd
+from . import request_management as rqm
+from . import instrumentation as ins
 
 ### Useful functions to list some possible inputs for Race, Team & Rider classes
 
@@ -50,6 +54,7 @@ def selectable_race_classifications():
     
     return classes
 
+@ins.instrumented
 def race_options_by_year(year: int, **kwargs):
     """
     Creates a list of all the races avaliable for the given year based on the year and race circuit requested
@@ -89,8 +94,7 @@ def race_options_by_year(year: int, **kwargs):
         "&filter=Filter"
     )
     # request the url and get soup
-    response = req.get(url)
-    soup = BeautifulSoup(response.content, 'html.parser')
+    soup = rqm.get_soup(url)
     
     # get the table with data in it
     table = soup.find("table", class_ = "basic").find("tbody").find_all("tr")
@@ -129,6 +133,137 @@ def race_options_by_year(year: int, **kwargs):
      
     return races_frame
 
+# the columns of race_options_by_years()
+calendar_columns = ['year', 'circuit',
+                    'race_name', 'race_href', 'race_pcs_name', 'race_pcs_year',
+                    'classification']
+
+@ins.instrumented
+def race_options_by_years(years: list, **kwargs):
+    """
+    Combines race_options_by_year() for several years, circuits & classifications into one calendar
+    Every year x circuit x classification is requested concurrently, and with index_path each one is
+    only requested once: later calls read it from the index file
+
+    Args:
+        years (list): the calendar years of racing
+
+    Kwargs:
+        circuits (list): the circuits to include (refer to selectable_race_circuits()). Defaults to None (any circuit).
+        classifications (list): the classifications to include (refer to selectable_race_classifications()). Defaults to None (any classification).
+        index_path (str): json lines file to keep the calendars in between runs. Defaults to None (always request).
+            - calendars of the current & future years can still change, they're always requested and never saved
+        max_workers (int): the most calendars to request at the same time. Defaults to 8.
+
+    Returns:
+        pd.DataFrame: every race once (the first year/circuit/classification it was found under), ordered by year
+            - columns = ['year', 'circuit', 'race_name', 'race_href', 'race_pcs_name', 'race_pcs_year', 'classification']
+            - calendars that couldn't be requested are left out (and not saved to the index), a warning names them
+              and calendar.attrs['failed'] lists them as dicts with keys = ['year', 'circuit', 'classification', 'error']
+    """
+
+    # set the kwargs
+    circuits = kwargs.pop('circuits', None)
+    classifications = kwargs.pop('classifications', None)
+    index_path = kwargs.pop('index_path', None)
+    max_workers = kwargs.pop('max_workers', 8)
+
+    # '' is no filter
+    circuits = [''] if circuits is None else list(circuits)
+    classifications = [''] if classifications is None else list(classifications)
+    queries = [(int(year), circuit, classification)
+               for year in years for circuit in circuits for classification in classifications]
+
+    # calendars of past years from previous runs
+    saved = read_calendar_index(index_path) if index_path is not None else {}
+    this_year = datetime.date.today().year
+    missing = [x for x in queries if x not in saved or x[0] >= this_year]
+
+    # request the rest at the same time
+    outs = rqm.call_many(lambda year, circuit, classification: race_options_by_year(year, circuit = circuit, classification = classification),
+                         missing, max_workers)
+
+    # preset empty list of the calendars that couldn't be requested
+    failed = []
+
+    for query, out in zip(missing, outs):
+        if isinstance(out, pd.DataFrame):
+            saved[query] = out
+        else:
+            failed = failed + [list(query) + [type(out).__name__ + ': ' + str(out)]]
+
+    # only past years are final, the index is rewritten whole so it never holds duplicates
+    if index_path is not None and any(isinstance(out, pd.DataFrame) and query[0] < this_year for query, out in zip(missing, outs)):
+        write_calendar_index(index_path, {x:saved[x] for x in saved if x[0] < this_year})
+
+    # one frame of every calendar in the order of the queries
+    frames = [saved[x].assign(year = x[0], circuit = x[1]) for x in queries if x in saved]
+    if len(frames) > 0:
+        calendar = pd.concat(frames, ignore_index = True).loc[:, calendar_columns]
+    else:
+        calendar = pd.DataFrame(columns = calendar_columns)
+
+    # a race matching several circuits/classifications is kept once
+    calendar = calendar.drop_duplicates(subset = 'race_href', keep = 'first')
+    calendar = calendar.sort_values(by = 'year', kind = 'stable').reset_index(drop = True)
+
+    # a missing calendar isn't an empty one, say which are missing
+    calendar.attrs['failed'] = [dict(zip(['year', 'circuit', 'classification', 'error'], x)) for x in failed]
+    if len(failed) > 0:
+        warnings.warn(str(len(failed)) + ' calendar(s) could not be requested and are missing: ' +
+                      ', '.join(str(tuple(x[:3])) for x in failed))
+
+    return calendar
+
+def write_calendar_index(path: str, calendars: dict):
+    """
+    Writes calendars to the index file of race_options_by_years(), replacing what was there
+    - written to a temporary file and renamed into place so a reader never sees half an index
+
+    Args:
+        path (str): the json lines file
+        calendars (dict): (year, circuit, classification) -> pd.DataFrame like race_options_by_year()
+    """
+
+    temp = path + '.' + str(os.getpid()) + '.tmp'
+
+    with open(temp, 'w') as index:
+        for (year, circuit, classification), races in calendars.items():
+            index.write(json.dumps({'year':year, 'circuit':circuit, 'classification':classification,
+                                    'races':races.loc[:, calendar_columns[2:]].values.tolist()}) + '\n')
+
+    os.replace(temp, path)
+
+def read_calendar_index(path: str):
+    """
+    Reads the calendars saved by race_options_by_years()
+
+    Args:
+        path (str): the json lines file
+
+    Returns:
+        dict: (year, circuit, classification) -> pd.DataFrame like race_options_by_year() (later lines replace earlier ones)
+    """
+
+    # preset empty dictionary
+    calendars = {}
+
+    if not os.path.exists(path):
+        return calendars
+
+    with open(path, 'r') as index:
+        for line in index:
+            try:
+                entry = json.loads(line)
+            # a line cut short by a crash
+            except ValueError:
+                continue
+            calendars[(entry['year'], entry['circuit'], entry['classification'])] = pd.DataFrame(data = entry['races'],
+                                                                                              columns = calendar_columns[2:])
+
+    return calendars
+
+@ins.instrumented
 def teams_by_year(year: int, gender: str):
     """
     Returns a list of avaliable teams to request based on the year & gender
@@ -158,8 +293,7 @@ def teams_by_year(year: int, gender: str):
     )
 
     # request and soup
-    response = req.get(url)
-    soup = BeautifulSoup(response.content, 'html.parser')
+    soup = rqm.get_soup(url)
     
     # the page 
     page = soup.find("div", class_ = "page-content page-object default")
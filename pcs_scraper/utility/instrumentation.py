@@ -0,0 +1,224 @@
+import time
+import inspect
+import threading
+import warnings
+import contextvars
+from functools import wraps
+
+### Hooks that receive a structured event for every page fetched and every page parsed
+# events are dicts:
+#   fetch: {'event':'fetch', 'time', 'method', 'url', 'page_type', 'status', 'bytes', 'cache',
+#           'connect_seconds', 'wait_seconds', 'transfer_seconds', 'total_seconds'}
+#       - cache is 'hit', 'miss', 'shared' (joined an identical request already running),
+#         'negative' (known missing page, not requested) or None when no page cache is active
+#       - connect_seconds covers dns + tcp + tls and is 0 when a pooled connection was reused
+#   parse: {'event':'parse', 'time', 'method', 'seconds', 'fetch_seconds', 'parse_seconds',
+#           'fetches', 'rows', 'error', 'nested'}
+#       - parse_seconds is the time spent in the method that wasn't spent fetching
+#       - rows is the length of the returned dataframe/list (1 for a dict, None otherwise)
+#       - nested is True when the method ran inside another instrumented method (ie. iter_race_history
+#         inside get_race_history); its time is already in the outer method's event and rows is None,
+#         so totals only add up the events that aren't nested
+# method is the qualified name of the calling method (ie. 'Race.get_running_gc_time')
+
+# the registered hooks
+_hooks = []
+# the stack of instrumented methods currently running (each a dict of the fetches made inside it)
+_method_stack = contextvars.ContextVar('pcs_method_stack', default = ())
+# fetches made in worker threads add to the same frames
+_lock = threading.Lock()
+
+def add_hook(hook):
+    """
+    Registers a function to be called with every event
+
+    Args:
+        hook (callable): called as hook(event) with the event dict
+    """
+
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+def remove_hook(hook):
+    """
+    Unregisters a hook added with add_hook()
+
+    Args:
+        hook (callable): the hook to remove
+    """
+
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+def active():
+    """
+    Whether any hooks are registered (events are only built when there are)
+
+    Returns:
+        bool: True if at least one hook is registered
+    """
+
+    return len(_hooks) > 0
+
+def emit(event: dict):
+    """
+    Sends an event to every hook, a failing hook never breaks the scraping
+
+    Args:
+        event (dict): the event
+    """
+
+    event['time'] = time.time()
+    for hook in list(_hooks):
+        try:
+            hook(event)
+        except Exception as err:
+            warnings.warn('pcs_scraper instrumentation hook failed: ' + repr(err))
+
+def current_method():
+    """
+    The innermost instrumented method running in this thread/context
+
+    Returns:
+        str/None: the qualified method name (ie. 'Race.get_stage_result')
+    """
+
+    stack = _method_stack.get()
+    if len(stack) == 0:
+        return None
+
+    return stack[-1]['method']
+
+def record_fetch(event: dict):
+    """
+    Emits a fetch event, tagged with the calling method, and adds its time to the running methods
+
+    Args:
+        event (dict): the fetch event without 'event', 'method' and 'time'
+    """
+
+    stack = _method_stack.get()
+    event['event'] = 'fetch'
+    event['method'] = stack[-1]['method'] if len(stack) > 0 else None
+
+    # every method on the stack spent this time fetching
+    with _lock:
+        for frame in stack:
+            frame['fetch_seconds'] = frame['fetch_seconds'] + event['total_seconds']
+            frame['fetches'] = frame['fetches'] + 1
+
+    emit(event)
+
+def count_rows(out):
+    """
+    The number of rows a method returned
+
+    Args:
+        out: the output of the method
+
+    Returns:
+        int/None: the rows extracted
+    """
+
+    if isinstance(out, dict):
+        return 1
+    elif hasattr(out, '__len__') and not isinstance(out, str):
+        return len(out)
+
+    return None
+
+def instrumented(func):
+    """
+    Decorator for the methods that fetch/parse pages
+    - fetches made inside are tagged with the method's qualified name
+    - a parse event is emitted when the method returns (or for every batch a generator yields)
+    Does nothing beyond a single check when no hooks are registered
+
+    Args:
+        func (callable): the method
+
+    Returns:
+        callable: the wrapped method
+    """
+
+    method = func.__qualname__
+
+    def enter():
+        stack = _method_stack.get()
+        frame = {'method':method, 'fetch_seconds':0, 'fetches':0, 'nested':len(stack) > 0}
+        token = _method_stack.set(stack + (frame,))
+        return frame, token, time.perf_counter()
+
+    def leave(frame, token, start, out, error):
+        seconds = time.perf_counter() - start
+        _method_stack.reset(token)
+        emit({'event':'parse',
+              'method':method,
+              'seconds':seconds,
+              'fetch_seconds':frame['fetch_seconds'],
+              'parse_seconds':max(0, seconds - frame['fetch_seconds']),
+              'fetches':frame['fetches'],
+              # the outermost method reports the rows
+              'rows':None if frame['nested'] else count_rows(out),
+              'error':None if error is None else repr(error),
+              'nested':frame['nested']})
+
+    if inspect.isgeneratorfunction(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            gen = func(*args, **kwargs)
+            # close the inner generator when the consumer stops early
+            try:
+                while True:
+                    if not active():
+                        batch = next(gen, StopIteration)
+                    else:
+                        frame, token, start = enter()
+                        try:
+                            batch = next(gen, StopIteration)
+                        except Exception as err:
+                            leave(frame, token, start, None, err)
+                            raise
+                        if batch is StopIteration:
+                            _method_stack.reset(token)
+                        else:
+                            leave(frame, token, start, batch, None)
+                    if batch is StopIteration:
+                        return
+                    yield batch
+            finally:
+                gen.close()
+    else:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not active():
+                return func(*args, **kwargs)
+            frame, token, start = enter()
+            try:
+                out = func(*args, **kwargs)
+            except Exception as err:
+                leave(frame, token, start, None, err)
+                raise
+            leave(frame, token, start, out, None)
+            return out
+
+    return wrapper
+
+def in_context(func):
+    """
+    Wraps a function handed to a worker thread so its fetches are still tagged with the calling method
+
+    Args:
+        func (callable): the function to run in worker threads
+
+    Returns:
+        callable: the wrapped function
+    """
+
+    context = contextvars.copy_context()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,240 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from . import instrumentation as ins
+
+### Counters and histograms built from the instrumentation events, exported in Prometheus text format
+
+# default histogram buckets in seconds
+DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+class ScraperMetrics:
+    def __init__(self, buckets = None):
+        """
+        Collects metrics about every fetch and parse once installed (see install())
+            - pcs_requests_total{page_type, status}: pages requested (cache hits included as status 200)
+            - pcs_request_seconds{page_type}: histogram of request latency (cache misses only)
+            - pcs_response_bytes_total{page_type}: bytes received (cache misses only)
+            - pcs_cache_requests_total{result}: page cache hits, misses, requests shared with another thread
+              and known missing pages, and pcs_cache_hit_ratio
+            - pcs_parse_seconds{method}: histogram of time spent parsing in each method called directly
+              (not from inside another instrumented method, so nothing is counted twice)
+            - pcs_rows_total{method}: rows returned by each method called directly
+            - pcs_method_errors_total{method}: methods that raised
+
+        Args:
+            buckets (list, optional): upper bounds of the histogram buckets in seconds. Defaults to DEFAULT_BUCKETS.
+        """
+
+        self.buckets = sorted(buckets if buckets is not None else DEFAULT_BUCKETS)
+        self._lock = threading.Lock()
+        # name -> {labels tuple: value}
+        self.counters = {'pcs_requests_total':{}, 'pcs_response_bytes_total':{},
+                         'pcs_cache_requests_total':{}, 'pcs_rows_total':{}, 'pcs_method_errors_total':{}}
+        # name -> {labels tuple: [bucket counts, sum, count]}
+        self.histograms = {'pcs_request_seconds':{}, 'pcs_parse_seconds':{}}
+        self._server = None
+
+    def install(self):
+        """
+        Starts collecting by registering as an instrumentation hook
+
+        Returns:
+            ScraperMetrics: self, for chaining
+        """
+
+        ins.add_hook(self)
+
+        return self
+
+    def uninstall(self):
+        """
+        Stops collecting
+        """
+
+        ins.remove_hook(self)
+
+    def __call__(self, event: dict):
+        """
+        Updates the metrics with an instrumentation event
+
+        Args:
+            event (dict): the event, see utility.instrumentation
+        """
+
+        with self._lock:
+            if event['event'] == 'fetch':
+                page_type = str(event['page_type'])
+                self._inc('pcs_requests_total', (('page_type', page_type), ('status', str(event['status']))))
+                if event['cache'] is not None:
+                    self._inc('pcs_cache_requests_total', (('result', event['cache']),))
+                # a cache hit, shared request or known missing page didn't transfer anything
+                if event['cache'] not in ['hit', 'shared', 'negative']:
+                    self._inc('pcs_response_bytes_total', (('page_type', page_type),), event['bytes'])
+                    self._observe('pcs_request_seconds', (('page_type', page_type),), event['total_seconds'])
+
+            elif event['event'] == 'parse':
+                method = str(event['method'])
+                # a nested method's time & rows are already in the outer method's event
+                if not event.get('nested', False):
+                    self._observe('pcs_parse_seconds', (('method', method),), event['parse_seconds'])
+                if event['rows'] is not None:
+                    self._inc('pcs_rows_total', (('method', method),), event['rows'])
+                if event['error'] is not None:
+                    self._inc('pcs_method_errors_total', (('method', method),))
+
+    def _inc(self, name: str, labels: tuple, value = 1):
+        series = self.counters[name]
+        series[labels] = series.get(labels, 0) + value
+
+    def _observe(self, name: str, labels: tuple, value: float):
+        series = self.histograms[name]
+        if labels not in series:
+            series[labels] = [[0] * len(self.buckets), 0, 0]
+        entry = series[labels]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][i] = entry[0][i] + 1
+        entry[1] = entry[1] + value
+        entry[2] = entry[2] + 1
+
+    def render(self):
+        """
+        The metrics in Prometheus text exposition format
+
+        Returns:
+            str: the metrics text
+        """
+
+        helps = {'pcs_requests_total':'Pages requested from PCS by page type and status.',
+                 'pcs_response_bytes_total':'Bytes of page content received by page type.',
+                 'pcs_cache_requests_total':'Page cache lookups by result.',
+                 'pcs_rows_total':'Rows extracted by method.',
+                 'pcs_method_errors_total':'Scraper method calls that raised, by method.',
+                 'pcs_request_seconds':'Latency of requests to PCS by page type.',
+                 'pcs_parse_seconds':'Time spent parsing pages by method.'}
+
+        # preset empty list of lines
+        lines = []
+
+        with self._lock:
+            for name, series in self.counters.items():
+                lines = lines + ['# HELP ' + name + ' ' + helps[name], '# TYPE ' + name + ' counter']
+                for labels, value in sorted(series.items()):
+                    lines = lines + [name + format_labels(labels) + ' ' + format_value(value)]
+
+            # hit ratio of the page cache
+            cache = self.counters['pcs_cache_requests_total']
+            hits = cache.get((('result', 'hit'),), 0)
+            total = hits + cache.get((('result', 'miss'),), 0)
+            lines = lines + ['# HELP pcs_cache_hit_ratio Share of page cache lookups that were hits.',
+                             '# TYPE pcs_cache_hit_ratio gauge',
+                             'pcs_cache_hit_ratio ' + format_value(hits / total if total > 0 else 0)]
+
+            for name, series in self.histograms.items():
+                lines = lines + ['# HELP ' + name + ' ' + helps[name], '# TYPE ' + name + ' histogram']
+                for labels, (counts, total_sum, count) in sorted(series.items()):
+                    for bound, bucket_count in zip(self.buckets, counts):
+                        lines = lines + [name + '_bucket' + format_labels(labels + (('le', format_value(bound)),)) +
+                                         ' ' + str(bucket_count)]
+                    lines = lines + [name + '_bucket' + format_labels(labels + (('le', '+Inf'),)) + ' ' + str(count),
+                                     name + '_sum' + format_labels(labels) + ' ' + format_value(total_sum),
+                                     name + '_count' + format_labels(labels) + ' ' + str(count)]
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """
+        Dumps the metrics to a file (ie. for the node exporter textfile collector)
+        The file is replaced atomically so a scrape never reads half a file
+
+        Args:
+            path (str): the file to write
+        """
+
+        temp = path + '.tmp'
+        with open(temp, 'w') as out:
+            out.write(self.render())
+        os.replace(temp, path)
+
+    def serve(self, port = 9100, host = ''):
+        """
+        Serves the metrics over http at /metrics on a background thread
+
+        Args:
+            port (int, optional): the port to listen on (0 picks a free port). Defaults to 9100.
+            host (str, optional): the host to bind to. Defaults to all interfaces.
+
+        Returns:
+            ThreadingHTTPServer: the running server (stop it with stop())
+        """
+
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ['/metrics', '/']:
+                    self.send_error(404)
+                    return
+                content = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target = self._server.serve_forever, daemon = True).start()
+
+        return self._server
+
+    def stop(self):
+        """
+        Stops the http server started with serve()
+        """
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+def format_labels(labels: tuple):
+    """
+    Formats label pairs as {name="value",...} with Prometheus escaping
+
+    Args:
+        labels (tuple): (name, value) pairs
+
+    Returns:
+        str: the formatted labels ('' if there are none)
+    """
+
+    if len(labels) == 0:
+        return ''
+
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs = pairs + [name + '="' + value + '"']
+
+    return '{' + ','.join(pairs) + '}'
+
+def format_value(value):
+    """
+    Formats a number for the exposition format
+
+    Args:
+        value (int/float): the value
+
+    Returns:
+        str: the formatted value
+    """
+
+    if isinstance(value, int):
+        return str(value)
+
+    return repr(float(value))
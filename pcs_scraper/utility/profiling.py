@@ -0,0 +1,212 @@
+import time
+import threading
+from contextlib import contextmanager
+from functools import wraps
+import pandas as pd
+
+### Opt-in profiler for the table extraction loops (table_manipulation) and the conversions (convert_data)
+# each column branch of the extraction is a section, timed only while a profiler is running:
+#     with profiling.profile() as profiler:
+#         race.get_results()
+#     profiler.report()
+
+# the running profiler (None when profiling is off)
+_active = None
+
+class TableProfiler:
+    def __init__(self):
+        """
+        Accumulates the time spent in each section across every call made while it's running
+        """
+
+        # section -> [calls, seconds]
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, seconds: float):
+        """
+        Adds one timed run of a section
+
+        Args:
+            kind (str): the section name
+            seconds (float): the time it took
+        """
+
+        with self._lock:
+            entry = self.totals.get(kind)
+            if entry is None:
+                self.totals[kind] = [1, seconds]
+            else:
+                entry[0] = entry[0] + 1
+                entry[1] = entry[1] + seconds
+
+    def reset(self):
+        """
+        Clears everything recorded so far
+        """
+
+        with self._lock:
+            self.totals = {}
+
+    def report(self):
+        """
+        The time spent in each section, slowest first
+        Sections nest: column sections are a share of their function's total, conversions
+        (convert_data) are a share of table_output + table_output_ttt + complementary_points and are also counted in the column that called them
+
+        Returns:
+            pd.DataFrame: columns = ['function', 'section', 'calls', 'seconds', 'us_per_call', 'share']
+        """
+
+        with self._lock:
+            totals = dict(self.totals)
+
+        # the total time of the extraction functions (conversions are shared by all of them)
+        extraction = sum(totals.get(x, [0, 0])[1] for x in ['table_output', 'table_output_ttt', 'complementary_points'])
+
+        # preset empty list
+        rows = []
+
+        for kind, (calls, seconds) in totals.items():
+            function, _, name = kind.partition('.')
+            # the whole function
+            if name == '':
+                name = 'total'
+                parent = seconds
+            # conversions are a part of the extraction functions
+            elif function == 'convert_data':
+                parent = extraction
+            # column sections are a part of their function
+            else:
+                parent = totals.get(function, [0, 0])[1]
+            rows = rows + [[function, name, calls, seconds,
+                            seconds / calls * 1e6, seconds / parent if parent > 0 else 0]]
+
+        frame = pd.DataFrame(data = rows,
+                             columns = ['function', 'section', 'calls', 'seconds', 'us_per_call', 'share'])
+        frame = frame.sort_values(by = ['function', 'seconds'], ascending = [True, False]).reset_index(drop = True)
+
+        return frame
+
+class _NoSection:
+    # shared do-nothing section used while profiling is off
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *args):
+        return False
+
+_no_section = _NoSection()
+
+class _Section:
+    __slots__ = ['profiler', 'kind', 'start']
+
+    def __init__(self, profiler: TableProfiler, kind: str):
+        self.profiler = profiler
+        self.kind = kind
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args):
+        self.profiler.add(self.kind, time.perf_counter() - self.start)
+        return False
+
+def enabled():
+    """
+    Whether a profiler is running - check it once before a loop rather than entering a section per iteration
+
+    Returns:
+        bool: True while profiling is on
+    """
+
+    return _active is not None
+
+def section(kind: str):
+    """
+    Times the enclosed block as a section of the running profiler (does nothing if there isn't one)
+
+    Args:
+        kind (str): the section name as 'function.section' (ie. 'table_output.Time')
+
+    Returns:
+        context manager
+    """
+
+    profiler = _active
+    if profiler is None:
+        return _no_section
+
+    return _Section(profiler, kind)
+
+def profiled(kind: str):
+    """
+    Decorator that times every call of a function as a section (see section())
+
+    Args:
+        kind (str): the section name
+
+    Returns:
+        callable: the decorator
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return func(*args, **kwargs)
+            with section(kind):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+def start_profiling(profiler = None):
+    """
+    Turns profiling on
+
+    Args:
+        profiler (TableProfiler, optional): keep adding to an existing profiler. Defaults to a new one.
+
+    Returns:
+        TableProfiler: the running profiler
+    """
+
+    global _active
+    if profiler is None:
+        profiler = TableProfiler()
+    _active = profiler
+
+    return profiler
+
+def stop_profiling():
+    """
+    Turns profiling off
+
+    Returns:
+        TableProfiler/None: the profiler that was running
+    """
+
+    global _active
+    profiler = _active
+    _active = None
+
+    return profiler
+
+@contextmanager
+def profile(profiler = None):
+    """
+    Profiles everything run inside the with block
+
+    Args:
+        profiler (TableProfiler, optional): keep adding to an existing profiler. Defaults to a new one.
+
+    Yields:
+        TableProfiler: the running profiler, call report() on it afterwards
+    """
+
+    profiler = start_profiling(profiler)
+    try:
+        yield profiler
+    finally:
+        stop_profiling()
@@ -0,0 +1,502 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import requests as req
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from . import instrumentation as ins
+from . import url_management as mgt
+
+### Shared http client and page cache that every request to PCS goes through
+
+# time spent opening new connections in the current thread (for instrumentation events)
+_connect_timing = threading.local()
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _connect_timing.seconds = getattr(_connect_timing, 'seconds', 0) + time.perf_counter() - start
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _connect_timing.seconds = getattr(_connect_timing, 'seconds', 0) + time.perf_counter() - start
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections record how long they took to open (dns + tcp + tls)
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http':TimedHTTPConnectionPool,
+                                                   'https':TimedHTTPSConnectionPool}
+
+# one pooled session for the whole package so connections are reused between requests & threads
+session = req.Session()
+session.mount('https://', TimedHTTPAdapter(pool_connections = 8, pool_maxsize = 32))
+session.mount('http://', TimedHTTPAdapter(pool_connections = 8, pool_maxsize = 32))
+
+# the website every url in the package is built for
+PCS_URL = 'https://www.procyclingstats.com/'
+# where requests are actually sent (see set_base_url())
+_base_url = PCS_URL
+
+# the active page cache (None means every request goes to the website)
+_page_cache = None
+# the active cache of pages known not to exist (None means missing pages are requested every time)
+_negative_cache = None
+
+# how a page that doesn't exist is recognised when PCS answers it with a 200
+NOT_FOUND_MARKERS = [b'<title>Page not found', b'<h1>Page not found</h1>']
+
+# requests & parses currently running, so identical ones made at the same time share the result (see single_flight())
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+class PageCache:
+    def __init__(self):
+        """
+        In-memory cache of page content keyed by url, safe to share between threads
+        """
+
+        # url -> page content (bytes)
+        self.pages = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str):
+        """
+        Returns the cached content of a page
+
+        Args:
+            url (str): the url of the page
+
+        Returns:
+            bytes/None: the page content (None if the page isn't cached)
+        """
+
+        with self._lock:
+            return self.pages.get(url)
+
+    def set(self, url: str, content: bytes):
+        """
+        Stores the content of a page
+
+        Args:
+            url (str): the url of the page
+            content (bytes): the page content
+        """
+
+        with self._lock:
+            self.pages[url] = content
+
+    def __contains__(self, url):
+        with self._lock:
+            return url in self.pages
+
+    def __len__(self):
+        with self._lock:
+            return len(self.pages)
+
+class PageNotFoundError(LookupError):
+    def __init__(self, url: str):
+        """
+        Raised when a requested page doesn't exist on PCS (ie. a misspelled rider or a team/year that didn't race)
+
+        Args:
+            url (str): the url of the page
+        """
+
+        self.url = url
+        self.page_type = mgt.page_type(url)
+        super().__init__('Page not found on PCS (' + str(self.page_type) + '): ' + url)
+
+class NegativeCache:
+    def __init__(self, ttl = 86400, path = None):
+        """
+        Remembers the pages that don't exist so they aren't requested again until the ttl runs out
+
+        Args:
+            ttl (float, optional): seconds a page is treated as missing. Defaults to 86400 (1 day).
+            path (str, optional): json lines file to keep the misses in between runs. Defaults to None (memory only).
+        """
+
+        self.ttl = ttl
+        self.path = path
+        # url -> time it stops being treated as missing
+        self.misses = {}
+        self._lock = threading.Lock()
+
+        # load the misses of previous runs that haven't expired
+        if path is not None and os.path.exists(path):
+            now = time.time()
+            with open(path, 'r') as misses:
+                for line in misses:
+                    try:
+                        entry = json.loads(line)
+                    # a line cut short by a crash
+                    except ValueError:
+                        continue
+                    if entry['expires'] > now:
+                        self.misses[entry['url']] = entry['expires']
+
+    def add(self, url: str):
+        """
+        Marks a page as missing for the next ttl seconds
+
+        Args:
+            url (str): the url of the page
+        """
+
+        expires = time.time() + self.ttl
+        with self._lock:
+            self.misses[url] = expires
+            if self.path is not None:
+                with open(self.path, 'a') as misses:
+                    misses.write(json.dumps({'url':url, 'expires':expires}) + '\n')
+
+    def __contains__(self, url):
+        with self._lock:
+            expires = self.misses.get(url)
+            if expires is None:
+                return False
+            # forget expired misses so the page is requested again
+            if expires <= time.time():
+                del self.misses[url]
+                return False
+            return True
+
+    def __len__(self):
+        with self._lock:
+            return len(self.misses)
+
+def set_page_cache(cache):
+    """
+    Sets the cache that get_page() reads from and writes to
+
+    Args:
+        cache (PageCache/None): the cache to use (None turns caching off)
+
+    Returns:
+        PageCache/None: the previously active cache, so it can be restored
+    """
+
+    global _page_cache
+    previous = _page_cache
+    _page_cache = cache
+
+    return previous
+
+def get_page_cache():
+    """
+    Returns the active page cache
+
+    Returns:
+        PageCache/None: the active cache (None if caching is off)
+    """
+
+    return _page_cache
+
+@contextmanager
+def shared_pages():
+    """
+    Shares the pages requested inside the with block (ie. the stage pages of get_stage_matrix() and get_all_stage_info()):
+    a temporary PageCache is set for the block if no page cache is set, otherwise the set one is used
+
+    Yields:
+        PageCache: the cache in use
+    """
+
+    previous_cache = _page_cache
+    if previous_cache is None:
+        set_page_cache(PageCache())
+
+    try:
+        yield _page_cache
+    finally:
+        set_page_cache(previous_cache)
+
+def set_negative_cache(cache):
+    """
+    Sets the cache of missing pages that get_page() checks before requesting
+
+    Args:
+        cache (NegativeCache/None): the cache to use (None turns it off)
+
+    Returns:
+        NegativeCache/None: the previously active cache, so it can be restored
+    """
+
+    global _negative_cache
+    previous = _negative_cache
+    _negative_cache = cache
+
+    return previous
+
+def get_negative_cache():
+    """
+    Returns the active cache of missing pages
+
+    Returns:
+        NegativeCache/None: the active cache (None if it's off)
+    """
+
+    return _negative_cache
+
+def page_not_found(response):
+    """
+    Whether a response is PCS saying the page doesn't exist
+
+    Args:
+        response (requests.Response): the response
+
+    Returns:
+        bool: True if the page doesn't exist
+    """
+
+    if response.status_code in [404, 410]:
+        return True
+    elif response.status_code == 200:
+        content = response.content
+        return any(marker in content for marker in NOT_FOUND_MARKERS)
+
+    return False
+
+def set_base_url(base_url: str):
+    """
+    Sends every request to another host (ie. a local stand-in for PCS) instead of procyclingstats.com
+    Urls are still built and cached as PCS urls, only the request is redirected
+
+    Args:
+        base_url (str): the host to use, ending in '/' (ie. 'http://127.0.0.1:8000/')
+
+    Returns:
+        str: the previous base url, so it can be restored
+    """
+
+    global _base_url
+    previous = _base_url
+    _base_url = base_url
+
+    return previous
+
+def single_flight(key, func, *args):
+    """
+    Runs func(*args) once for every thread asking for the same key at the same time
+    - the first thread runs it, the others wait and get the same output (or the same error)
+    - nothing is kept once it's finished, later calls run again (that's what the page cache is for)
+
+    Args:
+        key (hashable): identifies identical calls (ie. ('page', url))
+        func (callable): the function to run
+
+    Returns:
+        tuple: (the output of func, True if it was shared from another thread's call)
+    """
+
+    with _in_flight_lock:
+        flight = _in_flight.get(key)
+        leader = flight is None
+        if leader:
+            flight = {'done':threading.Event(), 'out':None, 'error':None}
+            _in_flight[key] = flight
+
+    # identical call already running, wait for it
+    if not leader:
+        flight['done'].wait()
+        if flight['error'] is not None:
+            raise flight['error']
+        return flight['out'], True
+
+    try:
+        flight['out'] = func(*args)
+    except BaseException as err:
+        flight['error'] = err
+        raise
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+        flight['done'].set()
+
+    return flight['out'], False
+
+def get_page(url: str):
+    """
+    Requests a page from PCS, using the active page cache if there is one
+    Identical requests made at the same time from several threads are only sent once
+
+    Args:
+        url (str): the url to request
+
+    Returns:
+        requests.Response: the response (built from the cached content on a cache hit)
+
+    Raises:
+        PageNotFoundError: the page doesn't exist (or is in the active negative cache)
+    """
+
+    cache = _page_cache
+    negative_cache = _negative_cache
+
+    # known to be missing, don't request it again
+    if negative_cache is not None and url in negative_cache:
+        if ins.active():
+            ins.record_fetch({'url':url, 'page_type':mgt.page_type(url), 'status':404,
+                              'bytes':0, 'cache':'negative',
+                              'connect_seconds':0, 'wait_seconds':0, 'transfer_seconds':0, 'total_seconds':0})
+        raise PageNotFoundError(url)
+
+    # check the cache first
+    if cache is not None:
+        content = cache.get(url)
+        if content is not None:
+            if ins.active():
+                ins.record_fetch({'url':url, 'page_type':mgt.page_type(url), 'status':200,
+                                  'bytes':len(content), 'cache':'hit',
+                                  'connect_seconds':0, 'wait_seconds':0, 'transfer_seconds':0, 'total_seconds':0})
+            return cached_response(url, content)
+
+    response, shared = single_flight(('page', url), fetch_page, url, cache)
+
+    # waited on another thread's request
+    if shared and ins.active():
+        ins.record_fetch({'url':url, 'page_type':mgt.page_type(url), 'status':response.status_code,
+                          'bytes':len(response.content), 'cache':'shared',
+                          'connect_seconds':0, 'wait_seconds':0, 'transfer_seconds':0, 'total_seconds':0})
+
+    if page_not_found(response):
+        if negative_cache is not None:
+            negative_cache.add(url)
+        raise PageNotFoundError(url)
+
+    return response
+
+def fetch_page(url: str, cache = None):
+    """
+    Sends the request for a page (use get_page(), which checks the cache and joins identical requests first)
+
+    Args:
+        url (str): the url to request
+        cache (PageCache, optional): the cache to store the page in. Defaults to None.
+
+    Returns:
+        requests.Response: the response
+    """
+
+    instrument = ins.active()
+
+    # redirect the request if another host is set
+    request_url = url
+    if _base_url != PCS_URL and url.startswith(PCS_URL):
+        request_url = _base_url + url[len(PCS_URL):]
+
+    # request the page with the shared session
+    if instrument:
+        _connect_timing.seconds = 0
+        start = time.perf_counter()
+    response = session.get(request_url)
+    
+    # time to open the connection, wait for the headers and then read the page
+    if instrument:
+        total = time.perf_counter() - start
+        connect = _connect_timing.seconds
+        wait = response.elapsed.total_seconds()
+        ins.record_fetch({'url':url, 'page_type':mgt.page_type(url), 'status':response.status_code,
+                          'bytes':len(response.content), 'cache':None if cache is None else 'miss',
+                          'connect_seconds':connect, 'wait_seconds':max(0, wait - connect),
+                          'transfer_seconds':max(0, total - wait), 'total_seconds':total})
+
+    # only cache pages that were successfully returned
+    if cache is not None and response.status_code == 200 and not page_not_found(response):
+        cache.set(url, response.content)
+
+    return response
+
+def get_soup(url: str):
+    """
+    Requests a page from PCS (see get_page()) and turns it into soup
+    Identical calls made at the same time share one request and one parse, so the soup must only be read
+
+    Args:
+        url (str): the url to request
+
+    Returns:
+        BeautifulSoup: the parsed page
+    """
+
+    soup, _ = single_flight(('soup', url), parse_page, url)
+
+    return soup
+
+def parse_page(url: str):
+    """
+    Requests a page (see get_page()) and parses it
+
+    Args:
+        url (str): the url to request
+
+    Returns:
+        BeautifulSoup: the parsed page
+    """
+
+    response = get_page(url)
+    soup = BeautifulSoup(response.content, "html.parser")
+
+    return soup
+
+def cached_response(url: str, content: bytes):
+    """
+    Builds a response object around cached page content
+
+    Args:
+        url (str): the url of the page
+        content (bytes): the page content
+
+    Returns:
+        requests.Response: response with status 200 and the content
+    """
+
+    response = req.models.Response()
+    response.url = url
+    response.status_code = 200
+    response._content = content
+
+    return response
+
+def call_many(func, args_list: list, max_workers = 8):
+    """
+    Calls a function for each set of arguments concurrently over the shared session
+    Errors are returned in place of the output rather than raised
+
+    Args:
+        func (callable): the function to call
+        args_list (list): a tuple of positional arguments for each call
+        max_workers (int, optional): the most calls to run at the same time. Defaults to 8.
+
+    Returns:
+        list: the output (or the exception raised) of each call, in the order of args_list
+    """
+
+    def call(args):
+        try:
+            return func(*args)
+        except Exception as err:
+            return err
+
+    with ThreadPoolExecutor(max_workers = max_workers) as pool:
+        out = list(pool.map(call, args_list))
+
+    return out
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+### Functions that rebuild standings from the stage results of a race, without requesting the standings pages
+
+# the rider/team columns carried over from the stage results
+rider_columns = ['rider_name', 'rider_href', 'rider_pcs_name',
+                 'team_name', 'team_href', 'team_pcs_name', 'team_pcs_year']
+
+def result_matrices(stage_results: pd.DataFrame, columns: list, stages = None):
+    """
+    Scatters numeric columns of the stage results of a race into riders x stages arrays
+
+    Args:
+        stage_results (pd.DataFrame): the results of every stage, ie. pd.concat(race.iter_stage_results())
+            - needs 'stage_pcs_name' and the rider/team columns of get_stage_result()
+        columns (list): the columns to turn into arrays (ie. ['rank', 'time'])
+        stages (list, optional): the stage_pcs_name of each column of the arrays. Defaults to the order stages first appear.
+
+    Returns:
+        tuple: (riders, stages, matrices)
+            - riders (pd.DataFrame): the rider/team columns, one row per rider (row i is row i of the arrays)
+            - stages (list): the stage_pcs_name of each column of the arrays
+            - matrices (dict): column -> float64 riders x stages array (nan if the rider has no value/isn't in the stage)
+    """
+
+    if stages is None:
+        stages = list(pd.unique(stage_results.loc[:, 'stage_pcs_name']))
+    else:
+        stages = list(stages)
+        stage_results = stage_results.loc[stage_results.loc[:, 'stage_pcs_name'].isin(stages), :]
+
+    # the row & column of every result
+    stage_codes = pd.Categorical(stage_results.loc[:, 'stage_pcs_name'], categories = stages).codes
+    rider_codes, rider_names = pd.factorize(stage_results.loc[:, 'rider_pcs_name'])
+
+    # one row of rider details for each rider
+    riders = stage_results.loc[:, rider_columns].drop_duplicates(subset = 'rider_pcs_name', keep = 'first')
+    riders = riders.set_index('rider_pcs_name', drop = False).loc[rider_names, :].reset_index(drop = True)
+
+    # preset empty dictionary
+    matrices = {}
+
+    for column in columns:
+        # text such as 'DNF' or '-' becomes nan
+        values = pd.to_numeric(stage_results.loc[:, column], errors = 'coerce').to_numpy(dtype = np.float64)
+        matrix = np.full((len(rider_names), len(stages)), np.nan)
+        matrix[rider_codes, stage_codes] = values
+        matrices[column] = matrix
+
+    return riders, stages, matrices
+
+def stage_time_matrix(stage_results: pd.DataFrame, stages = None):
+    """
+    Turns the stage results of a race into riders x stages arrays of time, position and whether the stage was finished
+
+    Args:
+        stage_results (pd.DataFrame): the results of every stage, see result_matrices()
+            - needs 'stage_pcs_name', 'rank', 'time' and the rider/team columns of get_stage_result()
+        stages (list, optional): the stage_pcs_name of each column of the arrays. Defaults to the order stages first appear.
+
+    Returns:
+        tuple: (riders, stages, times, positions, finished)
+            - riders (pd.DataFrame): the rider/team columns, one row per rider (row i is row i of the arrays)
+            - stages (list): the stage_pcs_name of each column of the arrays
+            - times (np.ndarray): float64 riders x stages, the time of the rider in each stage in seconds (nan if not finished)
+            - positions (np.ndarray): float64 riders x stages, the finishing position in each stage (nan if not finished)
+            - finished (np.ndarray): bool riders x stages, whether the rider finished the stage
+    """
+
+    riders, stages, matrices = result_matrices(stage_results, ['rank', 'time'], stages)
+
+    # ranks are numbers for finishers and 'DNF', 'DNS', 'OTL', 'DSQ' otherwise (a ttt gives every rider the team's position)
+    # riders missing from a stage haven't finished it
+    finished = ~np.isnan(matrices['rank']) & ~np.isnan(matrices['time'])
+    times = np.where(finished, matrices['time'], np.nan)
+    positions = np.where(finished, matrices['rank'], np.nan)
+
+    return riders, stages, times, positions, finished
+
+def cumulative_times(times: np.ndarray, finished: np.ndarray):
+    """
+    Sums the stage times of the riders still in the race after every stage
+
+    Args:
+        times (np.ndarray): riders x stages stage times, see stage_time_matrix()
+        finished (np.ndarray): riders x stages whether the rider finished the stage
+
+    Returns:
+        tuple: (total, in_race)
+            - total (np.ndarray): float64 riders x stages, the total time after each stage (nan once out of the race)
+            - in_race (np.ndarray): bool riders x stages, finished this stage and every stage before it (stages nobody finished are skipped)
+    """
+
+    # a stage nobody finished (ie. cancelled) doesn't put everyone out of the race
+    cancelled = ~finished.any(axis = 0)
+    in_race = np.logical_and.accumulate(finished | cancelled, axis = 1)
+    total = np.cumsum(np.where(finished, times, 0), axis = 1)
+    total[~in_race] = np.nan
+
+    return total, in_race
+
+def running_gc(stage_results: pd.DataFrame, adjustments = None):
+    """
+    Rebuilds the general classification after every stage by summing the stage times of the riders still in the race
+    - a rider leaves the gc at the first stage they didn't finish (DNF/DNS/OTL/DSQ or missing from the results)
+    - stage results don't include time bonuses or penalties, pass them as adjustments to match the official gc
+    - ties on time are broken by the position in the latest stage
+
+    Args:
+        stage_results (pd.DataFrame): the results of every stage, see stage_time_matrix()
+        adjustments (pd.DataFrame, optional): seconds to add to a rider's time in a stage (negative for bonuses). Defaults to None.
+            - columns = ['stage_pcs_name', 'rider_pcs_name', 'seconds']
+            - also useful for what-ifs (ie. taking away a crash's time loss)
+
+    Returns:
+        pd.DataFrame: the gc after each stage, ordered by stage then rank
+            - columns = ['stage_pcs_name', 'rank',
+                         'rider_name', 'rider_href', 'rider_pcs_name',
+                         'team_name', 'team_href', 'team_pcs_name', 'team_pcs_year',
+                         'time', 'time_gap']
+    """
+
+    riders, stages, times, positions, finished = stage_time_matrix(stage_results)
+
+    # add the bonuses/penalties to the stage times
+    if adjustments is not None and len(adjustments) > 0:
+        rows = pd.Index(riders.loc[:, 'rider_pcs_name']).get_indexer(adjustments.loc[:, 'rider_pcs_name'])
+        cols = pd.Index(stages).get_indexer(adjustments.loc[:, 'stage_pcs_name'])
+        known = (rows >= 0) & (cols >= 0)
+        np.add.at(times, (rows[known], cols[known]), adjustments.loc[:, 'seconds'].to_numpy(dtype = np.float64)[known])
+
+    # total time after each stage of the riders still in the race
+    total, in_race = cumulative_times(times, finished)
+
+    # preset empty lists of the rows of each stage's gc
+    stage_index = []
+    rider_index = []
+    ranks = []
+
+    for j in range(len(stages)):
+        # the riders still in the race, sorted by total time then the stage position
+        riders_in = np.flatnonzero(in_race[:, j])
+        order = riders_in[np.lexsort((positions[riders_in, j], total[riders_in, j]))]
+        stage_index = stage_index + [np.full(len(order), j)]
+        rider_index = rider_index + [order]
+        ranks = ranks + [np.arange(1, len(order) + 1)]
+
+    if len(stages) == 0:
+        stage_index, rider_index, ranks = [np.zeros(0, dtype = int)] * 3
+    else:
+        stage_index = np.concatenate(stage_index)
+        rider_index = np.concatenate(rider_index)
+        ranks = np.concatenate(ranks)
+
+    # leader's time of each stage for the gaps
+    leader = np.nanmin(np.where(in_race, total, np.inf), axis = 0) if len(stages) > 0 else np.zeros(0)
+    time = total[rider_index, stage_index]
+
+    gc = riders.iloc[rider_index, :].reset_index(drop = True)
+    gc.insert(0, 'rank', ranks)
+    gc.insert(0, 'stage_pcs_name', np.array(stages, dtype = object)[stage_index])
+    gc.loc[:, 'time'] = time
+    gc.loc[:, 'time_gap'] = time - leader[stage_index]
+
+    return gc
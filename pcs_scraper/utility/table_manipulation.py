@@ -1,4 +1,5 @@
 from . import convert_data as cvt
+from . import profiling as prf
 import numpy as np
 import pandas as pd
 
@@ -61,6 +62,7 @@ def result_cont_index(restabs, result_type):
     
     return index
 
+@prf.profiled('table_output')
 def table_output(body, column_names: list, column_indices: list):
     """
     Untangles the data table on PCS and converts to nested list
@@ -76,96 +78,149 @@ def table_output(body, column_names: list, column_indices: list):
     
     # preset empty list for the results
     results = []
+    # the profiler section of each column, only entered while profiling (checked once per table)
+    sections = ['table_output.' + x for x in column_names]
+    profiling = prf.enabled()
+    # set by the first row's time
+    winning_time = None
     
     # loop through the rows in table
     for i, row in enumerate(body):
         
-        # find all the columns for the given row
-        cols = row.find_all('td')
-        # only keep the column indices of choice
-        cols = [x for i, x in enumerate(cols) if i in column_indices]
+        if profiling:
+            with prf.section('table_output.row'):
+                cols = kept_columns(row, column_indices)
+        else:
+            cols = kept_columns(row, column_indices)
         
         # preset empty list for current row
         current_result = []
         
         # loop through the columns that have been kept
-        for col, col_title in zip(cols, column_names):
-            # extract rank
-            if col_title == 'Rnk':
-                rider_rank = col.text
-                current_result = current_result + [rider_rank]
-            # extract rider name
-            elif col_title == 'Rider':
-                rider_name = cvt.printed_rider_to_first_last(col.find('a').text)
-                rider_href = col.find('a', href = True).get('href')
-                rider_pcs_name = rider_href[6:]
-                current_result = current_result + [rider_name, rider_href, rider_pcs_name]
-            # extract the team name
-            elif col_title == 'Team':
-                team_name = col.find('a')
-                # if the team name doesn't exist (some time will be the case for smaller races/nat champs)
-                if team_name == None:
-                    team_name = 'N/A'
-                    team_href = 'N/A'
-                    team_pcs_name = 'N/A'
-                    team_pcs_year = 'N/A'
-                else:
-                    team_name = team_name.text
-                    team_href = col.find('a', href = True).get('href')
-                    team_pcs_name = team_href[5:-5]
-                    team_pcs_year = team_href[-4:]
-                current_result = current_result + [team_name, team_href, team_pcs_name, team_pcs_year]
-            # extract uci points
-            elif col_title == 'UCI':
-                uci_points = col.text
-                current_result = current_result + [uci_points]
-            # extract pcs points
-            elif col_title == 'Pnt':
-                pcs_points = col.text
-                current_result = current_result + [pcs_points]
-            # extract time
-            elif col_title == 'Time':
-                # first row has winning time
-                if i == 0:
-                    # extract the text of the time
-                    time = col.text
-                    # if results dont have the time of the riders
-                    if time == '-':
-                        time = '00:01'
-                    if '\xa0' in time:
-                        last_colon = [i for i, x in enumerate(time) if x == ':'][-1]
-                        time = time[:last_colon+3]
-                    # convert time to seconds
-                    time = cvt.printed_time_to_seconds(time)
-                    # set the winning time
-                    winning_time = time
-                    # winner doesn't have a time gap
-                    time_gap = 0
-                # if not first row, need to reference the winning time to get total time of each rider
-                else:
-                    # when the rider recorded a time
-                    try:
-                        time_gap = col.find('div', class_="hide").text
-                        if '+' in time_gap:
-                            time_gap = time_gap[:time_gap.find('+')]
-                        time_gap = cvt.printed_time_to_seconds(time_gap)
-                        time = winning_time + time_gap
-                    # when the rider didn't record a time (ie. DNF'ed)
-                    except:
-                        time = col.text
-                        time = np.nan
-                        time_gap = np.nan
-                current_result = current_result + [time, time_gap]
-            # extract points for kom/sprint
-            elif col_title == 'Points':
-                points = col.text
-                current_result = current_result + [points]                
+        for col, col_title, col_section in zip(cols, column_names, sections):
+            if profiling:
+                with prf.section(col_section):
+                    values, winning_time = table_cell(col, col_title, i == 0, winning_time)
+            else:
+                values, winning_time = table_cell(col, col_title, i == 0, winning_time)
+            current_result = current_result + values
 
         # concat to nested list 
         results = results + [current_result]
 
     return results
 
+def kept_columns(row, column_indices: list):
+    """
+    The columns of a table row to extract
+
+    Args:
+        row: soup object of the row
+        column_indices (list): the indices of the columns to extract
+
+    Returns:
+        list: the soup objects of the kept columns
+    """
+
+    # find all the columns for the given row
+    cols = row.find_all('td')
+    # only keep the column indices of choice
+    cols = [x for i, x in enumerate(cols) if i in column_indices]
+
+    return cols
+
+def table_cell(col, col_title: str, first_row: bool, winning_time):
+    """
+    Extracts the values of one column of a row of a results table (see table_output())
+
+    Args:
+        col: soup object of the column
+        col_title (str): the name of the column (ie. 'Rider')
+        first_row (bool): whether it's the winner's row, which holds the winning time
+        winning_time (float/None): the winning time in seconds (None until the first row is read)
+
+    Returns:
+        tuple: (values, winning_time)
+            - values (list): the values the column adds to the row
+            - winning_time (float/None): the winning time, set by the first row's 'Time'
+    """
+
+    # extract rank
+    if col_title == 'Rnk':
+        rider_rank = col.text
+        values = [rider_rank]
+    # extract rider name
+    elif col_title == 'Rider':
+        rider_name = cvt.printed_rider_to_first_last(col.find('a').text)
+        rider_href = col.find('a', href = True).get('href')
+        rider_pcs_name = rider_href[6:]
+        values = [rider_name, rider_href, rider_pcs_name]
+    # extract the team name
+    elif col_title == 'Team':
+        team_name = col.find('a')
+        # if the team name doesn't exist (some time will be the case for smaller races/nat champs)
+        if team_name == None:
+            team_name = 'N/A'
+            team_href = 'N/A'
+            team_pcs_name = 'N/A'
+            team_pcs_year = 'N/A'
+        else:
+            team_name = team_name.text
+            team_href = col.find('a', href = True).get('href')
+            team_pcs_name = team_href[5:-5]
+            team_pcs_year = team_href[-4:]
+        values = [team_name, team_href, team_pcs_name, team_pcs_year]
+    # extract uci points
+    elif col_title == 'UCI':
+        uci_points = col.text
+        values = [uci_points]
+    # extract pcs points
+    elif col_title == 'Pnt':
+        pcs_points = col.text
+        values = [pcs_points]
+    # extract time
+    elif col_title == 'Time':
+        # first row has winning time
+        if first_row:
+            # extract the text of the time
+            time = col.text
+            # if results dont have the time of the riders
+            if time == '-':
+                time = '00:01'
+            if '\xa0' in time:
+                last_colon = [i for i, x in enumerate(time) if x == ':'][-1]
+                time = time[:last_colon+3]
+            # convert time to seconds
+            time = cvt.printed_time_to_seconds(time)
+            # set the winning time
+            winning_time = time
+            # winner doesn't have a time gap
+            time_gap = 0
+        # if not first row, need to reference the winning time to get total time of each rider
+        else:
+            # when the rider recorded a time
+            try:
+                time_gap = col.find('div', class_="hide").text
+                if '+' in time_gap:
+                    time_gap = time_gap[:time_gap.find('+')]
+                time_gap = cvt.printed_time_to_seconds(time_gap)
+                time = winning_time + time_gap
+            # when the rider didn't record a time (ie. DNF'ed)
+            except:
+                time = col.text
+                time = np.nan
+                time_gap = np.nan
+        values = [time, time_gap]
+    # extract points for kom/sprint
+    elif col_title == 'Points':
+        points = col.text
+        values = [points]
+    else:
+        values = []
+
+    return values, winning_time
+
+@prf.profiled('table_output_ttt')
 def table_output_ttt(body, column_names: list, column_indices: list):
     """
     Untangles the data table on PCS and converts to nested list
@@ -271,6 +326,7 @@ def table_output_ttt(body, column_names: list, column_indices: list):
     return results
                         
                     
+@prf.profiled('complementary_points')
 def complementary_points(soup, startlist: pd.DataFrame, column_names: list, point_type: str):
     """_summary_
 
@@ -289,6 +345,9 @@ def complementary_points(soup, startlist: pd.DataFrame, column_names: list, poin
     possible_tables = soup.find("div", class_ = 'page-content page-object default').find_all('table', class_ = "basic")
 
     total_points = []
+    # the profiler section of each column, only entered while profiling (checked once per page)
+    sections = ['complementary_points.' + x for x in column_names]
+    profiling = prf.enabled()
     
     # loop through the titles and tables, getting them together
     for i, (title, table) in enumerate(zip(possible_titles, possible_tables)):
@@ -330,36 +389,12 @@ def complementary_points(soup, startlist: pd.DataFrame, column_names: list, poin
                     current_points = [title_text]
                     
                     # loop through the columns that have been kept
-                    for col, col_title in zip(cols, column_names):
-                        
-                        if col_title == 'Rnk':
-                            current_points = current_points + [int(col.text)]
-                        elif col_title == 'Rider':
-                            
-                            printed_name = col.find('a').text.split(' ')
-                            printed_name = list(map(lambda x:x.upper(), printed_name))
-                            printed_name[-1] = printed_name[-1].lower().capitalize()
-                            printed_name = ' '.join(printed_name)
-                            
-                            rider_name = cvt.printed_rider_to_first_last(printed_name)
-                            rider_href = col.find('a', href = True).get('href')
-                            rider_pcs_name = rider_href[6:]
-                            
-                            current_points = current_points + [rider_name, rider_href, rider_pcs_name]
-                            
-                        elif col_title == 'Team':
-                            printed_team = col.text
-                            
-                            team_row = startlist.loc[(startlist.loc[:,'team_name'] == printed_team), :].copy()
-                            team_name = team_row.loc[team_row.index.values[0], 'team_name']
-                            team_href = team_row.loc[team_row.index.values[0], 'team_href']
-                            team_pcs_name = team_row.loc[team_row.index.values[0], 'team_pcs_name']
-                            team_pcs_year = team_row.loc[team_row.index.values[0], 'team_pcs_year']
-                            
-                            current_points = current_points + [team_name, team_href, team_pcs_name, team_pcs_year]
-                        elif col_title == 'Points':
-                            points = int(col.text)
-                            current_points = current_points + [points]   
+                    for col, col_title, col_section in zip(cols, column_names, sections):
+                        if profiling:
+                            with prf.section(col_section):
+                                current_points = current_points + points_cell(col, col_title, startlist, point_type)
+                        else:
+                            current_points = current_points + points_cell(col, col_title, startlist, point_type)
                         
                     # concat to nested list 
                     total_points = total_points + [current_points]
@@ -395,37 +430,65 @@ def complementary_points(soup, startlist: pd.DataFrame, column_names: list, poin
                     current_points = [title_text]
                     
                     # loop through the columns that have been kept
-                    for col, col_title in zip(cols, column_names):
-                        
-                        if col_title == 'Rnk':
-                            current_points = current_points + [int(col.text)]
-                        elif col_title == 'Rider':
-                            
-                            printed_name = col.find('a').text.split(' ')
-                            printed_name = list(map(lambda x:x.upper(), printed_name))
-                            printed_name[-1] = printed_name[-1].lower().capitalize()
-                            printed_name = ' '.join(printed_name)
-                            
-                            rider_name = cvt.printed_rider_to_first_last(printed_name)
-                            rider_href = col.find('a', href = True).get('href')
-                            rider_pcs_name = rider_href[6:]
-                            
-                            current_points = current_points + [rider_name, rider_href, rider_pcs_name]
-                            
-                        elif col_title == 'Team':
-                            printed_team = col.text
-                            
-                            team_row = startlist.loc[(startlist.loc[:,'team_name'] == printed_team), :].copy()
-                            team_name = team_row.loc[team_row.index.values[0], 'team_name']
-                            team_href = team_row.loc[team_row.index.values[0], 'team_href']
-                            team_pcs_name = team_row.loc[team_row.index.values[0], 'team_pcs_name']
-                            
-                            current_points = current_points + [team_name, team_href, team_pcs_name]
-                        elif col_title == 'Points':
-                            points = int(col.text)
-                            current_points = current_points + [points]   
+                    for col, col_title, col_section in zip(cols, column_names, sections):
+                        if profiling:
+                            with prf.section(col_section):
+                                current_points = current_points + points_cell(col, col_title, startlist, point_type)
+                        else:
+                            current_points = current_points + points_cell(col, col_title, startlist, point_type)
                         
                     # concat to nested list 
                     total_points = total_points + [current_points]
 
-    return total_points
\ No newline at end of file
+    return total_points
+
+def points_cell(col, col_title: str, startlist: pd.DataFrame, point_type: str):
+    """
+    Extracts the values of one column of a row of a sprint/KOM points table (see complementary_points())
+
+    Args:
+        col: soup object of the column
+        col_title (str): the name of the column (ie. 'Rider')
+        startlist (pd.DataFrame): the race's startlist, to identify the teams
+        point_type (str): 'Sprint' or 'KOM'
+
+    Returns:
+        list: the values the column adds to the row
+    """
+
+    if col_title == 'Rnk':
+        values = [int(col.text)]
+    elif col_title == 'Rider':
+    
+        printed_name = col.find('a').text.split(' ')
+        printed_name = list(map(lambda x:x.upper(), printed_name))
+        printed_name[-1] = printed_name[-1].lower().capitalize()
+        printed_name = ' '.join(printed_name)
+    
+        rider_name = cvt.printed_rider_to_first_last(printed_name)
+        rider_href = col.find('a', href = True).get('href')
+        rider_pcs_name = rider_href[6:]
+    
+        values = [rider_name, rider_href, rider_pcs_name]
+    
+    elif col_title == 'Team':
+        printed_team = col.text
+    
+        team_row = startlist.loc[(startlist.loc[:,'team_name'] == printed_team), :].copy()
+        team_name = team_row.loc[team_row.index.values[0], 'team_name']
+        team_href = team_row.loc[team_row.index.values[0], 'team_href']
+        team_pcs_name = team_row.loc[team_row.index.values[0], 'team_pcs_name']
+        team_pcs_year = team_row.loc[team_row.index.values[0], 'team_pcs_year']
+    
+        # sprints carry the team's year, kom points don't
+        if point_type == 'Sprint':
+            values = [team_name, team_href, team_pcs_name, team_pcs_year]
+        else:
+            values = [team_name, team_href, team_pcs_name]
+    elif col_title == 'Points':
+        points = int(col.text)
+        values = [points]
+    else:
+        values = []
+
+    return values
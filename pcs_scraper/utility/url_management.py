@@ -110,4 +110,58 @@ def test_pcs_name(name: str):
         # convert to lowercase
         url_name = name.lower()
 
-    return url_name
\ No newline at end of file
+    return url_name
+
+def page_type(url: str):
+    """
+    Identifies the type of PCS page a url requests
+
+    Args:
+        url (str): the url (as created by the functions above or the php queries in Rider, Team & input_options)
+
+    Returns:
+        str: one of:
+            1) 'race_overview', 'race_results', 'startlist', 'stages', 'stage', 'complementary'
+            2) 'rider', 'rider_history', 'rider_points'
+            3) 'team', 'team_race_history'
+            4) 'teams_by_year', 'calendar'
+            - None if the url isn't a known PCS page
+    """
+    
+    # drop the leading url
+    path = url.split('procyclingstats.com/')[-1].lstrip('/')
+    
+    # the php queries
+    if path.startswith('races.php'):
+        kind = 'calendar'
+    elif path.startswith('teams.php'):
+        kind = 'teams_by_year'
+    elif path.startswith('team.php'):
+        kind = 'team_race_history'
+    elif path.startswith('rider.php'):
+        # the ranking pages used for season points
+        if 'uci-world-ranking' in path or 'pcs-season-ranking' in path:
+            kind = 'rider_points'
+        else:
+            kind = 'rider_history'
+    else:
+        # the pages of each rider, team & race
+        parts = path.split('?')[0].rstrip('/').split('/')
+        if parts[0] == 'rider':
+            kind = 'rider'
+        elif parts[0] == 'team':
+            kind = 'team'
+        elif parts[0] == 'race':
+            suffix = parts[3:]
+            if len(suffix) == 0:
+                kind = 'race_results'
+            elif path.rstrip('/').endswith('live/complementary-results'):
+                kind = 'complementary'
+            elif suffix[0] in ['overview', 'startlist', 'stages']:
+                kind = {'overview':'race_overview', 'startlist':'startlist', 'stages':'stages'}[suffix[0]]
+            else:
+                kind = 'stage'
+        else:
+            kind = None
+    
+    return kind
@@ -0,0 +1,43 @@
+import pandas as pd
+from pcs_scraper.rider import career_timeline, race_history_columns
+
+def race_history(dates):
+    return pd.DataFrame([[date, '1', 'Race', 'race/race/' + date[:4] + '/result', 'race', date[:4],
+                          '1.1', '150', '0', '0', '1000'] for date in dates],
+                        columns = race_history_columns)
+
+def team_history(rows):
+    return pd.DataFrame(rows, columns = ['season', 'team_name', 'team_href', 'team_pcs_name', 'team_pcs_year', 'since', 'until'])
+
+def test_nested_interval_falls_back_to_enclosing_team():
+    # a full season contract with a loan to another team in the middle of it
+    teams = team_history([['2019', 'Loan', 'team/loan-2019', 'loan', '2019', '2019-05-01', '2019-06-30'],
+                          ['2019', 'Contract', 'team/contract-2019', 'contract', '2019', '', '']])
+    results = race_history(['2019-03-01', '2019-05-15', '2019-06-30', '2019-07-01', '2019-12-31', '2020-01-01'])
+
+    timeline = career_timeline({'a': results}, {'a': teams})
+
+    assert timeline.loc[:, 'team_name'].tolist()[:5] == ['Contract', 'Loan', 'Loan', 'Contract', 'Contract']
+    assert pd.isna(timeline.loc[5, 'team_name'])
+
+def test_results_of_a_rider_never_get_another_riders_team():
+    teams = {'a': team_history([['2019', 'A', 'team/a-2019', 'a', '2019', '', '']]),
+             'b': team_history([['2020', 'B', 'team/b-2020', 'b', '2020', '', '']])}
+    results = {'a': race_history(['2020-06-01']), 'b': race_history(['2020-06-01', '2019-06-01'])}
+
+    timeline = career_timeline(results, teams)
+
+    assert pd.isna(timeline.loc[0, 'team_name'])
+    assert timeline.loc[1, 'team_name'] == 'B'
+    assert pd.isna(timeline.loc[2, 'team_name'])
+
+def test_unreadable_seasons_and_dates_get_no_team():
+    teams = {'a': team_history([['?', 'Unknown', 'team/unknown', 'unknown', '', '', ''],
+                                ['2019', 'A', 'team/a-2019', 'a', '2019', '', '']])}
+    results = race_history(['2019-06-01', '1970-01-01'])
+    results.loc[1, ['date', 'race_pcs_year']] = ['', '']
+
+    timeline = career_timeline({'a': results}, teams)
+
+    assert timeline.loc[0, 'team_name'] == 'A'
+    assert pd.isna(timeline.loc[1, 'team_name'])
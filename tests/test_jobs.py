@@ -0,0 +1,26 @@
+import json
+from pcs_scraper import jobs
+
+def test_crash_on_final_attempt_is_quarantined(tmp_path, monkeypatch):
+    unit = {'rider': 'tadej-pogacar'}
+    key = jobs.unit_key(unit)
+    journal_path = str(tmp_path / 'journal.jsonl')
+
+    # the job died while running the unit's last attempt
+    with open(journal_path, 'w') as journal:
+        journal.write(json.dumps({'unit': key, 'status': jobs.FAILED, 'attempts': 2, 'error': 'ConnectionError: reset'}) + '\n')
+        journal.write(json.dumps({'unit': key, 'status': jobs.RUNNING, 'attempts': 3}) + '\n')
+
+    def run_unit(unit):
+        raise AssertionError('a unit without attempts left must not be run again')
+    monkeypatch.setattr(jobs, 'run_unit', run_unit)
+
+    job = jobs.CrawlJob([unit], journal_path, str(tmp_path / 'out'), max_attempts = 3, backoff = 0)
+    status = job.run()
+
+    assert status.loc[0, 'status'] == jobs.QUARANTINED
+    assert status.loc[0, 'attempts'] == 3
+
+    # and it stays quarantined on the next resume
+    resumed = jobs.CrawlJob([unit], journal_path, str(tmp_path / 'out'), max_attempts = 3, backoff = 0)
+    assert resumed.status().loc[0, 'status'] == jobs.QUARANTINED
@@ -0,0 +1,16 @@
+import pytest
+from pcs_scraper.names import NameIndex
+
+def test_exact_pcs_name_resolves_when_printed_names_clash():
+    index = NameIndex()
+    index.add('rider', 'benjamin-thomas', 'Benjamin Thomas')
+    index.add('rider', 'benjamin-thomas-2', 'Benjamin Thomas')
+
+    # the second rider's printed name has the same key as the first rider's pcs_name
+    assert index.resolve('benjamin-thomas', 'rider') == 'benjamin-thomas'
+    assert index.resolve('benjamin-thomas-2', 'rider') == 'benjamin-thomas-2'
+    assert list(index.lookup('benjamin-thomas').loc[:, 'pcs_name']) == ['benjamin-thomas', 'benjamin-thomas-2']
+
+    # the printed name is still ambiguous
+    with pytest.raises(ValueError):
+        index.resolve('Benjamin Thomas', 'rider')